@@ -0,0 +1,263 @@
+"""
+Columnar exports of price history as Arrow IPC streams or Parquet files
+
+Record batches are built from the stored columns as they come out of the
+database, a batch of rows at a time: prices stay integer cents until a
+vectorized division, reasons and sources stay codes and become Arrow
+dictionary indices, and no ORM object or per-value type conversion is
+made. Dataframe libraries load the result without parsing:
+
+    pyarrow.ipc.open_stream(response.content).read_pandas()
+    polars.read_parquet("prices.parquet")
+
+Batches of price_histories come first, then the days stored as change
+points, then the archived days; sort by product_id and recorded_date in
+the dataframe when the order matters.
+
+Usage:
+    python -m backend.api.analytics.columnar --product-id 1 --product-id 2 \
+        --start 2024-01-01 --end 2026-12-31 --format parquet --output prices.parquet
+"""
+import argparse
+import io
+import os
+from datetime import date
+from typing import Optional, Iterator, Sequence
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import Connection, Integer, String, select, type_coerce
+
+from backend import database
+from backend.archive import archived_product_ids, read_archive_files
+from backend.models import PriceHistory, PriceRange
+from shared.constants import ExportFormat, PRICE_CHANGE_REASONS, PRICE_SOURCES
+
+# Rows per record batch, and per Parquet row group
+COLUMNAR_BATCH_SIZE = 64 * 1024
+
+EPOCH = date(1970, 1, 1)
+
+REASON_LABELS = pa.array(PRICE_CHANGE_REASONS)
+SOURCE_LABELS = pa.array(PRICE_SOURCES)
+
+COLUMNAR_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("product_id", pa.int32()),
+    ("event_id", pa.int32()),
+    ("price", pa.float64()),
+    ("price_change_reason", pa.dictionary(pa.int8(), pa.string())),
+    ("price_source", pa.dictionary(pa.int8(), pa.string())),
+    ("recorded_date", pa.date32()),
+])
+
+MEDIA_TYPES = {
+    ExportFormat.Arrow: "application/vnd.apache.arrow.stream",
+    ExportFormat.Parquet: "application/vnd.apache.parquet",
+}
+
+def _array(values, type_: pa.DataType) -> pa.Array:
+    if isinstance(values, pa.Array):
+        return values.cast(type_)
+    return pa.array(values, type=type_)
+
+def _labels(codes, labels: pa.Array) -> pa.DictionaryArray:
+    return pa.DictionaryArray.from_arrays(_array(codes, pa.int8()), labels)
+
+def _batch(ids, product_ids, event_ids, cents, reasons, sources, days) -> pa.RecordBatch:
+    """
+    Record batch of raw stored columns: cents, codes, and dates as date objects or ISO strings
+    """
+    return pa.RecordBatch.from_arrays([
+        _array(ids, pa.int64()),
+        _array(product_ids, pa.int32()),
+        _array(event_ids, pa.int32()),
+        pc.divide(_array(cents, pa.float64()), 100.0),
+        _labels(reasons, REASON_LABELS),
+        _labels(sources, SOURCE_LABELS),
+        (days if isinstance(days, pa.Array) else pa.array(days)).cast(pa.date32()),
+    ], schema=COLUMNAR_SCHEMA)
+
+def _raw(column, type_=Integer):
+    """
+    Column read without its type conversion, as stored
+    """
+    return type_coerce(column, type_)
+
+def _daily_batches(connection: Connection,
+                   product_ids: Optional[Sequence[int]],
+                   start_date: Optional[date],
+                   end_date: Optional[date],
+                   batch_size: int) -> Iterator[pa.RecordBatch]:
+    filters = [PriceHistory.product_id.in_(product_ids)] if product_ids else []
+    if start_date:
+        filters.append(PriceHistory.recorded_date >= start_date)
+    if end_date:
+        filters.append(PriceHistory.recorded_date <= end_date)
+
+    result = connection.execution_options(stream_results=True).execute(
+        select(
+            PriceHistory.id, PriceHistory.product_id, PriceHistory.event_id, _raw(PriceHistory.price),
+            _raw(PriceHistory.price_change_reason), _raw(PriceHistory.price_source),
+            _raw(PriceHistory.recorded_date, String)
+        ).where(*filters)
+    )
+    for rows in result.partitions(batch_size):
+        yield _batch(*zip(*rows))
+
+def _day_numbers(days) -> np.ndarray:
+    """
+    Days since EPOCH, the date32 representation
+    """
+    return pa.array(days, type=pa.date32()).cast(pa.int32()).to_numpy().astype(np.int64)
+
+def _range_batches(connection: Connection,
+                   product_ids: Optional[Sequence[int]],
+                   start_date: Optional[date],
+                   end_date: Optional[date],
+                   batch_size: int) -> Iterator[pa.RecordBatch]:
+    """
+    Days of the change-point runs, every run repeated once per day it covers within the dates
+    """
+    filters = [PriceRange.product_id.in_(product_ids)] if product_ids else []
+    if start_date:
+        filters.append(PriceRange.valid_to >= start_date)
+    if end_date:
+        filters.append(PriceRange.valid_from <= end_date)
+
+    result = connection.execution_options(stream_results=True).execute(
+        select(
+            PriceRange.id, PriceRange.product_id, PriceRange.event_id, _raw(PriceRange.price),
+            _raw(PriceRange.price_change_reason), _raw(PriceRange.price_source),
+            PriceRange.valid_from, PriceRange.valid_to
+        ).where(*filters)
+    )
+    for rows in result.partitions(batch_size):
+        *columns, valid_from, valid_to = zip(*rows)
+        first_days = _day_numbers(valid_from)
+        last_days = _day_numbers(valid_to)
+        if start_date:
+            first_days = np.maximum(first_days, (start_date - EPOCH).days)
+        if end_date:
+            last_days = np.minimum(last_days, (end_date - EPOCH).days)
+
+        lengths = last_days - first_days + 1
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        days = pa.array(np.repeat(first_days, lengths) + offsets, type=pa.int32()).cast(pa.date32())
+
+        repeated = []
+        for column in columns:
+            values = pa.array(column)
+            repeated.append(values.take(pa.array(np.repeat(np.arange(len(values)), lengths))))
+        yield _batch(*repeated, days)
+
+def _archive_batches(product_ids: Optional[Sequence[int]],
+                     start_date: Optional[date],
+                     end_date: Optional[date]) -> Iterator[pa.RecordBatch]:
+    """
+    Archived days, read from Parquet and recoded to the export columns
+    """
+    for table in read_archive_files(start_date, end_date, product_ids):
+        for batch in table.to_batches(COLUMNAR_BATCH_SIZE):
+            yield _batch(
+                batch["id"], batch["product_id"], batch["event_id"], batch["price_cents"],
+                pc.index_in(batch["price_change_reason"], value_set=REASON_LABELS),
+                pc.index_in(batch["price_source"], value_set=SOURCE_LABELS),
+                batch["recorded_date"]
+            )
+
+def iter_record_batches(product_ids: Optional[Sequence[int]] = None,
+                        start_date: Optional[date] = None,
+                        end_date: Optional[date] = None,
+                        batch_size: int = COLUMNAR_BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+    """
+    Price history of the products between the dates as Arrow record batches
+
+    Opens its own connection, so it can outlive the request session of a
+    streaming response.
+
+    Args:
+        product_ids: Products to export, all of them if empty
+        start_date: First day, unbounded if None
+        end_date: Last day, unbounded if None
+        batch_size: Rows per record batch read from the database
+
+    Yields:
+        Record batches of COLUMNAR_SCHEMA
+    """
+    with database.engine.connect() as connection:
+        yield from _daily_batches(connection, product_ids, start_date, end_date, batch_size)
+        yield from _range_batches(connection, product_ids, start_date, end_date, batch_size)
+
+    if not product_ids or set(product_ids) & set(archived_product_ids(start_date, end_date)):
+        yield from _archive_batches(product_ids, start_date, end_date)
+
+class _Drain(io.RawIOBase):
+    """
+    Write-only stream handing out the bytes written since the last drain
+
+    tell() keeps counting across drains, Parquet footers point at absolute offsets.
+    """
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def write_batches(batches: Iterator[pa.RecordBatch], format: ExportFormat) -> Iterator[bytes]:
+    """
+    Arrow IPC stream or Parquet file of the batches, as the bytes of every written batch
+
+    Args:
+        batches: Record batches of COLUMNAR_SCHEMA
+        format: ExportFormat.Arrow or ExportFormat.Parquet
+
+    Yields:
+        Consecutive parts of the stream or file
+    """
+    drain = _Drain()
+    if format == ExportFormat.Arrow:
+        writer = pa.ipc.new_stream(drain, COLUMNAR_SCHEMA)
+    else:
+        writer = pq.ParquetWriter(drain, COLUMNAR_SCHEMA, compression="zstd")
+
+    for batch in batches:
+        if format == ExportFormat.Arrow:
+            writer.write_batch(batch)
+        else:
+            writer.write_batch(batch, row_group_size=COLUMNAR_BATCH_SIZE)
+        yield drain.drain()
+
+    writer.close()
+    yield drain.drain()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export price history as an Arrow IPC stream or a Parquet file")
+    parser.add_argument("--product-id", type=int, action="append", help="Product to export, repeat for several, all products if omitted")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--format", type=ExportFormat, choices=list(MEDIA_TYPES), default=ExportFormat.Parquet)
+    parser.add_argument("--output", required=True, help="File to write")
+    args = parser.parse_args()
+
+    with open(args.output, "wb") as output:
+        for part in write_batches(iter_record_batches(args.product_id, args.start, args.end), args.format):
+            output.write(part)
+
+    print(f"[EXPORT] Wrote {args.output} ({os.path.getsize(args.output) / 1024 / 1024:.1f} MB)")
@@ -1,10 +1,207 @@
 """CRUD operations for analytics"""
-from typing import Optional, Dict, Any, List
+import math
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import date, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import case, func, select, union_all
+
+from backend.models import PriceHistory, PriceRollup, Product
+from backend.api.events.calendar import get_event_calendar
+from backend.archive import archived_snapshots, aggregate_archive, aggregate_archive_windows, aggregate_catalog_archive_windows
+from backend.ingestion.rollups import raw_price
+from backend.ingestion.change_points import (
+    get_price_ranges, expand_ranges, aggregate_ranges, aggregate_range_windows, aggregate_catalog_range_windows
+)
+from backend.partitions import add_months, month_start
+from shared.constants import ImpactSort
+
+@dataclass
+class PriceAggregate:
+    """Snapshot count, sum, min, max and sum of squares of prices, in cents"""
+    snapshots: int = 0
+    price_sum: int = 0
+    price_min: Optional[int] = None
+    price_max: Optional[int] = None
+    price_sum_squares: int = 0
+
+    def merge(self, snapshots, price_sum, price_min, price_max, price_sum_squares) -> None:
+        if not snapshots:
+            return
+        self.snapshots += int(snapshots)
+        self.price_sum += int(price_sum)
+        self.price_sum_squares += int(price_sum_squares)
+        self.price_min = price_min if self.price_min is None else min(self.price_min, price_min)
+        self.price_max = price_max if self.price_max is None else max(self.price_max, price_max)
+
+    @property
+    def avg_price(self) -> Optional[float]:
+        return self.price_sum / self.snapshots / 100 if self.snapshots else None
+
+    @property
+    def stddev_price(self) -> Optional[float]:
+        if not self.snapshots:
+            return None
+        mean = self.price_sum / self.snapshots
+        return math.sqrt(max(self.price_sum_squares / self.snapshots - mean * mean, 0.0)) / 100
+
+def aggregate_prices(db: Session, product_id: int, start_date: date, end_date: date) -> PriceAggregate:
+    """
+    Aggregates the prices of the product between two dates, both included
+
+    Whole months are read from the monthly rollups and the partial months
+    at each edge from the snapshots, so the cost stays the same for any
+    range length: at most a rollup row per month and two months of snapshots.
+    Days stored as change points add one row per price run, and edge days
+    of archived months are read from their Parquet bucket.
+
+    Args:
+        db: Database session
+        product_id: Product ID
+        start_date: First day
+        end_date: Last day
+
+    Returns:
+        Aggregate of the range, empty if there is no snapshot
+    """
+    first_full_month = month_start(start_date) if start_date.day == 1 else add_months(month_start(start_date), 1)
+    after_full_months = month_start(end_date + timedelta(days=1))
+
+    parts = []
+    snapshot_ranges = [(start_date, end_date + timedelta(days=1))]
+    if first_full_month < after_full_months:
+        parts.append(
+            select(
+                func.sum(PriceRollup.snapshots),
+                func.sum(PriceRollup.price_sum),
+                func.min(PriceRollup.price_min),
+                func.max(PriceRollup.price_max),
+                func.sum(PriceRollup.price_sum_squares)
+            ).where(
+                PriceRollup.product_id == product_id,
+                PriceRollup.month >= first_full_month,
+                PriceRollup.month < after_full_months
+            )
+        )
+        snapshot_ranges = [(start_date, first_full_month), (after_full_months, end_date + timedelta(days=1))]
+
+    price = raw_price()
+    for range_start, range_end in snapshot_ranges:
+        if range_start < range_end:
+            parts.append(
+                select(func.count(), func.sum(price), func.min(price), func.max(price), func.sum(price * price))
+                .where(
+                    PriceHistory.product_id == product_id,
+                    PriceHistory.recorded_date >= range_start,
+                    PriceHistory.recorded_date < range_end
+                )
+            )
+
+    # A single round trip for the rollups and both edges
+    aggregate = PriceAggregate()
+    for row in db.execute(union_all(*parts)).all():
+        aggregate.merge(*row)
+
+    # Edge days moved to the archive, whole archived months still have their rollups
+    for range_start, range_end in snapshot_ranges:
+        if range_start < range_end:
+            aggregate.merge(*aggregate_archive(product_id, range_start, range_end - timedelta(days=1)))
+
+    # Days stored as change points
+    aggregate.merge(*aggregate_ranges(db, product_id, start_date, end_date))
+    return aggregate
+
+def _window_columns(windows: Dict[Any, Tuple[date, date]]) -> list:
+    """
+    Conditional count, sum, min, max and sum of squares of the prices of every window
+    """
+    price = raw_price()
+    columns = []
+    for start_date, end_date in windows.values():
+        window_price = case((PriceHistory.recorded_date.between(start_date, end_date), price))
+        columns += [
+            func.count(window_price),
+            func.sum(window_price),
+            func.min(window_price),
+            func.max(window_price),
+            func.sum(window_price * window_price)
+        ]
+    return columns
+
+def _windows_span(windows: Dict[Any, Tuple[date, date]]) -> list:
+    return [
+        PriceHistory.recorded_date >= min(start_date for start_date, _ in windows.values()),
+        PriceHistory.recorded_date <= max(end_date for _, end_date in windows.values())
+    ]
+
+def _window_aggregates(windows: Dict[Any, Tuple[date, date]], values) -> Dict[Any, PriceAggregate]:
+    aggregates = {}
+    for index, name in enumerate(windows):
+        aggregates[name] = PriceAggregate()
+        if values is not None:
+            aggregates[name].merge(*values[index * 5:index * 5 + 5])
+    return aggregates
+
+def aggregate_windows(db: Session, product_id: int, windows: Dict[Any, Tuple[date, date]]) -> Dict[Any, PriceAggregate]:
+    """
+    Aggregates the prices of the product over several windows in one query
+
+    The snapshots spanning all windows are scanned once, every window is a
+    set of conditional aggregates keyed on recorded_date. Meant for windows
+    of days or weeks like the ones around an event; long ranges read less
+    with aggregate_prices, which uses the monthly rollups.
+
+    Args:
+        db: Database session
+        product_id: Product ID
+        windows: First and last day of every window, by name, both included
+
+    Returns:
+        Aggregate of every window by name, empty if it has no snapshot
+    """
+    row = db.execute(
+        select(*_window_columns(windows)).where(PriceHistory.product_id == product_id, *_windows_span(windows))
+    ).one()
+    aggregates = _window_aggregates(windows, row)
+
+    # Days stored as change points or moved to the archive
+    for name, values in aggregate_range_windows(db, product_id, windows).items():
+        aggregates[name].merge(*values)
+    for name, values in aggregate_archive_windows(product_id, windows).items():
+        aggregates[name].merge(*values)
 
-from backend.models import PriceHistory, Event
+    return aggregates
+
+def aggregate_catalog_windows(db: Session, windows: Dict[Any, Tuple[date, date]]) -> Dict[int, Dict[Any, PriceAggregate]]:
+    """
+    Aggregates the prices of every product over several windows in one grouped query
+
+    Like aggregate_windows, with the conditional aggregates grouped by
+    product over a single scan of the snapshots spanning the windows.
+
+    Args:
+        db: Database session
+        windows: First and last day of every window, by name, both included
+
+    Returns:
+        Aggregates of the windows by product, for the products with a snapshot in any window
+    """
+    rows = db.execute(
+        select(PriceHistory.product_id, *_window_columns(windows))
+        .where(*_windows_span(windows))
+        .group_by(PriceHistory.product_id)
+    ).all()
+    aggregates = {product_id: _window_aggregates(windows, values) for product_id, *values in rows}
+
+    others = [aggregate_catalog_range_windows(db, windows), aggregate_catalog_archive_windows(windows)]
+    for product_aggregates in others:
+        for product_id, window_values in product_aggregates.items():
+            if product_id not in aggregates:
+                aggregates[product_id] = _window_aggregates(windows, None)
+            for name, values in window_values.items():
+                aggregates[product_id][name].merge(*values)
+
+    return aggregates
 
 def get_price_history(db: Session, product_id: int, 
                       start_date: Optional[date] = None, 
@@ -19,7 +216,9 @@ def get_price_history(db: Session, product_id: int,
         end_date: end date of the history
 
     Returns:
-        List of price history or None if product_id not found
+        List of price history or None if product_id not found,
+        change points are expanded to daily snapshots and archived
+        snapshots are read from Parquet
     """
     query = db.query(PriceHistory).filter(
         PriceHistory.product_id == product_id
@@ -31,7 +230,14 @@ def get_price_history(db: Session, product_id: int,
     if end_date:
         query = query.filter(PriceHistory.recorded_date <= end_date)
 
-    return query.order_by(PriceHistory.recorded_date.asc()).all()
+    price_histories = query.order_by(PriceHistory.recorded_date.asc()).all()
+
+    others = expand_ranges(get_price_ranges(db, product_id, start_date, end_date), start_date, end_date)
+    others += archived_snapshots(product_id, start_date, end_date)
+    if not others:
+        return price_histories
+
+    return sorted(price_histories + others, key=lambda price_history: price_history.recorded_date)
 
 def get_price_history_by_recorded_date(db: Session, product_id: int, recorded_date: date) -> Optional[PriceHistory]:
     """
@@ -45,10 +251,19 @@ def get_price_history_by_recorded_date(db: Session, product_id: int, recorded_da
     Returns:
         Price History instance or None if not found
     """
-    return db.query(PriceHistory).filter(
+    price_history = db.query(PriceHistory).filter(
         PriceHistory.product_id == product_id,
         PriceHistory.recorded_date == recorded_date
     ).first()
+    if price_history:
+        return price_history
+
+    expanded = expand_ranges(get_price_ranges(db, product_id, recorded_date, recorded_date), recorded_date, recorded_date)
+    if expanded:
+        return expanded[0]
+
+    archived = archived_snapshots(product_id, recorded_date, recorded_date)
+    return archived[0] if archived else None
 
 def get_price_summary(db: Session, product_id: int, start_date: date, end_date: date) -> Optional[Dict[str, Any]]:
     """
@@ -63,38 +278,28 @@ def get_price_summary(db: Session, product_id: int, start_date: date, end_date:
     Returns:
         summary of the price history
     """
-    query = db.query(
-        func.min(PriceHistory.price).label("min_price"),
-        func.max(PriceHistory.price).label("max_price"),
-        func.avg(PriceHistory.price).label("avg_price")
-    ).filter(
-        PriceHistory.product_id == product_id,
-    )
-
-    if start_date:
-        query.filter(PriceHistory.recorded_date >= start_date)
-
-    if end_date:
-        query.filter(PriceHistory.recorded_date <= end_date)
-
-    summary = query.one_or_none()
-
-    if not summary or summary.min_price is None:
-        return None 
+    aggregate = aggregate_prices(db, product_id, start_date, end_date)
+    if not aggregate.snapshots:
+        return None
 
     return {
         "product_id": product_id,
         "start_date": start_date,
         "end_date": end_date,
-        "min_price": float(summary.min_price),
-        "max_price": float(summary.max_price),
-        "avg_price": float(summary.avg_price)
+        "min_price": aggregate.price_min / 100,
+        "max_price": aggregate.price_max / 100,
+        "avg_price": aggregate.avg_price,
+        "stddev_price": aggregate.stddev_price
     }
 
 def get_discount_summary(db: Session, product_id: int, start_date: date, end_date: date) -> Optional[Dict[str, Any]]:
     """
     Summarize the discount history of the product
 
+    Discounts are percentages below the base price of the product, from the
+    same price aggregates as the price summary. Prices above the base
+    price, like pre-event uplifts, are negative discounts.
+
     Args:
         db: Database session
         product_id: Product ID
@@ -102,106 +307,217 @@ def get_discount_summary(db: Session, product_id: int, start_date: date, end_dat
         end_date: end date of the summary
 
     Returns:
-        summary of the discount history
+        summary of the discount history, None if the product or its history is missing
     """
-    query = db.query(
-        func.min(PriceHistory.discount_percent).label("min_discount"),
-        func.max(PriceHistory.discount_percent).label("max_discount"),
-        func.avg(PriceHistory.discount_percent).label("avg_discount")
-    ).filter(
-        PriceHistory.product_id == product_id,
-    )
-    
-    if start_date:
-        query.filter(PriceHistory.recorded_date >= start_date)
-
-    if end_date:
-        query.filter(PriceHistory.recorded_date <= end_date)
+    base_price = db.scalar(select(Product.base_price).where(Product.product_id == product_id))
+    if not base_price:
+        return None
 
-    summary = query.one_or_none()
+    aggregate = aggregate_prices(db, product_id, start_date, end_date)
+    if not aggregate.snapshots:
+        return None
 
-    if not summary or summary.min_price is None:
-        return None 
+    def discount(price: float) -> float:
+        return (base_price - price) / base_price * 100
 
     return {
         "product_id": product_id,
         "start_date": start_date,
         "end_date": end_date,
-        "min_discount": float(summary.min_discount),
-        "max_discount": float(summary.max_discount),
-        "avg_discount": float(summary.avg_discount)
+        "min_discount": discount(aggregate.price_max / 100),
+        "max_discount": discount(aggregate.price_min / 100),
+        "avg_discount": discount(aggregate.avg_price)
+    }
+
+def event_windows(event, post_event_days: int) -> Dict[str, Tuple[date, date]]:
+    """
+    Pre-event, event and post-event windows of the event, first and last day included
+    """
+    return {
+        "pre_event": (event.start_date - timedelta(days=event.pre_event_days), event.start_date - timedelta(days=1)),
+        "event": (event.start_date, event.end_date),
+        "post_event": (event.end_date + timedelta(days=1), event.end_date + timedelta(days=post_event_days))
+    }
+
+def event_impact(event, product_id: int, post_event_days: int, aggregates: Dict[str, PriceAggregate]) -> Optional[Dict[str, Any]]:
+    """
+    Impact of the event on the product from the aggregates of its windows
+
+    Returns:
+        Dict that holds effect of the event on product, None without pre-event or event prices
+    """
+    pre_avg = aggregates["pre_event"].avg_price
+    event_avg = aggregates["event"].avg_price
+    post_avg = aggregates["post_event"].avg_price
+
+    if pre_avg is None or event_avg is None:
+        return None
+
+    return {
+        "event_id": event.event_id,
+        "event_name": event.event_name,
+        "product_id": product_id,
+        
+        "start_date": event.start_date,
+        "end_date": event.end_date,
+        "pre_event_days": event.pre_event_days,
+        "post_event_days": post_event_days,
+
+        "pre_event_avg_price": round(pre_avg, 2),
+        "event_avg_price": round(event_avg, 2),
+        "post_event_avg_price": round(post_avg, 2) if post_avg is not None else None,
+
+        "pre_to_event_percentage_change": round(((event_avg - pre_avg) / pre_avg) * 100, 2),
+        "event_to_post_percentage_change": round(((post_avg - event_avg) / event_avg) * 100, 2) 
+        if post_avg else None
     }
 
 def get_event_price_impact(
     db: Session,
     event_id: int,
     product_id: int,
-    post_event_days: int = 7
+    post_event_days: int = 7,
+    events_version: Optional[int] = None
 ):
     """
     Impact of the Event over product
 
+    The three windows are aggregated in a single query, the event comes
+    from the cached event calendar.
+
     Args:
         db: Database session
         event_id: Event Id
         product_id: Prodcut Id
+        post_event_days: Days of the post-event window
+        events_version: Events version the caller already read, e.g. for a cache key
 
     Returns:
         Dict that holds effect of the event on product if event exists. Otherwise, None
     """
 
-    event = db.query(Event).filter(Event.event_id == event_id).first()
+    event = get_event_calendar(db, version=events_version).get_event(event_id)
     if not event or event.pre_event_days == 0:
         return None
 
-    # Pre-event window
-    pre_start = event.start_date - timedelta(days=event.pre_event_days)
-    pre_end = event.start_date - timedelta(days=1)
+    aggregates = aggregate_windows(db, product_id, event_windows(event, post_event_days))
+    return event_impact(event, product_id, post_event_days, aggregates)
 
-    pre_avg = db.query(
-        func.avg(PriceHistory.price)
-    ).filter(
-        PriceHistory.product_id == product_id,
-        PriceHistory.recorded_date.between(pre_start, pre_end)
-    ).scalar()
+def get_event_window_stats(
+    db: Session,
+    event_id: int,
+    product_id: int,
+    post_event_days: int = 7
+) -> Optional[Dict[str, Any]]:
+    """
+    Snapshot count, min, max, average and standard deviation of the prices
+    in every window around the event, in the same single query as the impact
 
-    # Event window
-    event_avg = db.query(
-        func.avg(PriceHistory.price)
-    ).filter(
-        PriceHistory.product_id == product_id,
-        PriceHistory.recorded_date.between(event.start_date, event.end_date)
-    ).scalar()
+    Args:
+        db: Database session
+        event_id: Event Id
+        product_id: Product Id
+        post_event_days: Days of the post-event window
 
-    if pre_avg is None or event_avg is None:
+    Returns:
+        Statistics of the windows, None if the event does not exist
+        or the product has no snapshot around it
+    """
+    event = get_event_calendar(db).get_event(event_id)
+    if not event:
         return None
 
-    # Post Event window
-    post_start = event.end_date + timedelta(days=1)
-    post_end = event.end_date + timedelta(days=post_event_days)
+    windows = event_windows(event, post_event_days)
+    if event.pre_event_days == 0:
+        del windows["pre_event"]
 
-    post_avg = db.query(
-        func.avg(PriceHistory.price)
-    ).filter(
-        PriceHistory.product_id == product_id,
-        PriceHistory.recorded_date.between(post_start, post_end)
-    ).scalar()
+    aggregates = aggregate_windows(db, product_id, windows)
+    if not any(aggregate.snapshots for aggregate in aggregates.values()):
+        return None
 
     return {
         "event_id": event.event_id,
         "event_name": event.event_name,
         "product_id": product_id,
-        
-        "start_date": event.start_date,
-        "end_date": event.end_date,
-        "pre_event_days": event.pre_event_days,
-        "post_event_days": post_event_days,
+        "windows": [
+            {
+                "window": name,
+                "start_date": start_date,
+                "end_date": end_date,
+                "snapshots": aggregates[name].snapshots,
+                "min_price": aggregates[name].price_min / 100 if aggregates[name].snapshots else None,
+                "max_price": aggregates[name].price_max / 100 if aggregates[name].snapshots else None,
+                "avg_price": aggregates[name].avg_price,
+                "stddev_price": aggregates[name].stddev_price
+            }
+            for name, (start_date, end_date) in windows.items()
+        ]
+    }
 
-        "pre_event_avg_price": round(pre_avg, 2),
-        "event_avg_price": round(event_avg, 2),
-        "post_event_avg_price": round(post_avg, 2),
+def get_event_impact_matrix(
+    db: Session,
+    event_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    post_event_days: int = 7,
+    sort: Optional[ImpactSort] = None,
+    descending: bool = False,
+    limit: Optional[int] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Impact of one event on every product, or of every event on one product
 
-        "pre_to_event_percentage_change": round(((event_avg - pre_avg) / pre_avg) * 100, 2),
-        "event_to_post_percentage_change": round(((post_avg - event_avg) / event_avg) * 100, 2) 
-        if post_avg else None
-    }
+    Every product of an event comes out of one grouped query over the
+    snapshots of the event windows. Every event of a product comes out of
+    one query with the windows of all events as conditional aggregates.
+
+    Args:
+        db: Database session
+        event_id: Event of the catalog-wide matrix
+        product_id: Product of the all-events matrix, when event_id is None
+        post_event_days: Days of the post-event window
+        sort: Percentage change to sort the impacts by, ascending puts the deepest discounts first
+        descending: Sort from the highest change
+        limit: Maximum number of impacts returned
+
+    Returns:
+        Impacts that could be calculated, None if the event does not exist
+    """
+    calendar = get_event_calendar(db)
+
+    if event_id is not None:
+        event = calendar.get_event(event_id)
+        if not event:
+            return None
+        if event.pre_event_days == 0:
+            return []
+
+        aggregates = aggregate_catalog_windows(db, event_windows(event, post_event_days))
+        impacts = [
+            event_impact(event, product, post_event_days, product_aggregates)
+            for product, product_aggregates in sorted(aggregates.items())
+        ]
+    else:
+        events = [event for event in calendar.events if event.pre_event_days > 0]
+        if not events:
+            return []
+
+        windows = {
+            (event.event_id, name): window
+            for event in events for name, window in event_windows(event, post_event_days).items()
+        }
+        aggregates = aggregate_windows(db, product_id, windows)
+        impacts = [
+            event_impact(event, product_id, post_event_days, {
+                name: aggregates[(event.event_id, name)] for name in ("pre_event", "event", "post_event")
+            })
+            for event in events
+        ]
+
+    impacts = [impact for impact in impacts if impact]
+    if sort:
+        # Impacts without the sorted change go last either way
+        known = [impact for impact in impacts if impact[sort.value] is not None]
+        unknown = [impact for impact in impacts if impact[sort.value] is None]
+        impacts = sorted(known, key=lambda impact: impact[sort.value], reverse=descending) + unknown
+
+    return impacts[:limit] if limit else impacts
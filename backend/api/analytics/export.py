@@ -0,0 +1,189 @@
+"""
+Streaming exports of price history
+
+Snapshots are read as Core row tuples in keyset pages on
+(product_id, recorded_date), each page through a server-side cursor, so
+memory stays the same for any range and the first rows go out before the
+last page is read. Days stored as change points or in the Parquet archive
+are merged in, in the same product and day order.
+"""
+import csv
+import heapq
+import io
+import json
+from datetime import date
+from typing import Optional, Iterator, List, Sequence, Tuple
+from sqlalchemy import Connection, and_, or_, select
+
+from backend import database
+from backend.archive import archived_product_ids, read_archive
+from backend.models import PriceHistory, PriceRange
+from shared.constants import ExportFormat
+
+# Rows per keyset page, the most rows held by a cursor
+EXPORT_PAGE_SIZE = 10000
+
+# Rows per chunk of the response body
+EXPORT_CHUNK_ROWS = 1000
+
+EXPORT_COLUMNS = ("id", "product_id", "event_id", "price", "price_change_reason", "price_source", "recorded_date")
+
+# Values of EXPORT_COLUMNS
+ExportRow = Tuple[int, int, Optional[int], float, Optional[str], Optional[str], date]
+
+def _product_filter(column, product_ids: Optional[Sequence[int]]) -> list:
+    return [column.in_(product_ids)] if product_ids else []
+
+def _daily_rows(connection: Connection,
+                product_ids: Optional[Sequence[int]],
+                start_date: Optional[date],
+                end_date: Optional[date],
+                page_size: int) -> Iterator[ExportRow]:
+    """
+    Snapshots of price_histories in (product_id, recorded_date) order, one keyset page per query
+    """
+    filters = _product_filter(PriceHistory.product_id, product_ids)
+    if start_date:
+        filters.append(PriceHistory.recorded_date >= start_date)
+    if end_date:
+        filters.append(PriceHistory.recorded_date <= end_date)
+
+    last = None
+    while True:
+        page = select(
+            PriceHistory.id, PriceHistory.product_id, PriceHistory.event_id, PriceHistory.price,
+            PriceHistory.price_change_reason, PriceHistory.price_source, PriceHistory.recorded_date
+        ).where(*filters)
+        if last:
+            # Written out instead of a row value comparison, which MySQL does not match to the index
+            page = page.where(or_(
+                PriceHistory.product_id > last[0],
+                and_(PriceHistory.product_id == last[0], PriceHistory.recorded_date > last[1])
+            ))
+        page = page.order_by(PriceHistory.product_id, PriceHistory.recorded_date).limit(page_size)
+
+        rows = 0
+        for row in connection.execution_options(stream_results=True).execute(page):
+            rows += 1
+            last = (row.product_id, row.recorded_date)
+            yield tuple(row)
+
+        if rows < page_size:
+            return
+
+def _other_rows(connection: Connection,
+                product_ids: Optional[Sequence[int]],
+                start_date: Optional[date],
+                end_date: Optional[date]) -> Iterator[ExportRow]:
+    """
+    Days stored as change points or archived, in (product_id, recorded_date) order, one product at a time
+    """
+    overlapping = []
+    if start_date:
+        overlapping.append(PriceRange.valid_to >= start_date)
+    if end_date:
+        overlapping.append(PriceRange.valid_from <= end_date)
+
+    with_ranges = set(connection.scalars(
+        select(PriceRange.product_id)
+        .where(*_product_filter(PriceRange.product_id, product_ids), *overlapping)
+        .distinct()
+    ))
+    archived = set(archived_product_ids(start_date, end_date))
+    if product_ids:
+        archived &= set(product_ids)
+
+    for product_id in sorted(with_ranges | archived):
+        rows = []
+        if product_id in with_ranges:
+            ranges = connection.execute(
+                select(
+                    PriceRange.id, PriceRange.event_id, PriceRange.price, PriceRange.price_change_reason,
+                    PriceRange.price_source, PriceRange.valid_from, PriceRange.valid_to
+                ).where(PriceRange.product_id == product_id, *overlapping)
+            ).all()
+            for range_id, event_id, price, reason, source, valid_from, valid_to in ranges:
+                first_day = max(valid_from, start_date) if start_date else valid_from
+                last_day = min(valid_to, end_date) if end_date else valid_to
+                rows.extend(
+                    (range_id, product_id, event_id, price, reason, source, date.fromordinal(day))
+                    for day in range(first_day.toordinal(), last_day.toordinal() + 1)
+                )
+
+        if product_id in archived:
+            rows.extend(
+                (row["id"], product_id, row["event_id"], row["price_cents"] / 100,
+                 row["price_change_reason"], row["price_source"], row["recorded_date"])
+                for row in read_archive(product_id, start_date, end_date).to_pylist()
+            )
+
+        yield from sorted(rows, key=lambda row: row[6])
+
+def iter_price_history(product_ids: Optional[Sequence[int]] = None,
+                       start_date: Optional[date] = None,
+                       end_date: Optional[date] = None,
+                       page_size: int = EXPORT_PAGE_SIZE) -> Iterator[ExportRow]:
+    """
+    Snapshots of the products between the dates in (product_id, recorded_date) order
+
+    Opens its own connections, so it can outlive the request session of a
+    streaming response. Change points and archived days are read on a
+    second connection: a server-side cursor keeps its connection busy
+    until the page is read.
+
+    Args:
+        product_ids: Products to export, all of them if empty
+        start_date: First day, unbounded if None
+        end_date: Last day, unbounded if None
+        page_size: Rows per keyset page
+
+    Yields:
+        Rows with the values of EXPORT_COLUMNS
+    """
+    with database.engine.connect() as daily_connection, database.engine.connect() as other_connection:
+        yield from heapq.merge(
+            _daily_rows(daily_connection, product_ids, start_date, end_date, page_size),
+            _other_rows(other_connection, product_ids, start_date, end_date),
+            key=lambda row: (row[1], row[6])
+        )
+
+def _chunks(rows: Iterator[ExportRow]) -> Iterator[List[ExportRow]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def ndjson_lines(rows: Iterator[ExportRow]) -> Iterator[str]:
+    """
+    Rows as newline delimited JSON objects, a chunk of lines at a time
+    """
+    for chunk in _chunks(rows):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row[:-1] + (row[-1].isoformat(),)))) + "\n"
+            for row in chunk
+        )
+
+def csv_lines(rows: Iterator[ExportRow]) -> Iterator[str]:
+    """
+    Rows as CSV with a header line, a chunk of lines at a time
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    for chunk in _chunks(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+
+# Response body and media type of every text format
+EXPORT_WRITERS = {
+    ExportFormat.NDJSON: (ndjson_lines, "application/x-ndjson"),
+    ExportFormat.CSV: (csv_lines, "text/csv"),
+}
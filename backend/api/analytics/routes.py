@@ -2,16 +2,23 @@
 from typing import List, Optional
 from datetime import date, timedelta
 from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from backend.schemas import (
                             PriceSummaryResponse, 
                             DiscountSummaryResponse, 
                             PriceHistoryResponse,
-                            EventImpactResponse
+                            EventImpactResponse,
+                            EventWindowStatsResponse,
+                            CacheStatsResponse
                             )
+from backend.cache import cached_response, get_response_cache
 from backend.database import get_db
 from backend.api.analytics import crud as crud_analytics
+from backend.api.analytics.export import EXPORT_WRITERS, iter_price_history
+from backend.api.analytics import columnar
+from shared.constants import DataScope, ExportFormat, ImpactSort
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -35,14 +42,53 @@ def get_price_histories(product_id: int,
     Raises:
         HTTPException if any price history for that product not found
     """
-    price_histories = crud_analytics.get_price_history(db, product_id, start_date, end_date)
-    if not price_histories:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Price history for product with id {product_id} not found."
+    def price_histories(versions):
+        price_histories = crud_analytics.get_price_history(db, product_id, start_date, end_date)
+        if not price_histories:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Price history for product with id {product_id} not found."
+            )
+        return price_histories
+
+    return cached_response(
+        db, "/analytics/price-history",
+        {"product_id": product_id, "start_date": start_date, "end_date": end_date},
+        List[PriceHistoryResponse], price_histories, product_id
+    )
+
+@router.get("/price-history/export")
+def export_price_histories(product_id: Optional[List[int]] = Query(None),
+                           start_date: Optional[date] = Query(None),
+                           end_date: Optional[date] = Query(None),
+                           format: ExportFormat = Query(ExportFormat.NDJSON)):
+    """
+    Stream the price history of products as NDJSON, CSV, an Arrow IPC stream or a Parquet file
+
+    Text rows are paged through the database by (product_id, recorded_date)
+    and written as they are read, so memory stays flat for any range.
+    Arrow and Parquet are written from column batches of the stored values.
+
+    Args:
+        product_id: Products to export, repeat the parameter for several, all products if omitted
+        start_date: beginning date of the history
+        end_date: end date of the history
+        format: ndjson, csv, arrow or parquet
+
+    Returns:
+        Streaming response, text formats hold one snapshot per line ordered by product and date
+    """
+    if format in columnar.MEDIA_TYPES:
+        batches = columnar.iter_record_batches(product_id, start_date, end_date)
+        return StreamingResponse(
+            columnar.write_batches(batches, format),
+            media_type=columnar.MEDIA_TYPES[format],
+            headers={"Content-Disposition": f"attachment; filename=price-history.{format.value}"}
         )
-    
-    return price_histories
+
+    write_lines, media_type = EXPORT_WRITERS[format]
+    rows = iter_price_history(product_id, start_date, end_date)
+    return StreamingResponse(write_lines(rows), media_type=media_type)
 
 @router.get("/price-summary", response_model=PriceSummaryResponse)
 def price_summary_by_product_id(product_id: int, 
@@ -70,14 +116,20 @@ def price_summary_by_product_id(product_id: int,
     if not start_date:
         start_date = end_date - timedelta(days=30)
 
-    summary = crud_analytics.get_price_summary(db, product_id, start_date, end_date)
-    if not summary:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"There is not any history for product with id {product_id}."
-        )
-    
-    return summary
+    def summary(versions):
+        summary = crud_analytics.get_price_summary(db, product_id, start_date, end_date)
+        if not summary:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"There is not any history for product with id {product_id}."
+            )
+        return summary
+
+    return cached_response(
+        db, "/analytics/price-summary",
+        {"product_id": product_id, "start_date": start_date, "end_date": end_date},
+        PriceSummaryResponse, summary, product_id
+    )
 
 @router.get("/discount-summary", response_model=DiscountSummaryResponse)
 def discount_summary_by_product_id(product_id: int, 
@@ -130,11 +182,101 @@ def get_event_impact(event_id: int, product_id: int, db: Session = Depends(get_d
     Raises:
         HTTPException if event with event_id or product with product_id not found
     """
-    impact = crud_analytics.get_event_price_impact(db=db, event_id=event_id, product_id=product_id)
-    if not impact:
+    def impact(versions):
+        impact = crud_analytics.get_event_price_impact(
+            db=db, event_id=event_id, product_id=product_id, events_version=versions.get(DataScope.Events.value)
+        )
+        if not impact:
+            raise HTTPException(
+                status_code=404,
+                detail="Not enough data to calculate event impact.",
+            )
+        return impact
+
+    return cached_response(
+        db, "/analytics/event-impact",
+        {"event_id": event_id, "product_id": product_id},
+        EventImpactResponse, impact, product_id
+    )
+
+@router.get("/event-impact/windows", response_model=EventWindowStatsResponse)
+def get_event_impact_windows(event_id: int,
+                             product_id: int,
+                             post_event_days: int = Query(7, ge=1),
+                             db: Session = Depends(get_db)):
+    """
+    Price statistics of the product in every window around the event
+
+    Args:
+        event_id: Event ID
+        product_id: Product ID
+        post_event_days: Days of the post-event window
+        db: Database session
+
+    Returns:
+        Snapshot count, min, max, average and standard deviation per window
+
+    Raises:
+        HTTPException if the event is not found or the product has no history around it
+    """
+    stats = crud_analytics.get_event_window_stats(db, event_id, product_id, post_event_days)
+    if not stats:
         raise HTTPException(
-            status_code=404,
-            detail="Not enough data to calculate event impact.",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not enough data to calculate event window statistics.",
         )
 
-    return impact
\ No newline at end of file
+    return stats
+
+@router.get("/event-impact/matrix", response_model=List[EventImpactResponse])
+def get_event_impact_matrix(event_id: Optional[int] = Query(None),
+                            product_id: Optional[int] = Query(None),
+                            post_event_days: int = Query(7, ge=1),
+                            sort: Optional[ImpactSort] = Query(None),
+                            descending: bool = Query(False),
+                            limit: Optional[int] = Query(None, ge=1),
+                            db: Session = Depends(get_db)):
+    """
+    Impact of one event on every product, or of every event on one product
+
+    Args:
+        event_id: Event ID, for the impact on every product
+        product_id: Product ID, for the impact of every event
+        post_event_days: Days of the post-event window
+        sort: Percentage change to sort by, ascending lists the deepest discounts first
+        descending: Sort from the highest change
+        limit: Maximum number of impacts
+        db: Database session
+
+    Returns:
+        Impacts that could be calculated
+
+    Raises:
+        HTTPException if neither or both of event_id and product_id are given, or the event is not found
+    """
+    if (event_id is None) == (product_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Give either event_id or product_id."
+        )
+
+    impacts = crud_analytics.get_event_impact_matrix(
+        db, event_id, product_id, post_event_days, sort, descending, limit
+    )
+    if impacts is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event with id {event_id} not found."
+        )
+
+    return impacts
+
+@router.get("/cache", response_model=CacheStatsResponse)
+def get_cache_stats():
+    """
+    Get the response cache metrics of this process
+
+    Returns:
+        Backend, hits, misses, stores, evictions and the size of in-process caches
+    """
+    return get_response_cache().stats()
@@ -0,0 +1,186 @@
+"""In-memory event calendar resolving event state for any date"""
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional, List, Dict, Iterable, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.models import DataVersion, Event
+from shared.constants import DataScope
+
+
+@dataclass(frozen=True)
+class CalendarEvent:
+    """Detached, immutable copy of an event row"""
+    event_id: int
+    event_name: str
+
+    start_date: date
+    end_date: date
+
+    pre_event_days: int
+    pre_event_uplift_min: Optional[float]
+    pre_event_uplift_max: Optional[float]
+
+    discount_min: Optional[float]
+    discount_max: Optional[float]
+
+    noise_enabled: bool
+
+    @classmethod
+    def from_model(cls, event: Event) -> "CalendarEvent":
+        return cls(
+            event_id=event.event_id,
+            event_name=event.event_name,
+            start_date=event.start_date,
+            end_date=event.end_date,
+            pre_event_days=event.pre_event_days or 0,
+            pre_event_uplift_min=event.pre_event_uplift_min,
+            pre_event_uplift_max=event.pre_event_uplift_max,
+            discount_min=event.discount_min,
+            discount_max=event.discount_max,
+            noise_enabled=bool(event.noise_enabled)
+        )
+
+    @property
+    def pre_event_start(self) -> date:
+        return self.start_date - timedelta(days=self.pre_event_days)
+
+
+# Active event and pre-event of a calendar segment
+EventState = Tuple[Optional[CalendarEvent], Optional[CalendarEvent]]
+
+
+class EventCalendar:
+    """
+    Resolves the active event or pre-event of any date in O(log n)
+
+    Event and pre-event windows are cut into segments whose state never
+    changes, so a lookup is a binary search over segment start dates.
+
+    Precedence for overlapping windows:
+        - An active event always wins over a pre-event window.
+        - Among active events, the one that started first wins.
+        - Among pre-event windows, the nearest upcoming event wins.
+        - Remaining ties go to the lowest event_id.
+    """
+
+    def __init__(self, events: Iterable):
+        self._events: Dict[int, CalendarEvent] = {}
+        for event in events:
+            if not isinstance(event, CalendarEvent):
+                event = CalendarEvent.from_model(event)
+            self._events[event.event_id] = event
+
+        self._starts: List[date] = []
+        self._states: List[EventState] = []
+        self._build()
+
+    def _build(self) -> None:
+        boundaries = set()
+        for event in self._events.values():
+            boundaries.add(event.start_date)
+            boundaries.add(event.end_date + timedelta(days=1))
+            if event.pre_event_days > 0:
+                boundaries.add(event.pre_event_start)
+
+        for boundary in sorted(boundaries):
+            state = self._state_at(boundary)
+            # Merge neighbouring segments with the same state
+            if self._states and self._states[-1] == state:
+                continue
+            self._starts.append(boundary)
+            self._states.append(state)
+
+    def _state_at(self, current_date: date) -> EventState:
+        active_events = [
+            event for event in self._events.values()
+            if event.start_date <= current_date <= event.end_date
+        ]
+        if active_events:
+            return min(active_events, key=lambda event: (event.start_date, event.event_id)), None
+
+        pre_events = [
+            event for event in self._events.values()
+            if event.pre_event_days > 0 and event.pre_event_start <= current_date < event.start_date
+        ]
+        if pre_events:
+            return None, min(pre_events, key=lambda event: (event.start_date, event.event_id))
+
+        return None, None
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    @property
+    def events(self) -> List[CalendarEvent]:
+        return sorted(self._events.values(), key=lambda event: (event.start_date, event.end_date))
+
+    def get_event(self, event_id: int) -> Optional[CalendarEvent]:
+        """
+        Returns event by ID if exist
+        """
+        return self._events.get(event_id)
+
+    def resolve(self, current_date: date) -> EventState:
+        """
+        Returns (active_event, pre_event) for given date, at most one of them is set
+        """
+        index = bisect_right(self._starts, current_date) - 1
+        if index < 0:
+            return None, None
+        return self._states[index]
+
+    def get_active_event(self, current_date: date) -> Optional[CalendarEvent]:
+        """
+        Returns active event for given date if exist
+        """
+        return self.resolve(current_date)[0]
+
+    def get_pre_event(self, current_date: date) -> Optional[CalendarEvent]:
+        """
+        Returns pre-event if current_date is within pre-event window and no event is active
+        """
+        return self.resolve(current_date)[1]
+
+
+# --------------------------------------------------
+# Process-wide cache
+# --------------------------------------------------
+
+# (events version, calendar) of the last build, replaced as a whole
+_cached: Optional[Tuple[Optional[int], EventCalendar]] = None
+
+def read_events_version(db: Session) -> Optional[int]:
+    """
+    Version of the events table, bumped in the transaction of every event write by any process
+
+    Returns:
+        Current version, None if the data_versions row is missing
+    """
+    return db.scalar(select(DataVersion.version).where(DataVersion.scope == DataScope.Events.value))
+
+def get_event_calendar(db: Session, refresh: bool = False, version: Optional[int] = None) -> EventCalendar:
+    """
+    Returns the cached event calendar, rebuilding it only if the events table changed
+
+    The events version is read from the database, so writes made by other
+    workers or processes are seen by the next lookup.
+
+    Args:
+        db: Database session
+        refresh: Rebuild from the events table even if the cache is current
+        version: Events version already read by the caller, read from data_versions if None
+    """
+    global _cached
+
+    if version is None:
+        version = read_events_version(db)
+
+    cached = _cached
+    if refresh or cached is None or version is None or cached[0] != version:
+        cached = (version, EventCalendar(db.query(Event).all()))
+        _cached = cached
+
+    return cached[1]
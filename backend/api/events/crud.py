@@ -1,10 +1,14 @@
 """CRUD operations for events"""
+from collections import defaultdict
 from typing import Optional, List
 from datetime import date, timedelta
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import Session
 
-from backend.models import Event
+from backend.models import Event, PriceHistory, PriceRange
+from backend.ingestion.rollups import refresh_rollups
 from backend.schemas import EventCreate, EventUpdate
+from backend.cache import bump_event_version
 
 
 def get_event(db: Session, event_id: int) -> Optional[Event]:
@@ -56,6 +60,7 @@ def create_event(db: Session, event_data: EventCreate) -> Event:
     )
 
     db.add(event)
+    bump_event_version(db)
     db.commit()
     db.refresh(event)
     return event
@@ -68,9 +73,10 @@ def update_event(db: Session, event_id: int, event_data: EventUpdate) -> Optiona
     if event is None:
         return None
 
-    for key, value in event_data.model_dump(exclude_unset=True):
+    for key, value in event_data.model_dump(exclude_unset=True).items():
         setattr(event, key, value)
 
+    bump_event_version(db)
     db.commit()
     db.refresh(event)
     return event
@@ -78,12 +84,32 @@ def update_event(db: Session, event_id: int, event_data: EventUpdate) -> Optiona
 def delete_event(db: Session, event_id: int) -> bool:
     """
     Delete a event
+
+    Its snapshots are deleted with it, so the rollups of the months they
+    were in are refreshed in the same transaction.
     """
     event = get_event(db, event_id)
     if not event:
         return False
-    
+
+    # Products by the days their snapshots of the event span
+    spans = defaultdict(list)
+    for product_id, first_day, last_day in db.execute(
+        select(PriceHistory.product_id, func.min(PriceHistory.recorded_date), func.max(PriceHistory.recorded_date))
+        .where(PriceHistory.event_id == event_id)
+        .group_by(PriceHistory.product_id)
+    ):
+        spans[(first_day, last_day)].append(product_id)
+
+    # Change points of the event, not left to ON DELETE CASCADE which SQLite does not enforce by default
+    db.execute(delete(PriceRange).where(PriceRange.event_id == event_id))
     db.delete(event)
+    db.flush()
+
+    for (first_day, last_day), product_ids in spans.items():
+        refresh_rollups(db, first_day, last_day, product_ids)
+
+    bump_event_version(db)
     db.commit()
     return True
 
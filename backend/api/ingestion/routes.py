@@ -0,0 +1,78 @@
+"""Ingestion API endpoints"""
+from typing import List, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.schemas import BackfillRequest, SchedulerStatusResponse, IngestionRunResponse, LockMetricsResponse
+from backend.coordination import get_lock_metrics
+from backend.database import get_db
+from backend.models import IngestionRun
+from backend.ingestion.backfill import start_backfill
+from backend.ingestion.scheduler import get_scheduler
+
+router = APIRouter(prefix="/ingestion", tags=["ingestion"])
+
+@router.get("/schedule", response_model=SchedulerStatusResponse)
+def get_schedule():
+    """
+    Get the state of the in-process ingestion scheduler
+
+    Returns:
+        Schedule, next run and timings of the last run
+    """
+    return get_scheduler().status()
+
+@router.get("/runs", response_model=List[IngestionRunResponse])
+def list_runs(limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)):
+    """
+    List the latest ingestion runs of the run journal
+
+    Args:
+        limit: Maximum number of runs to return
+        db: Database session
+
+    Returns:
+        Runs, latest first
+    """
+    return db.scalars(
+        select(IngestionRun).order_by(IngestionRun.run_id.desc()).limit(limit)
+    ).all()
+
+@router.post("/backfill", response_model=IngestionRunResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_backfill(backfill: BackfillRequest, db: Session = Depends(get_db)):
+    """
+    Start a backfill in the background, under the ingestion lock
+
+    Args:
+        backfill: Date range, seed, policy and resume flag of the backfill
+        db: Database session
+
+    Returns:
+        The started run, follow it with GET /ingestion/runs
+
+    Raises:
+        HTTPException if the range is invalid or another ingestion is running
+    """
+    try:
+        run_id = start_backfill(backfill.start_date, backfill.end_date, backfill.seed, backfill.policy, backfill.resume)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if run_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another ingestion is running, try again when it finishes."
+        )
+
+    return db.get(IngestionRun, run_id)
+
+@router.get("/locks", response_model=Dict[str, LockMetricsResponse])
+def get_locks():
+    """
+    Get the leader locks metrics of this process
+
+    Returns:
+        Acquisitions, skips and wait times keyed by lock name
+    """
+    return get_lock_metrics()
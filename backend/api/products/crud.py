@@ -5,6 +5,8 @@ from sqlalchemy.orm import Session
 
 from backend.models import Product, PriceHistory
 from backend.schemas import ProductCreate, PriceHistoryCreate
+from backend.cache import bump_price_versions
+from backend.ingestion.rollups import refresh_rollups
 
 def get_product(db: Session, product_id: int) -> Optional[Product]:
     """
@@ -103,6 +105,9 @@ def create_price_history(db: Session, price_history_data: PriceHistoryCreate) ->
     )
 
     db.add(price_history)
+    db.flush()
+    refresh_rollups(db, price_history.recorded_date, price_history.recorded_date, [price_history.product_id])
+    bump_price_versions(db, [price_history.product_id])
     db.commit()
     db.refresh(price_history)
     return price_history
\ No newline at end of file
@@ -0,0 +1,348 @@
+"""
+Cold history archive of price_histories in Parquet
+
+Snapshots of the months before a cutoff are moved out of price_histories
+into Parquet files on local disk, one per month and product bucket:
+
+    <ARCHIVE_DIR>/month=2024-07/bucket=03/data.parquet
+
+Files are sorted by product_id and recorded_date, so reading one product
+only decodes the row groups whose statistics cover it. The hot table then
+only holds the recent months.
+
+Analytics read the archive next to the database: price history returns
+the archived snapshots of the range, and summaries read the archived days
+at the edges of a range from Parquet while whole months keep coming from
+their monthly rollups. Rollups of archived months are kept and no longer
+refreshed, so archived months are read-only: backfills and daily
+ingestion refuse dates in them.
+
+Usage:
+    python -m backend.archive list
+    python -m backend.archive archive --before 2025-01-01
+"""
+import argparse
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional, Dict, Iterator, List, Sequence, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import Connection, Engine, Integer, func, select, type_coerce
+
+from backend import database
+from backend.models import PriceHistory
+from backend.partitions import add_months, expire_before, month_start, months_between
+from shared.config import get_settings
+
+# Products are spread over the buckets by product_id, changing it orphans the existing files
+ARCHIVE_BUCKETS = 16
+
+ARCHIVE_FILE = "data.parquet"
+
+# Rows per row group, the unit skipped by the product_id statistics
+ROW_GROUP_SIZE = 64 * 1024
+
+# Same encoding as price_histories: integer cents, reasons and sources as dictionary encoded strings
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("product_id", pa.int32()),
+    ("event_id", pa.int32()),
+    ("price_cents", pa.int32()),
+    ("price_change_reason", pa.string()),
+    ("price_source", pa.string()),
+    ("recorded_date", pa.date32()),
+    ("created_at", pa.timestamp("us")),
+])
+
+SORT_KEYS = [("product_id", "ascending"), ("recorded_date", "ascending")]
+
+def archive_root() -> Path:
+    return Path(get_settings().archive_dir)
+
+def product_bucket(product_id: int) -> int:
+    return product_id % ARCHIVE_BUCKETS
+
+def archive_path(root: Path, month: date, bucket: int) -> Path:
+    return root / f"month={month:%Y-%m}" / f"bucket={bucket:02d}" / ARCHIVE_FILE
+
+def archived_months() -> List[date]:
+    """
+    First days of the archived months, in order
+    """
+    root = archive_root()
+    if not root.is_dir():
+        return []
+
+    months = []
+    for entry in root.iterdir():
+        if entry.is_dir() and entry.name.startswith("month="):
+            months.append(date.fromisoformat(f"{entry.name[len('month='):]}-01"))
+    return sorted(months)
+
+def ensure_not_archived(start_date: date, end_date: date) -> None:
+    """
+    Refuses writes to archived months, whose rollups are no longer refreshed
+
+    Raises:
+        ValueError if the dates overlap an archived month
+    """
+    archived = [month for month in archived_months() if month_start(start_date) <= month <= end_date]
+    if archived:
+        raise ValueError(
+            f"{start_date} - {end_date} overlaps archived months "
+            f"{', '.join(f'{month:%Y-%m}' for month in archived)}, which are read-only"
+        )
+
+def _snapshot_keys(table: pa.Table) -> np.ndarray:
+    """
+    (product_id, recorded_date) of every row packed into one integer
+    """
+    product_ids = table["product_id"].to_numpy().astype(np.int64)
+    days = table["recorded_date"].cast(pa.int32()).to_numpy().astype(np.int64)
+    return (product_ids << 32) | days
+
+def _read_month(connection: Connection, month: date) -> pa.Table:
+    price = type_coerce(PriceHistory.price, Integer)
+    rows = connection.execute(
+        select(
+            PriceHistory.id, PriceHistory.product_id, PriceHistory.event_id, price,
+            PriceHistory.price_change_reason, PriceHistory.price_source,
+            PriceHistory.recorded_date, PriceHistory.created_at
+        ).where(
+            PriceHistory.recorded_date >= month,
+            PriceHistory.recorded_date < add_months(month, 1)
+        ).order_by(PriceHistory.product_id, PriceHistory.recorded_date)
+    ).all()
+
+    columns = list(zip(*rows)) if rows else [[] for _ in ARCHIVE_SCHEMA]
+    return pa.Table.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, ARCHIVE_SCHEMA)],
+        schema=ARCHIVE_SCHEMA
+    )
+
+def _write_bucket(path: Path, table: pa.Table) -> None:
+    """
+    Writes the rows of a bucket, merged with the file already archived
+
+    Rows of the database replace archived rows of the same product and day.
+    The file is replaced atomically, an interrupted run leaves it as it was.
+    """
+    if path.exists():
+        archived = pq.read_table(path, schema=ARCHIVE_SCHEMA)
+        kept = archived.filter(pa.array(~np.isin(_snapshot_keys(archived), _snapshot_keys(table))))
+        table = pa.concat_tables([kept, table]).sort_by(SORT_KEYS)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(".tmp")
+    pq.write_table(
+        table, temporary,
+        row_group_size=ROW_GROUP_SIZE,
+        compression="zstd",
+        use_dictionary=["price_change_reason", "price_source"]
+    )
+    os.replace(temporary, path)
+
+def archive_history(before: date, engine: Optional[Engine] = None) -> List[date]:
+    """
+    Moves the snapshots of the months before the month of before to Parquet
+
+    Every month is written to its bucket files first, then the months are
+    removed from price_histories: partitioned MySQL tables drop their
+    partitions, others delete the rows. A failed run can be started again,
+    already archived rows are merged instead of duplicated.
+
+    Args:
+        before: Any day of the first month kept in the database
+        engine: Database engine, defaults to the configured one
+
+    Returns:
+        Archived months
+    """
+    engine = engine or database.engine
+    root = archive_root()
+    cutoff = month_start(before)
+
+    with engine.connect() as connection:
+        first_recorded = connection.scalar(
+            select(func.min(PriceHistory.recorded_date)).where(PriceHistory.recorded_date < cutoff)
+        )
+        if first_recorded is None:
+            print(f"[ARCHIVE] No snapshot before {cutoff}.")
+            return []
+
+        months = []
+        for month in months_between(first_recorded, cutoff - timedelta(days=1)):
+            table = _read_month(connection, month)
+            if not table.num_rows:
+                continue
+
+            buckets = table["product_id"].to_numpy() % ARCHIVE_BUCKETS
+            for bucket in np.unique(buckets):
+                _write_bucket(archive_path(root, month, int(bucket)), table.filter(pa.array(buckets == bucket)))
+
+            months.append(month)
+            print(f"[ARCHIVE] {month:%Y-%m}: {table.num_rows} snapshots written.")
+
+    expire_before(cutoff, archive=False, keep_rollups=True, engine=engine)
+    print(f"[ARCHIVE] Archived {len(months)} months before {cutoff} to {root}")
+    return months
+
+def _archive_files(start_date: Optional[date], end_date: Optional[date], bucket: Optional[int] = None) -> Iterator[Path]:
+    """
+    Files of the archived months overlapping the dates, of one bucket or all of them
+    """
+    root = archive_root()
+    buckets = range(ARCHIVE_BUCKETS) if bucket is None else [bucket]
+    for month in archived_months():
+        if (start_date and add_months(month, 1) <= start_date) or (end_date and month > end_date):
+            continue
+        for month_bucket in buckets:
+            path = archive_path(root, month, month_bucket)
+            if path.exists():
+                yield path
+
+def _date_filters(start_date: Optional[date], end_date: Optional[date]) -> list:
+    filters = []
+    if start_date:
+        filters.append(("recorded_date", ">=", start_date))
+    if end_date:
+        filters.append(("recorded_date", "<=", end_date))
+    return filters
+
+def read_archive(product_id: int,
+                 start_date: Optional[date] = None,
+                 end_date: Optional[date] = None) -> pa.Table:
+    """
+    Archived snapshots of the product between the dates, unbounded sides when None
+
+    Only the bucket file of the product in the months of the range is read.
+    """
+    filters = [("product_id", "=", product_id)] + _date_filters(start_date, end_date)
+    tables = [
+        pq.read_table(path, schema=ARCHIVE_SCHEMA, filters=filters)
+        for path in _archive_files(start_date, end_date, product_bucket(product_id))
+    ]
+
+    if not tables:
+        return ARCHIVE_SCHEMA.empty_table()
+    return pa.concat_tables(tables).sort_by(SORT_KEYS)
+
+def read_archive_files(start_date: Optional[date] = None,
+                       end_date: Optional[date] = None,
+                       product_ids: Optional[Sequence[int]] = None) -> Iterator[pa.Table]:
+    """
+    Archived snapshots between the dates, one table per bucket file, of the products if given
+    """
+    filters = _date_filters(start_date, end_date)
+    if product_ids:
+        filters.append(("product_id", "in", list(product_ids)))
+
+    for path in _archive_files(start_date, end_date):
+        yield pq.read_table(path, schema=ARCHIVE_SCHEMA, filters=filters or None)
+
+def archived_product_ids(start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[int]:
+    """
+    Products with archived snapshots between the dates, only their product_id column is read
+    """
+    product_ids = set()
+    for path in _archive_files(start_date, end_date):
+        table = pq.read_table(path, columns=["product_id"], filters=_date_filters(start_date, end_date) or None)
+        product_ids.update(pc.unique(table["product_id"]).to_pylist())
+    return sorted(product_ids)
+
+def archived_snapshots(product_id: int,
+                       start_date: Optional[date] = None,
+                       end_date: Optional[date] = None) -> List[PriceHistory]:
+    """
+    Archived snapshots of the product between the dates, as transient PriceHistory objects
+    """
+    return [
+        PriceHistory(
+            id=row["id"],
+            product_id=row["product_id"],
+            event_id=row["event_id"],
+            price=row["price_cents"] / 100,
+            price_change_reason=row["price_change_reason"],
+            price_source=row["price_source"],
+            recorded_date=row["recorded_date"],
+            created_at=row["created_at"]
+        )
+        for row in read_archive(product_id, start_date, end_date).to_pylist()
+    ]
+
+def _aggregate_prices(prices: np.ndarray) -> Tuple[int, int, Optional[int], Optional[int], int]:
+    if not len(prices):
+        return 0, 0, None, None, 0
+    return len(prices), int(prices.sum()), int(prices.min()), int(prices.max()), int((prices * prices).sum())
+
+def _window_masks(table: pa.Table, windows: Dict[str, Tuple[date, date]]) -> Dict[str, np.ndarray]:
+    days = table["recorded_date"].to_numpy()
+    return {
+        name: (days >= np.datetime64(start_date)) & (days <= np.datetime64(end_date))
+        for name, (start_date, end_date) in windows.items()
+    }
+
+def _windows_span(windows: Dict[str, Tuple[date, date]]) -> Tuple[date, date]:
+    return min(start_date for start_date, _ in windows.values()), max(end_date for _, end_date in windows.values())
+
+def aggregate_archive_windows(product_id: int,
+                              windows: Dict[str, Tuple[date, date]]) -> Dict[str, Tuple[int, int, Optional[int], Optional[int], int]]:
+    """
+    Snapshot count, sum, min, max and sum of squares of the archived prices in cents of every window
+
+    The archived snapshots spanning all windows are read once.
+    """
+    table = read_archive(product_id, *_windows_span(windows))
+    prices = table["price_cents"].to_numpy().astype(np.int64)
+    return {name: _aggregate_prices(prices[mask]) for name, mask in _window_masks(table, windows).items()}
+
+def aggregate_catalog_archive_windows(windows: Dict[str, Tuple[date, date]]) -> Dict[int, Dict[str, Tuple[int, int, Optional[int], Optional[int], int]]]:
+    """
+    Aggregates of every window for every archived product, reading every bucket of the months spanned once
+    """
+    start_date, end_date = _windows_span(windows)
+    filters = _date_filters(start_date, end_date)
+    tables = [pq.read_table(path, schema=ARCHIVE_SCHEMA, filters=filters) for path in _archive_files(start_date, end_date)]
+    if not tables:
+        return {}
+
+    table = pa.concat_tables(tables)
+    prices = table["price_cents"].cast(pa.int64())
+    columns = pa.table({"product_id": table["product_id"], "price": prices, "square": pc.multiply(prices, prices)})
+
+    aggregates = {}
+    for name, mask in _window_masks(table, windows).items():
+        grouped = columns.filter(pa.array(mask)).group_by("product_id").aggregate([
+            ("price", "count"), ("price", "sum"), ("price", "min"), ("price", "max"), ("square", "sum")
+        ])
+        for row in grouped.to_pylist():
+            aggregates.setdefault(row["product_id"], {})[name] = (
+                row["price_count"], row["price_sum"], row["price_min"], row["price_max"], row["square_sum"]
+            )
+    return aggregates
+
+def aggregate_archive(product_id: int, start_date: date, end_date: date) -> Tuple[int, int, Optional[int], Optional[int], int]:
+    """
+    Snapshot count, sum, min, max and sum of squares of the archived prices in cents between two dates
+    """
+    return aggregate_archive_windows(product_id, {"range": (start_date, end_date)})["range"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold history archive of price_histories in Parquet")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="List the archived months")
+
+    archive_parser = subparsers.add_parser("archive", help="Move the months before a cutoff to the archive")
+    archive_parser.add_argument("--before", type=date.fromisoformat, required=True,
+                                help="Any day of the first month kept in the database (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for month in archived_months():
+            print(f"{month:%Y-%m}")
+    else:
+        archive_history(args.before)
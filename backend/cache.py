@@ -0,0 +1,259 @@
+"""
+Versioned response cache of the analytics endpoints
+
+Analytics answers only change when snapshots or events are written, so
+responses are cached under their endpoint, their parameters and the
+versions of the data they read:
+
+- data_versions "prices": bumped by ingestion and backfills, which write many products
+- products.data_version: bumped by writes to a few products, the others keep their entries
+- data_versions "events": bumped by event CRUD
+
+Writers bump the versions in the transaction of their writes, so every
+worker switches to new keys as soon as the data is committed. Entries of
+older versions are never read again and age out, by LRU eviction or
+Redis expiry. Reading the versions costs one primary key query per request.
+"""
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Optional, Any, Callable, Dict, Sequence
+from urllib.parse import urlencode
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import literal, select, union_all, update
+from sqlalchemy.orm import Session
+
+from backend.models import DataVersion, Product
+from shared.config import get_settings
+from shared.constants import CacheBackend, DataScope
+
+# Writes to more products than this bump the prices scope instead of every product
+PRODUCT_VERSION_LIMIT = 100
+
+# --------------------------------------------------
+# Data versions
+# --------------------------------------------------
+
+def _bump_scope(db: Session, scope: DataScope) -> None:
+    db.execute(
+        update(DataVersion).where(DataVersion.scope == scope.value).values(version=DataVersion.version + 1)
+    )
+
+def bump_price_versions(db: Session, product_ids: Optional[Sequence[int]] = None) -> None:
+    """
+    Invalidates the cached analytics of the products, in the transaction of their writes
+
+    Args:
+        db: Database session
+        product_ids: Written products, all of them if None
+    """
+    if product_ids is None or len(product_ids) > PRODUCT_VERSION_LIMIT:
+        _bump_scope(db, DataScope.Prices)
+        return
+
+    if product_ids:
+        db.execute(
+            update(Product)
+            .where(Product.product_id.in_(set(product_ids)))
+            .values(data_version=Product.data_version + 1)
+        )
+
+def bump_event_version(db: Session) -> None:
+    """
+    Invalidates every cached analytics response after an event change, in its transaction
+    """
+    _bump_scope(db, DataScope.Events)
+
+def read_data_versions(db: Session, product_id: Optional[int] = None) -> Dict[str, int]:
+    """
+    Versions of the global scopes and of the product, in one query
+    """
+    parts = [select(DataVersion.scope, DataVersion.version)]
+    if product_id is not None:
+        parts.append(select(literal("product"), Product.data_version).where(Product.product_id == product_id))
+    return {scope: int(version) for scope, version in db.execute(union_all(*parts)).all()}
+
+# --------------------------------------------------
+# Backends
+# --------------------------------------------------
+
+@dataclass
+class CacheMetrics:
+    """Lookups and stores of the response cache in this process"""
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+class ResponseCache:
+    """Response bodies by key, with hit and miss metrics"""
+    backend = CacheBackend.Disabled
+
+    def __init__(self):
+        self.metrics = CacheMetrics()
+        self._metrics_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def _count(self, **counts: int) -> None:
+        with self._metrics_lock:
+            for name, count in counts.items():
+                setattr(self.metrics, name, getattr(self.metrics, name) + count)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            return {"backend": self.backend.value, **asdict(self.metrics), "entries": None, "bytes": None}
+
+class LRUCache(ResponseCache):
+    """In-process cache evicting the least recently used entries past its bounds"""
+    backend = CacheBackend.LRU
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        self._count(hits=value is not None, misses=value is None)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+
+        evicted = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            self._bytes -= len(previous) if previous is not None else 0
+            self._entries[key] = value
+            self._bytes += len(value)
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, oldest = self._entries.popitem(last=False)
+                self._bytes -= len(oldest)
+                evicted += 1
+        self._count(stores=1, evictions=evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            stats.update(entries=len(self._entries), bytes=self._bytes)
+        return stats
+
+class RedisCache(ResponseCache):
+    """Cache shared by the workers in a Redis-compatible server, entries expire after ttl_seconds"""
+    backend = CacheBackend.Redis
+
+    # Keys of this cache, clear() only deletes them
+    prefix = "analytics:"
+
+    def __init__(self, url: str, ttl_seconds: int):
+        super().__init__()
+        # Only needed with CACHE_BACKEND=redis
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.client.get(self.prefix + key)
+        self._count(hits=value is not None, misses=value is None)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        self.client.set(self.prefix + key, value, ex=self.ttl_seconds)
+        self._count(stores=1)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """
+    Process-wide response cache of the configured backend
+    """
+    global _response_cache
+
+    with _response_cache_lock:
+        if _response_cache is None:
+            settings = get_settings()
+            backend = CacheBackend(settings.cache_backend)
+            if backend == CacheBackend.LRU:
+                _response_cache = LRUCache(int(settings.cache_max_entries), int(settings.cache_max_bytes))
+            elif backend == CacheBackend.Redis:
+                _response_cache = RedisCache(settings.cache_redis_url, int(settings.cache_ttl_seconds))
+            else:
+                _response_cache = ResponseCache()
+        return _response_cache
+
+# --------------------------------------------------
+# Endpoints
+# --------------------------------------------------
+
+def cache_key(endpoint: str, params: Dict[str, Any], versions: Dict[str, int]) -> str:
+    query = urlencode(sorted((name, json.dumps(value, default=str)) for name, value in params.items()))
+    version = ".".join(f"{scope}{versions[scope]}" for scope in sorted(versions))
+    return f"{endpoint}?{query}#{version}"
+
+def cached_response(db: Session,
+                    endpoint: str,
+                    params: Dict[str, Any],
+                    response_type: Any,
+                    compute: Callable[[Dict[str, int]], Any],
+                    product_id: Optional[int] = None) -> Response:
+    """
+    JSON response of compute, served from the cache while the data it reads is unchanged
+
+    Args:
+        db: Database session
+        endpoint: Path of the endpoint
+        params: Parameters the response depends on
+        response_type: Response model, or a type like List[Model]
+        compute: Builds the response data from the data versions of the key,
+            which are empty when the cache is disabled. Readers of versioned
+            state (the event calendar) use them so the data matches the key.
+            HTTPExceptions it raises are not cached
+        product_id: Product whose own version is part of the key
+
+    Returns:
+        Response with the JSON body
+    """
+    cache = get_response_cache()
+    versions = {}
+    body = None
+    if cache.backend != CacheBackend.Disabled:
+        versions = read_data_versions(db, product_id)
+        key = cache_key(endpoint, params, versions)
+        body = cache.get(key)
+
+    if body is None:
+        adapter = TypeAdapter(response_type)
+        body = adapter.dump_json(adapter.validate_python(compute(versions), from_attributes=True))
+        if cache.backend != CacheBackend.Disabled:
+            cache.set(key, body)
+
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,54 @@
+"""Compact column types, storing prices and labels as small integers"""
+from typing import Optional, Tuple
+from sqlalchemy import Integer, SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+class Cents(TypeDecorator):
+    """
+    Price in currency units, stored as integer cents
+
+    Averages of cents are fractional, so read values are not rounded.
+    """
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[float], dialect) -> Optional[int]:
+        if value is None:
+            return None
+        return int(round(value * 100))
+
+    def process_result_value(self, value, dialect) -> Optional[float]:
+        if value is None:
+            return None
+        return float(value) / 100
+
+class Code(TypeDecorator):
+    """
+    Label out of a fixed list, stored as its position in the list
+
+    The list is append-only: stored codes refer to positions, so existing
+    labels must never be reordered or removed.
+
+    Usage:
+        price_source = Column(Code(("real", "synthetic")))
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, labels: Tuple[str, ...]):
+        super().__init__()
+        self.labels = tuple(labels)
+        self._codes = {label: code for code, label in enumerate(self.labels)}
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[int]:
+        if value is None:
+            return None
+        try:
+            return self._codes[value]
+        except KeyError:
+            raise ValueError(f"Unknown label {value!r}, expected one of {', '.join(self.labels)}") from None
+
+    def process_result_value(self, value: Optional[int], dialect) -> Optional[str]:
+        if value is None:
+            return None
+        return self.labels[value]
@@ -0,0 +1,164 @@
+"""Leader election between API workers, pods and scripts sharing a database"""
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Iterator
+from sqlalchemy import Engine, Connection, text
+
+from backend import database
+
+# Seconds between two attempts on locks without a blocking wait
+LOCK_POLL_INTERVAL = 0.05
+
+# Lock names
+SETUP_LOCK = "setup"
+# Every writer of price snapshots: seeding, scheduled catch-ups, backfills and ingestion scripts
+INGESTION_LOCK = "ingestion"
+
+class MySQLLock:
+    """
+    MySQL named lock, held by one dedicated connection until released
+
+    GET_LOCK locks are released by the server when the connection drops,
+    so a crashed leader never blocks the others.
+    """
+
+    def __init__(self, engine: Engine, name: str):
+        # Lock names are server wide, scope them to the database (64 characters at most)
+        self.name = f"{engine.url.database}.{name}"[:64]
+        self.engine = engine
+        self._connection: Optional[Connection] = None
+
+    def acquire(self, timeout: float) -> bool:
+        connection = self.engine.connect()
+        try:
+            acquired = connection.scalar(text("SELECT GET_LOCK(:name, :timeout)"), {"name": self.name, "timeout": timeout})
+        except Exception:
+            connection.close()
+            raise
+
+        if acquired != 1:
+            connection.close()
+            return False
+
+        self._connection = connection
+        return True
+
+    def release(self) -> None:
+        try:
+            self._connection.scalar(text("SELECT RELEASE_LOCK(:name)"), {"name": self.name})
+        finally:
+            self._connection.close()
+            self._connection = None
+
+class FileLock:
+    """
+    Exclusive flock on a lock file, for SQLite databases on a single host
+
+    The kernel releases the lock when the process exits.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self, timeout: float) -> bool:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        lock_file = open(self.path, "a")
+        deadline = time.monotonic() + timeout
+
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._file = lock_file
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    lock_file.close()
+                    return False
+                time.sleep(LOCK_POLL_INTERVAL)
+
+    def release(self) -> None:
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
+
+def create_lock(engine: Engine, name: str):
+    """
+    Returns the lock named name for the database of engine
+
+    MySQL uses GET_LOCK. Other databases fall back to a file lock next to
+    the SQLite database file, or in the temporary directory.
+    """
+    if engine.dialect.name == "mysql":
+        return MySQLLock(engine, name)
+
+    directory = tempfile.gettempdir()
+    if engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+        directory = os.path.dirname(os.path.abspath(engine.url.database))
+        name = f"{os.path.basename(engine.url.database)}.{name}"
+
+    return FileLock(os.path.join(directory, f"{name}.lock"))
+
+@dataclass
+class LockMetrics:
+    """Acquisition counts and wait times of a named lock in this process"""
+    acquired: int = 0
+    skipped: int = 0
+    held: bool = False
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    last_wait_seconds: Optional[float] = None
+    last_held_seconds: Optional[float] = None
+
+_metrics: Dict[str, LockMetrics] = {}
+_metrics_lock = threading.Lock()
+
+def get_lock_metrics() -> Dict[str, dict]:
+    """Metrics of every lock this process tried to acquire"""
+    with _metrics_lock:
+        return {name: asdict(metrics) for name, metrics in _metrics.items()}
+
+@contextmanager
+def leader(name: str, timeout: float = 0, engine: Optional[Engine] = None) -> Iterator[bool]:
+    """
+    Elects one leader among the processes sharing the database
+
+    Yields whether this process holds the lock. Others waited at most
+    timeout seconds and should skip the work.
+
+    Usage:
+        with leader(INGESTION_LOCK) as is_leader:
+            if is_leader:
+                ...
+    """
+    lock = create_lock(engine or database.engine, name)
+
+    started_at = time.perf_counter()
+    acquired = lock.acquire(timeout)
+    wait_seconds = time.perf_counter() - started_at
+
+    with _metrics_lock:
+        metrics = _metrics.setdefault(name, LockMetrics())
+        metrics.acquired += acquired
+        metrics.skipped += not acquired
+        metrics.held = metrics.held or acquired
+        metrics.total_wait_seconds = round(metrics.total_wait_seconds + wait_seconds, 6)
+        metrics.max_wait_seconds = round(max(metrics.max_wait_seconds, wait_seconds), 6)
+        metrics.last_wait_seconds = round(wait_seconds, 6)
+
+    held_since = time.perf_counter()
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
+            with _metrics_lock:
+                metrics.held = False
+                metrics.last_held_seconds = round(time.perf_counter() - held_since, 6)
@@ -1,28 +1,84 @@
 """Database connection and session managements"""
-from sqlalchemy import create_engine
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, Connection, Engine
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
-from typing import Generator
+from typing import Generator, Optional, List
 
 from shared.config import get_settings
 from backend.models import Base
 
 settings = get_settings()
 
+def create_db_engine(database_url: Optional[str] = None) -> Engine:
+    """
+    Create an engine for the configured database, or for database_url if given
+    """
+    database_url = database_url or settings.database_url
+
+    connect_args = {}
+    if database_url.startswith("sqlite"):
+        # SQLite stand-in: allow use across threads and wait on locks held by other processes
+        connect_args = {"check_same_thread": False, "timeout": 30}
+
+    return create_engine(
+        database_url,
+        echo=False,  # Set to true for SQL query logging
+        pool_pre_ping=True, # Verify connections before using
+        pool_recycle=3600, # Recycle connections after 1 hour
+        connect_args=connect_args,
+    )
+
 # Create engine
-engine = create_engine(
-    settings.database_url,
-    echo=False,  # Set to true for SQL query logging
-    pool_pre_ping=True, # Verify connections before using
-    pool_recycle=3600, # Recycle connections after 1 hour
-)
+engine = create_db_engine()
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def init_db():
-    """Initialize database by creating all tables"""
-    Base.metadata.create_all(bind=engine)
+# Alembic configuration of the migrations in migrations/
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+def alembic_config(connection: Connection) -> Config:
+    """
+    Alembic configuration running the migrations over connection
+    """
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    config.attributes["connection"] = connection
+    return config
+
+def init_db(bind: Optional[Engine] = None) -> List[str]:
+    """
+    Bring the database schema to the latest migration
+
+    Empty databases get every table at once and are stamped at the head
+    revision. Migrated databases run their pending migrations, which also
+    add the columns missing from existing tables. Databases created before
+    the migrations have no revision to start from: only their missing
+    tables are created until they are stamped, see README.
+
+    Args:
+        bind: Database engine, defaults to the configured one
+
+    Returns:
+        Names of the created tables
+    """
+    bind = bind or engine
+    existing_tables = set(inspect(bind).get_table_names())
+
+    with bind.begin() as connection:
+        if not existing_tables:
+            Base.metadata.create_all(bind=connection)
+            command.stamp(alembic_config(connection), "head")
+        elif "alembic_version" in existing_tables:
+            command.upgrade(alembic_config(connection), "head")
+        else:
+            print("[DATABASE] No migration revision stored, run alembic stamp and alembic upgrade head.")
+            Base.metadata.create_all(bind=connection)
+
+    return sorted(set(inspect(bind).get_table_names()) - existing_tables - {"alembic_version"})
 
 def get_db() -> Generator[Session, None, None]:
     """
@@ -0,0 +1,326 @@
+"""Multi-day price backfill in a single pass"""
+import argparse
+import queue
+import threading
+from itertools import islice
+from typing import Optional, Iterator, List, Tuple, Callable
+from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend.archive import ensure_not_archived
+from backend.coordination import INGESTION_LOCK, leader
+from backend.database import SessionLocal
+from backend.api.events.calendar import EventCalendar, get_event_calendar
+from backend.ingestion.fetch_products import fetch_all_products
+from backend.ingestion.daily_ingestion import PRICING_MODE, resolve_products
+from backend.ingestion.journal import RunJournal, resume_or_start_run, finish_run
+from backend.ingestion.rollups import refresh_rollups
+from backend.cache import bump_price_versions
+from backend.ingestion.upsert import write_price_snapshots
+from backend.ingestion.price_engine import PriceMatrix, generate_price_matrix
+from shared.config import get_settings
+from shared.constants import PRICE_CHANGE_REASONS, NO_EVENT_ID, UpsertPolicy
+
+BACKFILL_BATCH_SIZE = 10000
+BACKFILL_CHUNK_DAYS = 31
+BACKFILL_RUN_KIND = "backfill"
+
+def iter_date_chunks(start_date: date, end_date: date, chunk_days: int) -> Iterator[Tuple[date, date]]:
+    """
+    Splits the range into consecutive (chunk_start, chunk_end) ranges of at most chunk_days days
+    """
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        yield chunk_start, chunk_end
+        chunk_start = chunk_end + timedelta(days=1)
+
+def iter_snapshot_rows(product_ids: List[int], matrix: PriceMatrix) -> Iterator[dict]:
+    """
+    Yields insert values for every snapshot of the matrix
+    """
+    price_source = PRICING_MODE.value
+
+    for day_index, recorded_date in enumerate(matrix.dates):
+        prices = matrix.prices[:, day_index].tolist()
+        reason_codes = matrix.reason_codes[:, day_index].tolist()
+        event_ids = matrix.event_ids[:, day_index].tolist()
+
+        for product_index, product_id in enumerate(product_ids):
+            event_id = event_ids[product_index]
+            yield {
+                "product_id": product_id,
+                "event_id": None if event_id == NO_EVENT_ID else event_id,
+                "price": prices[product_index],
+                "price_change_reason": PRICE_CHANGE_REASONS[reason_codes[product_index]],
+                "price_source": price_source,
+                "recorded_date": recorded_date
+            }
+
+def backfill_range(db: Session,
+                   product_ids: List[int],
+                   base_prices: np.ndarray,
+                   calendar: EventCalendar,
+                   start_date: date,
+                   end_date: date,
+                   seed: int,
+                   batch_size: int = BACKFILL_BATCH_SIZE,
+                   chunk_days: int = BACKFILL_CHUNK_DAYS,
+                   policy: UpsertPolicy = UpsertPolicy.Skip,
+                   journal: Optional[RunJournal] = None,
+                   on_chunk: Optional[Callable[[date, date, int], None]] = None,
+                   rollups: bool = True) -> int:
+    """
+    Generates and writes the snapshots of the given products between two dates
+
+    Args:
+        db: Database session
+        product_ids: Products to price
+        base_prices: Base price of every product
+        calendar: Event calendar to resolve events from
+        start_date: First day
+        end_date: Last day, inclusive
+        seed: Seed of the run
+        batch_size: Rows per multi-row upsert and commit
+        chunk_days: Days priced at once
+        policy: What to do with snapshots that already exist
+        journal: Run journal, chunks it lists as completed are skipped and finished ones are recorded
+        on_chunk: Called with (chunk_start, chunk_end, inserted_snapshots) after every chunk
+        rollups: Refresh the monthly rollups and bump the cache versions of every chunk, committed with its journal entry
+
+    Returns:
+        Number of inserted or changed snapshots
+    """
+    inserted_snapshots = 0
+
+    for chunk_start, chunk_end in iter_date_chunks(start_date, end_date, chunk_days):
+        if journal and journal.is_completed(chunk_start, chunk_end):
+            continue
+
+        chunk_started_at = datetime.now()
+        matrix = generate_price_matrix(
+            product_ids, base_prices, chunk_start, chunk_end, calendar, PRICING_MODE, seed
+        )
+
+        chunk_rows = 0
+        chunk_snapshots = 0
+        rows = iter_snapshot_rows(product_ids, matrix)
+        while batch := list(islice(rows, batch_size)):
+            chunk_rows += len(batch)
+            chunk_snapshots += write_price_snapshots(db, batch, policy, batch_size)
+            db.commit()
+
+        inserted_snapshots += chunk_snapshots
+        if rollups:
+            refresh_rollups(db, chunk_start, chunk_end, product_ids)
+            bump_price_versions(db, product_ids)
+        if journal:
+            elapsed = (datetime.now() - chunk_started_at).total_seconds()
+            journal.record_chunk(db, chunk_start, chunk_end, chunk_rows, chunk_snapshots, elapsed)
+        db.commit()
+
+        if on_chunk:
+            on_chunk(chunk_start, chunk_end, inserted_snapshots)
+
+    return inserted_snapshots
+
+def prepare_catalog(db: Session,
+                    batch_size: int = BACKFILL_BATCH_SIZE,
+                    cache_stats: Optional[dict] = None) -> Tuple[List[int], np.ndarray, int, int]:
+    """
+    Fetches the catalog once and resolves its products, ordered by product_id
+
+    Args:
+        cache_stats: Updated with the response cache hits and misses of the fetch
+
+    Returns:
+        Product IDs, base prices, fetched product count and inserted product count
+    """
+    products_data = fetch_all_products(cache_stats=cache_stats)
+    products, inserted_products = resolve_products(db, products_data, batch_size)
+    db.commit()
+
+    products = sorted(products.values(), key=lambda product: product.product_id)
+    product_ids = [product.product_id for product in products]
+    base_prices = np.array([product.base_price for product in products], dtype=np.float64)
+
+    return product_ids, base_prices, len(products_data), inserted_products
+
+def run_backfill(start_date: date,
+                 end_date: date,
+                 batch_size: int = BACKFILL_BATCH_SIZE,
+                 chunk_days: int = BACKFILL_CHUNK_DAYS,
+                 seed: Optional[int] = None,
+                 policy: UpsertPolicy = UpsertPolicy.Skip,
+                 resume: bool = False,
+                 progress: bool = True,
+                 on_start: Optional[Callable[[int], None]] = None) -> dict:
+    """
+    Backfills daily price snapshots for every product between two dates
+
+    Fetches the catalog and resolves products once, then generates the
+    snapshots chunk by chunk and upserts them in batches of batch_size rows.
+    Existing snapshots are resolved by policy, so reruns are safe.
+
+    Every run is recorded in the ingestion_runs journal along with its
+    completed chunks. With resume, the latest unfinished run with the same
+    range, seed and policy is picked up and its completed chunks are skipped.
+
+    Args:
+        start_date: First day to backfill
+        end_date: Last day to backfill, inclusive
+        batch_size: Rows per multi-row upsert and commit
+        chunk_days: Days priced at once
+        seed: Seed of the price streams, PRICE_SEED setting by default
+        policy: What to do with snapshots that already exist
+        resume: Continue the latest unfinished matching run instead of starting over
+        progress: Print progress after every chunk
+        on_start: Called with the run_id once the run is recorded in the journal
+
+    Returns:
+        Run summary with inserted row counts
+
+    Raises:
+        ValueError if the range is empty or overlaps an archived month
+    """
+    if end_date < start_date:
+        raise ValueError(f"end_date {end_date} is before start_date {start_date}")
+    ensure_not_archived(start_date, end_date)
+
+    db = SessionLocal()
+    started_at = datetime.now()
+    total_days = (end_date - start_date).days + 1
+    if seed is None:
+        seed = get_settings().price_seed
+
+    def report(chunk_start: date, chunk_end: date, inserted_snapshots: int) -> None:
+        done_days = (chunk_end - start_date).days + 1
+        elapsed = (datetime.now() - started_at).total_seconds()
+        print(
+            f"[BACKFILL] {chunk_start} - {chunk_end}: {done_days}/{total_days} days "
+            f"({done_days / total_days:.0%}), {inserted_snapshots} snapshots, "
+            f"{inserted_snapshots / max(elapsed, 1e-9):.0f} rows/s"
+        )
+
+    run, journal = resume_or_start_run(db, BACKFILL_RUN_KIND, start_date, end_date, chunk_days, seed, policy, resume)
+    run_id = run.run_id
+    chunk_days = run.chunk_days
+    if on_start:
+        on_start(run_id)
+    if journal.completed:
+        print(f"[BACKFILL] Resuming run {run_id}, skipping {len(journal.completed)} completed chunks.")
+
+    cache_stats = {}
+    try:
+        product_ids, base_prices, fetched_products, inserted_products = prepare_catalog(db, batch_size, cache_stats)
+        calendar = get_event_calendar(db)
+
+        inserted_snapshots = backfill_range(
+            db,
+            product_ids,
+            base_prices,
+            calendar,
+            start_date,
+            end_date,
+            seed,
+            batch_size=batch_size,
+            chunk_days=chunk_days,
+            policy=policy,
+            journal=journal,
+            on_chunk=report if progress else None
+        )
+        finish_run(db, run)
+
+    except Exception as e:
+        db.rollback()
+        finish_run(db, run, error=e)
+        raise e
+    finally:
+        db.close()
+
+    summary = {
+        "run_id": run_id,
+        "skipped_chunks": len(journal.completed),
+        "start_date": start_date,
+        "end_date": end_date,
+        "seed": seed,
+        "policy": policy.value,
+        "fetched_products": fetched_products,
+        "inserted_products": inserted_products,
+        "inserted_snapshots": inserted_snapshots,
+        **cache_stats,
+        "elapsed_seconds": round((datetime.now() - started_at).total_seconds(), 3),
+    }
+    print(
+        f"[BACKFILL] {inserted_snapshots} price snapshots and {inserted_products} products inserted "
+        f"in {summary['elapsed_seconds']}s."
+    )
+    return summary
+
+def start_backfill(start_date: date,
+                   end_date: date,
+                   seed: Optional[int] = None,
+                   policy: UpsertPolicy = UpsertPolicy.Skip,
+                   resume: bool = False) -> Optional[int]:
+    """
+    Runs a backfill in a background thread of this process, under the ingestion lock
+
+    Returns once the run is recorded in the journal, the thread keeps the
+    lock until the backfill finishes. Its progress is in ingestion_runs.
+
+    Returns:
+        run_id of the started or resumed run, None if another process holds the ingestion lock
+
+    Raises:
+        Errors raised before the run is recorded, e.g. ValueError for an invalid
+        or archived range
+    """
+    started = queue.Queue()
+
+    def run() -> None:
+        try:
+            with leader(INGESTION_LOCK) as is_leader:
+                if not is_leader:
+                    started.put(None)
+                    return
+                run_backfill(start_date, end_date, seed=seed, policy=policy, resume=resume,
+                             progress=False, on_start=started.put)
+        except Exception as e:
+            # Failures after the start are recorded on the run by run_backfill
+            started.put(e)
+
+    threading.Thread(target=run, name="api-backfill", daemon=True).start()
+
+    result = started.get()
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill daily price snapshots for a date range")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, required=True, help="Last day, inclusive (YYYY-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="Rows per upsert and commit")
+    parser.add_argument("--chunk-days", type=int, default=BACKFILL_CHUNK_DAYS, help="Days generated at once")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the price streams")
+    parser.add_argument("--policy", choices=[policy.value for policy in UpsertPolicy], default=UpsertPolicy.Skip.value,
+                        help="What to do with existing snapshots")
+    parser.add_argument("--resume", action="store_true", help="Continue the latest unfinished run with the same arguments")
+    parser.add_argument("--quiet", action="store_true", help="Do not print progress")
+    args = parser.parse_args()
+
+    with leader(INGESTION_LOCK) as is_leader:
+        if not is_leader:
+            parser.exit(1, "[BACKFILL] Another process is ingesting prices, try again once it finishes.\n")
+
+        run_backfill(
+            args.start,
+            args.end,
+            batch_size=args.batch_size,
+            chunk_days=args.chunk_days,
+            seed=args.seed,
+            policy=UpsertPolicy(args.policy),
+            resume=args.resume,
+            progress=not args.quiet
+        )
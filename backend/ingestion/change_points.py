@@ -0,0 +1,300 @@
+"""
+Change-point storage of price snapshots (SCD type 2)
+
+With PRICE_STORAGE=change_points, snapshots are stored in price_ranges as
+runs of consecutive days over which a product kept the same price, event,
+reason and source. A day repeating the day before only moves the valid_to
+of the current run, so stable catalogs write a new row only when a price
+changes. Missing days stay missing: a run only covers observed days.
+
+Readers expand the runs back to daily snapshots or aggregate them with
+their day counts, next to the snapshots of price_histories.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional, Dict, Iterable, List, Tuple
+from sqlalchemy import Integer, bindparam, delete, insert, select, type_coerce, update
+from sqlalchemy.orm import Session
+
+from backend.models import PriceHistory, PriceRange
+from backend.ingestion.pipeline import chunked
+from shared.constants import UpsertPolicy
+
+# Products whose runs are loaded per query
+RANGE_LOOKUP_SIZE = 1000
+
+ONE_DAY = timedelta(days=1)
+
+# event_id, price in cents, price_change_reason, price_source
+Values = Tuple[Optional[int], int, Optional[str], Optional[str]]
+
+# Snapshot count, sum, min, max and sum of squares of prices in cents
+Aggregate = Tuple[int, int, Optional[int], Optional[int], int]
+
+@dataclass
+class Segment:
+    """Run of days with the same values, range_id is None until it is stored"""
+    valid_from: date
+    valid_to: date
+    values: Values
+    range_id: Optional[int] = None
+
+def snapshot_values(snapshot: dict) -> Values:
+    return (
+        snapshot.get("event_id"),
+        int(round(snapshot["price"] * 100)),
+        snapshot.get("price_change_reason"),
+        snapshot.get("price_source")
+    )
+
+def merge_segments(segments: List[Segment]) -> List[Segment]:
+    """
+    Sorts segments and joins the contiguous ones with the same values
+
+    A joined segment keeps the first stored range_id of its parts.
+    """
+    merged = []
+    for segment in sorted(segments, key=lambda segment: segment.valid_from):
+        last = merged[-1] if merged else None
+        if last and last.values == segment.values and last.valid_to + ONE_DAY == segment.valid_from:
+            last.valid_to = segment.valid_to
+            last.range_id = last.range_id or segment.range_id
+        else:
+            merged.append(Segment(segment.valid_from, segment.valid_to, segment.values, segment.range_id))
+    return merged
+
+def apply_snapshot(segments: List[Segment],
+                   day: date,
+                   values: Values,
+                   policy: UpsertPolicy) -> Tuple[List[Segment], bool]:
+    """
+    Records the values of a day in the segments around it
+
+    Args:
+        segments: Segments of the product around day
+        day: Day of the snapshot
+        values: Values of the snapshot
+        policy: What to do when day is already recorded with other values
+
+    Returns:
+        New segments and whether the day changed
+    """
+    current = next((segment for segment in segments if segment.valid_from <= day <= segment.valid_to), None)
+
+    if current is None:
+        return merge_segments(segments + [Segment(day, day, values)]), True
+
+    if current.values == values or policy == UpsertPolicy.Skip:
+        return segments, False
+    if policy == UpsertPolicy.KeepLowest and values[1] >= current.values[1]:
+        return segments, False
+
+    # Split the run around the day
+    pieces = [Segment(day, day, values)]
+    if current.valid_from < day:
+        pieces.append(Segment(current.valid_from, day - ONE_DAY, current.values, current.range_id))
+    if day < current.valid_to:
+        pieces.append(Segment(day + ONE_DAY, current.valid_to, current.values))
+
+    others = [segment for segment in segments if segment is not current]
+    return merge_segments(others + pieces), True
+
+def load_segments(db: Session, product_ids: List[int], start_date: date, end_date: date) -> Dict[int, List[Segment]]:
+    """
+    Stored segments of the products overlapping the dates
+    """
+    price = type_coerce(PriceRange.price, Integer)
+    segments = defaultdict(list)
+
+    for id_chunk in chunked(product_ids, RANGE_LOOKUP_SIZE):
+        rows = db.execute(
+            select(
+                PriceRange.id, PriceRange.product_id, PriceRange.valid_from, PriceRange.valid_to,
+                PriceRange.event_id, price, PriceRange.price_change_reason, PriceRange.price_source
+            ).where(
+                PriceRange.product_id.in_(id_chunk),
+                PriceRange.valid_from <= end_date,
+                PriceRange.valid_to >= start_date
+            )
+        ).all()
+
+        for range_id, product_id, valid_from, valid_to, *values in rows:
+            segments[product_id].append(Segment(valid_from, valid_to, tuple(values), range_id))
+    return segments
+
+def upsert_price_ranges(db: Session, rows: List[dict], policy: UpsertPolicy = UpsertPolicy.Skip) -> int:
+    """
+    Writes snapshots as change points, day by day
+
+    Only the runs around every day are read, extended, split or joined.
+    Existing days with other values are resolved by policy like
+    upsert_price_histories does.
+
+    Args:
+        db: Database session
+        rows: Price history insert values
+        policy: Conflict policy
+
+    Returns:
+        Number of snapshots that changed the stored history
+    """
+    by_day = defaultdict(list)
+    for row in rows:
+        by_day[row["recorded_date"]].append(row)
+
+    connection = db.connection()
+    written = 0
+    for day in sorted(by_day):
+        snapshots = by_day[day]
+        product_ids = list({snapshot["product_id"] for snapshot in snapshots})
+        segments = load_segments(db, product_ids, day - ONE_DAY, day + ONE_DAY)
+        stored = {product_id: {segment.range_id: segment for segment in product_segments}
+                  for product_id, product_segments in segments.items()}
+
+        changed_products = set()
+        for snapshot in snapshots:
+            product_id = snapshot["product_id"]
+            segments[product_id], changed = apply_snapshot(segments[product_id], day, snapshot_values(snapshot), policy)
+            if changed:
+                written += 1
+                changed_products.add(product_id)
+
+        inserts, updates, deletes = [], [], []
+        for product_id in changed_products:
+            old = dict(stored.get(product_id, {}))
+            for segment in segments[product_id]:
+                if segment.range_id is None:
+                    event_id, price, reason, source = segment.values
+                    inserts.append({
+                        "product_id": product_id, "event_id": event_id, "price": price / 100,
+                        "price_change_reason": reason, "price_source": source,
+                        "valid_from": segment.valid_from, "valid_to": segment.valid_to
+                    })
+                    continue
+
+                before = old.pop(segment.range_id)
+                if (before.valid_from, before.valid_to) != (segment.valid_from, segment.valid_to):
+                    updates.append({"b_id": segment.range_id, "b_from": segment.valid_from, "b_to": segment.valid_to})
+            deletes.extend(old)
+
+        # Deletes first, so moved runs never collide on (product_id, valid_from)
+        if deletes:
+            connection.execute(delete(PriceRange).where(PriceRange.id.in_(deletes)))
+        if updates:
+            connection.execute(
+                update(PriceRange)
+                .where(PriceRange.id == bindparam("b_id"))
+                .values(valid_from=bindparam("b_from"), valid_to=bindparam("b_to")),
+                updates
+            )
+        if inserts:
+            connection.execute(insert(PriceRange), inserts)
+
+    return written
+
+def get_price_ranges(db: Session,
+                     product_id: int,
+                     start_date: Optional[date] = None,
+                     end_date: Optional[date] = None) -> List[PriceRange]:
+    """
+    Runs of the product overlapping the dates, unbounded sides when None
+    """
+    query = db.query(PriceRange).filter(PriceRange.product_id == product_id)
+
+    if start_date:
+        query = query.filter(PriceRange.valid_to >= start_date)
+
+    if end_date:
+        query = query.filter(PriceRange.valid_from <= end_date)
+
+    return query.order_by(PriceRange.valid_from.asc()).all()
+
+def expand_ranges(ranges: Iterable[PriceRange],
+                  start_date: Optional[date] = None,
+                  end_date: Optional[date] = None) -> List[PriceHistory]:
+    """
+    Daily snapshots of the runs between the dates, as transient PriceHistory objects
+    """
+    snapshots = []
+    for price_range in ranges:
+        day = max(price_range.valid_from, start_date) if start_date else price_range.valid_from
+        last_day = min(price_range.valid_to, end_date) if end_date else price_range.valid_to
+        while day <= last_day:
+            snapshots.append(PriceHistory(
+                id=price_range.id,
+                product_id=price_range.product_id,
+                event_id=price_range.event_id,
+                price=price_range.price,
+                price_change_reason=price_range.price_change_reason,
+                price_source=price_range.price_source,
+                recorded_date=day
+            ))
+            day += ONE_DAY
+    return snapshots
+
+def _aggregate_runs(rows: List[Tuple[date, date, int]], windows: Dict[str, Tuple[date, date]]) -> Dict[str, Aggregate]:
+    """
+    Aggregates of (valid_from, valid_to, cents) runs in every window, a run counts once per day it covers
+    """
+    aggregates = {}
+    for name, (start_date, end_date) in windows.items():
+        snapshots = price_sum = price_sum_squares = 0
+        prices = []
+        for valid_from, valid_to, cents in rows:
+            days = (min(valid_to, end_date) - max(valid_from, start_date)).days + 1
+            if days <= 0:
+                continue
+            snapshots += days
+            price_sum += cents * days
+            price_sum_squares += cents * cents * days
+            prices.append(cents)
+
+        aggregates[name] = (snapshots, price_sum, min(prices, default=None), max(prices, default=None), price_sum_squares)
+    return aggregates
+
+def _overlapping_runs(windows: Dict[str, Tuple[date, date]]) -> list:
+    return [
+        PriceRange.valid_from <= max(end_date for _, end_date in windows.values()),
+        PriceRange.valid_to >= min(start_date for start_date, _ in windows.values())
+    ]
+
+def aggregate_range_windows(db: Session, product_id: int, windows: Dict[str, Tuple[date, date]]) -> Dict[str, Aggregate]:
+    """
+    Snapshot count, sum, min, max and sum of squares of the prices in cents of every window
+
+    The runs overlapping any window are read in one query.
+
+    Args:
+        db: Database session
+        product_id: Product ID
+        windows: First and last day of every window, by name
+
+    Returns:
+        Aggregates by window name
+    """
+    price = type_coerce(PriceRange.price, Integer)
+    rows = db.execute(
+        select(PriceRange.valid_from, PriceRange.valid_to, price)
+        .where(PriceRange.product_id == product_id, *_overlapping_runs(windows))
+    ).all()
+    return _aggregate_runs(rows, windows)
+
+def aggregate_catalog_range_windows(db: Session, windows: Dict[str, Tuple[date, date]]) -> Dict[int, Dict[str, Aggregate]]:
+    """
+    Aggregates of every window for every product with runs in them, in one query
+    """
+    price = type_coerce(PriceRange.price, Integer)
+    runs = defaultdict(list)
+    for product_id, *run in db.execute(
+        select(PriceRange.product_id, PriceRange.valid_from, PriceRange.valid_to, price).where(*_overlapping_runs(windows))
+    ):
+        runs[product_id].append(run)
+
+    return {product_id: _aggregate_runs(product_runs, windows) for product_id, product_runs in runs.items()}
+
+def aggregate_ranges(db: Session, product_id: int, start_date: date, end_date: date) -> Aggregate:
+    """
+    Snapshot count, sum, min, max and sum of squares of the prices in cents between two dates
+    """
+    return aggregate_range_windows(db, product_id, {"range": (start_date, end_date)})["range"]
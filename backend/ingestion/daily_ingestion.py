@@ -1,81 +1,177 @@
 
-from typing import Optional
-from datetime import date
+import argparse
+from typing import Optional, Dict, List, Iterable, Iterator, Tuple, Generator
+from datetime import date, datetime
+from contextlib import contextmanager
+from sqlalchemy import event, insert, select
 from sqlalchemy.orm import Session
 
+from backend.archive import ensure_not_archived
+from backend.coordination import INGESTION_LOCK, leader
 from backend.database import SessionLocal
-from backend.models import Product, PriceHistory
-from backend.ingestion.fetch_products import fetch_all_products
-from backend.ingestion.price_engine import generate_daily_price
-from shared.constants import PriceType
+from backend.models import Product
+from backend.api.events.calendar import CalendarEvent, get_event_calendar
+from backend.ingestion.fetch_products import ProductFetcher, fetch_all_products
+from backend.ingestion.journal import start_run, finish_run
+from backend.ingestion.pipeline import PIPELINE_QUEUE_SIZE, StageStats, buffered_async, chunked, metered
+from backend.ingestion.upsert import write_price_snapshots
+from backend.ingestion.rollups import update_rollups
+from backend.cache import bump_price_versions
+from backend.ingestion.price_engine import generate_event_price, PriceStream
+from shared.config import get_settings
+from shared.constants import PriceType, UpsertPolicy
 
 PRICING_MODE = PriceType.Synthetic
+BULK_INSERT_BATCH_SIZE = 1000
+PIPELINE_CHUNK_SIZE = 1000
+DAILY_RUN_KIND = "daily"
 
-def get_product(db: Session, external_id: int) -> Optional[Product]:
-    return db.query(Product).filter(Product.external_id == external_id).first()
+def product_values(product_data: dict) -> dict:
+    return {
+        "external_id": product_data["id"],
+        "title": product_data["title"],
+        "description": product_data["description"],
+        "base_price": product_data["price"],
+        "rating": product_data["rating"]["rate"]
+    }
 
-def create_product(product_data: dict) -> Product:
-    return Product(
-        external_id=product_data["id"],
-        title=product_data["title"],
-        description=product_data["description"],
-        base_price=product_data["price"],
-        rating=product_data["rating"]["rate"]
-    )
+def price_history_values(product_id: int, final_price: float, metadata: dict) -> dict:
+    return {
+        "product_id": product_id,
+        "event_id": metadata["event_id"],
+        "price": final_price,
+        "price_change_reason": metadata["adjustment_reason"],
+        "price_source": metadata["price_source"].value,
+        "recorded_date": metadata["recorded_date"]
+    }
 
-def is_price_history_created(db: Session, product_id: int, recorded_date: date) -> bool:
-    price_history = db.query(PriceHistory).filter(
-        PriceHistory.product_id == product_id,
-        PriceHistory.recorded_date == recorded_date
-    ).first()
-
-    return price_history is not None
-
-def create_price_history(product: Product, final_price: float, metadata: dict) -> PriceHistory:
-    return PriceHistory(
-        product_id=product.product_id,
-        event_id=metadata["event_id"],
-        price=final_price,
-        price_change_reason=metadata["adjustment_reason"],
-        price_source=metadata["price_source"].value,
-        recorded_date=metadata["recorded_date"]
-    )
+# --------------------------------------------------
+# Bulk helpers
+# --------------------------------------------------
+
+@contextmanager
+def count_round_trips(db: Session) -> Generator[Dict[str, int], None, None]:
+    """
+    Counts statements and commits sent to the database while the block runs.
+
+    Usage:
+        with count_round_trips(db) as stats:
+            ...
+        stats["round_trips"]
+    """
+    stats = {"round_trips": 0}
+    bind = db.get_bind()
+
+    def _count(*args, **kwargs):
+        stats["round_trips"] += 1
+
+    event.listen(bind, "after_cursor_execute", _count)
+    event.listen(bind, "commit", _count)
+    try:
+        yield stats
+    finally:
+        event.remove(bind, "after_cursor_execute", _count)
+        event.remove(bind, "commit", _count)
+
+def get_products_by_external_ids(db: Session, external_ids: Iterable[int]) -> Dict[int, Product]:
+    """
+    Loads known products in one query, keyed by external ID
+    """
+    external_ids = list(external_ids)
+    if not external_ids:
+        return {}
+
+    products = db.scalars(
+        select(Product).where(Product.external_id.in_(external_ids))
+    ).all()
+
+    return {product.external_id: product for product in products}
+
+def bulk_insert(db: Session, model, rows: List[dict], batch_size: int = BULK_INSERT_BATCH_SIZE) -> int:
+    """
+    Inserts rows as multi-row INSERT statements of at most batch_size rows
+
+    Returns:
+        Number of inserted rows
+    """
+    for start in range(0, len(rows), batch_size):
+        db.execute(insert(model), rows[start:start + batch_size])
+
+    return len(rows)
 
-def run_daily_ingestion(snapshot_date: Optional[date] = None) -> None:
+def resolve_products(db: Session, products_data: List[dict], batch_size: int = BULK_INSERT_BATCH_SIZE) -> Tuple[Dict[int, Product], int]:
     """
-    Main daily ingestion routine
+    Resolves every fetched product, inserting the unknown ones in bulk
+
+    Returns:
+        Products keyed by external ID and the number of inserted products
+    """
+    products = get_products_by_external_ids(db, (product_data["id"] for product_data in products_data))
+
+    new_products = {}
+    for product_data in products_data:
+        if product_data["id"] not in products:
+            new_products[product_data["id"]] = product_values(product_data)
+
+    if new_products:
+        bulk_insert(db, Product, list(new_products.values()), batch_size)
+        # Multi-row inserts do not return generated keys on MySQL, read them back once.
+        products.update(get_products_by_external_ids(db, new_products.keys()))
+
+    return products, len(new_products)
+
+# --------------------------------------------------
+# Ingestion runs
+# --------------------------------------------------
+
+def run_bulk_daily_ingestion(snapshot_date: Optional[date] = None,
+                             batch_size: int = BULK_INSERT_BATCH_SIZE,
+                             policy: UpsertPolicy = UpsertPolicy.Skip) -> dict:
+    """
+    Set-based daily ingestion routine
+
+    Issues a fixed number of queries per run whatever the catalog size:
+    one product lookup, the event calendar and the batched multi-row
+    upserts. Snapshots that already exist are resolved by the database
+    according to policy, so rerunning a day costs the same statements.
+
+    Returns:
+        Run summary with inserted row counts and database round trips
     """
     db = SessionLocal()
     snapshot_date = snapshot_date or date.today()
+    started_at = datetime.now()
+    seed = get_settings().price_seed
 
-    products = fetch_all_products()
+    cache_stats = {}
+    products_data = fetch_all_products(cache_stats=cache_stats)
 
-    inserted_snapshots = 0
     try:
-        for product_data in products:
-            product = get_product(db, product_data["id"])
-            if product is None:
-                product = create_product(product_data)
-                db.add(product)
-                db.flush()
-
-            final_price, metadata = generate_daily_price(
-                db,
-                base_price=product.base_price,
-                current_date=snapshot_date,
-                pricing_mode=PRICING_MODE
-            )            
-
-            if is_price_history_created(db, product.product_id, snapshot_date):
-                continue
-
-            price_history = create_price_history(product, final_price, metadata)
-            
-            db.add(price_history)
-            inserted_snapshots += 1
-
-        db.commit()
-        print(f"[INGESTION] {inserted_snapshots} price snapshots inserted.")
+        with count_round_trips(db) as stats:
+            products, inserted_products = resolve_products(db, products_data, batch_size)
+
+            active_event = None
+            pre_event = None
+            if PRICING_MODE == PriceType.Synthetic:
+                active_event, pre_event = get_event_calendar(db).resolve(snapshot_date)
+
+            price_histories = []
+            for product in products.values():
+                final_price, metadata = generate_event_price(
+                    product.base_price,
+                    snapshot_date,
+                    active_event,
+                    pre_event,
+                    PRICING_MODE,
+                    PriceStream(seed, product.product_id, snapshot_date)
+                )
+                price_histories.append(price_history_values(product.product_id, final_price, metadata))
+
+            inserted_snapshots = write_price_snapshots(db, price_histories, policy, batch_size)
+            update_rollups(db, price_histories, policy, inserted_snapshots)
+            product_ids = [product.product_id for product in products.values()]
+            bump_price_versions(db, product_ids)
+            db.commit()
 
     except Exception as e:
         db.rollback()
@@ -83,5 +179,231 @@ def run_daily_ingestion(snapshot_date: Optional[date] = None) -> None:
     finally:
         db.close()
 
+    summary = {
+        "snapshot_date": snapshot_date,
+        "policy": policy.value,
+        "fetched_products": len(products_data),
+        "inserted_products": inserted_products,
+        "inserted_snapshots": inserted_snapshots,
+        "round_trips": stats["round_trips"],
+        **cache_stats,
+        "elapsed_seconds": round((datetime.now() - started_at).total_seconds(), 3),
+    }
+    print(
+        f"[INGESTION] {inserted_snapshots} price snapshots and {inserted_products} products inserted "
+        f"in {summary['round_trips']} round trips."
+    )
+    return summary
+
+# --------------------------------------------------
+# Streaming pipeline: fetch -> normalize -> price -> write
+# --------------------------------------------------
+
+def fetch_stage(cache_stats: Optional[dict] = None, queue_size: int = PIPELINE_QUEUE_SIZE) -> Iterator[dict]:
+    """
+    Streams the catalog as API pages arrive, at most queue_size products ahead of the consumer
+
+    Args:
+        cache_stats: Updated with the response cache hits and misses once the catalog is read
+    """
+    async def produce():
+        async with ProductFetcher() as fetcher:
+            async for product_data in fetcher.iter_products():
+                yield product_data
+
+        if cache_stats is not None:
+            cache_stats.update(fetcher.cache_stats)
+
+    return buffered_async(produce, queue_size)
+
+def normalize_stage(db: Session,
+                    products_data: Iterable[dict],
+                    chunk_size: int,
+                    counters: dict) -> Iterator[List[Tuple[int, float]]]:
+    """
+    Resolves fetched products chunk by chunk, inserting the unknown ones
+
+    Args:
+        counters: inserted_products is incremented in place
+
+    Yields:
+        (product_id, base_price) of every product of a chunk
+    """
+    for chunk in chunked(products_data, chunk_size):
+        products, inserted_products = resolve_products(db, chunk, chunk_size)
+        counters["inserted_products"] += inserted_products
+
+        yield [(product.product_id, product.base_price) for product in products.values()]
+
+def price_stage(product_chunks: Iterable[List[Tuple[int, float]]],
+                snapshot_date: date,
+                active_event: Optional[CalendarEvent],
+                pre_event: Optional[CalendarEvent],
+                seed: int) -> Iterator[List[dict]]:
+    """
+    Prices every product of a chunk for the snapshot date
+
+    Yields:
+        Price history insert values of a chunk
+    """
+    for products in product_chunks:
+        snapshots = []
+        for product_id, base_price in products:
+            final_price, metadata = generate_event_price(
+                base_price,
+                snapshot_date,
+                active_event,
+                pre_event,
+                PRICING_MODE,
+                PriceStream(seed, product_id, snapshot_date)
+            )
+            snapshots.append(price_history_values(product_id, final_price, metadata))
+
+        yield snapshots
+
+def write_stage(db: Session, snapshot_chunks: Iterable[List[dict]], policy: UpsertPolicy) -> Iterator[Tuple[int, int]]:
+    """
+    Upserts and commits every chunk on its own, with the monthly rollups of its products
+
+    A failing chunk is rolled back alone, the chunks before it stay committed.
+    Rerunning the day picks up where the failure stopped.
+
+    Yields:
+        Rows of the chunk and the number of them inserted or changed
+    """
+    for snapshots in snapshot_chunks:
+        try:
+            written = write_price_snapshots(db, snapshots, policy, len(snapshots))
+            update_rollups(db, snapshots, policy, written)
+            bump_price_versions(db, [snapshot["product_id"] for snapshot in snapshots])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        yield len(snapshots), written
+
+def run_streaming_daily_ingestion(snapshot_date: Optional[date] = None,
+                                  chunk_size: int = PIPELINE_CHUNK_SIZE,
+                                  policy: UpsertPolicy = UpsertPolicy.Skip,
+                                  queue_size: int = PIPELINE_QUEUE_SIZE,
+                                  counters: Optional[Dict[str, int]] = None) -> dict:
+    """
+    Daily ingestion as a pipeline of generator stages
+
+    Products flow through fetch -> normalize -> price -> write in chunks of
+    chunk_size, and fetching runs ahead by at most queue_size products. Peak
+    memory depends on chunk_size and queue_size, not on the catalog size.
+
+    Args:
+        counters: Inserted products and snapshots, updated as every chunk
+            commits so the caller still has them when a later chunk fails
+
+    Returns:
+        Run summary with inserted row counts and the throughput of every stage
+    """
+    db = SessionLocal()
+    snapshot_date = snapshot_date or date.today()
+    started_at = datetime.now()
+    seed = get_settings().price_seed
+
+    fetch_stats = StageStats("fetch")
+    normalize_stats = StageStats("normalize", fetch_stats)
+    price_stats = StageStats("price", normalize_stats)
+    write_stats = StageStats("write", price_stats)
+
+    cache_stats = {}
+    if counters is None:
+        counters = {}
+    counters.update(inserted_products=0, inserted_snapshots=0)
+    try:
+        active_event = None
+        pre_event = None
+        if PRICING_MODE == PriceType.Synthetic:
+            active_event, pre_event = get_event_calendar(db).resolve(snapshot_date)
+
+        products_data = metered(fetch_stage(cache_stats, queue_size), fetch_stats)
+        product_chunks = metered(normalize_stage(db, products_data, chunk_size, counters), normalize_stats, len)
+        snapshot_chunks = metered(price_stage(product_chunks, snapshot_date, active_event, pre_event, seed), price_stats, len)
+
+        for _, written in metered(write_stage(db, snapshot_chunks, policy), write_stats, lambda chunk: chunk[0]):
+            counters["inserted_snapshots"] += written
+
+    finally:
+        db.close()
+
+    stages = [fetch_stats, normalize_stats, price_stats, write_stats]
+    summary = {
+        "snapshot_date": snapshot_date,
+        "policy": policy.value,
+        "fetched_products": fetch_stats.items,
+        **counters,
+        **cache_stats,
+        "stages": {stage.name: stage.as_dict() for stage in stages},
+        "elapsed_seconds": round((datetime.now() - started_at).total_seconds(), 3),
+    }
+    for stage in stages:
+        print(f"[INGESTION] {stage.name}: {stage.items} items in {stage.seconds:.3f}s ({stage.throughput:.0f}/s)")
+    print(
+        f"[INGESTION] {counters['inserted_snapshots']} price snapshots and "
+        f"{counters['inserted_products']} products inserted in {summary['elapsed_seconds']}s."
+    )
+    return summary
+
+def run_daily_ingestion(snapshot_date: Optional[date] = None,
+                        bulk: bool = False,
+                        policy: UpsertPolicy = UpsertPolicy.Skip,
+                        chunk_size: int = PIPELINE_CHUNK_SIZE) -> dict:
+    """
+    Main daily ingestion routine, recorded in the ingestion_runs journal
+
+    Args:
+        snapshot_date: Date of the snapshots, today by default
+        bulk: Use the set-based routine, which holds the whole catalog in memory
+        policy: What to do with snapshots that already exist
+        chunk_size: Products per chunk and commit of the streaming routine
+
+    Returns:
+        Run summary
+
+    Raises:
+        ValueError if snapshot_date is in an archived month
+    """
+    snapshot_date = snapshot_date or date.today()
+    ensure_not_archived(snapshot_date, snapshot_date)
+
+    db = SessionLocal()
+    try:
+        run = start_run(db, DAILY_RUN_KIND, snapshot_date, snapshot_date, seed=get_settings().price_seed, policy=policy)
+        run_id = run.run_id
+        # The bulk routine commits once, the streaming one after every chunk
+        counters = {"inserted_snapshots": 0}
+        try:
+            if bulk:
+                summary = run_bulk_daily_ingestion(snapshot_date, policy=policy)
+            else:
+                summary = run_streaming_daily_ingestion(snapshot_date, chunk_size=chunk_size, policy=policy, counters=counters)
+        except Exception as e:
+            finish_run(db, run, error=e, inserted_snapshots=counters["inserted_snapshots"])
+            raise e
+
+        finish_run(db, run, inserted_snapshots=summary["inserted_snapshots"])
+    finally:
+        db.close()
+
+    return {"run_id": run_id, **summary}
+
 if __name__ == "__main__":
-    run_daily_ingestion()
+    parser = argparse.ArgumentParser(description="Run daily price ingestion")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Snapshot date (YYYY-MM-DD)")
+    parser.add_argument("--bulk", action="store_true", help="Use set-based bulk ingestion")
+    parser.add_argument("--chunk-size", type=int, default=PIPELINE_CHUNK_SIZE, help="Products per chunk and commit")
+    parser.add_argument("--policy", choices=[policy.value for policy in UpsertPolicy], default=UpsertPolicy.Skip.value,
+                        help="What to do with existing snapshots")
+    args = parser.parse_args()
+
+    with leader(INGESTION_LOCK) as is_leader:
+        if not is_leader:
+            parser.exit(1, "[INGESTION] Another process is ingesting prices, try again once it finishes.\n")
+
+        run_daily_ingestion(args.date, bulk=args.bulk, policy=UpsertPolicy(args.policy), chunk_size=args.chunk_size)
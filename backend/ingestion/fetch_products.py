@@ -1,13 +1,219 @@
 """Fetch product price data from API"""
-import requests 
+import asyncio
+import json
+import random
+import time
+from typing import Optional, List, Any, AsyncIterator, Iterable, Dict
+import httpx
 
-from shared.config import get_product_api
+from backend.ingestion.response_cache import ResponseCache, CachedResponse, CacheMissError
+from shared.config import get_product_api, ProductAPI
 
 product_api = get_product_api()
 
-def fetch_all_products() -> dict:
-    response = requests.get(product_api.api_url)
-    if response.status_code == 200:
+# Responses worth another attempt
+RETRY_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+class ProductFetcher:
+    """
+    Asyncio product fetcher sharing one connection pool
+
+    Requests run concurrently up to product_api.concurrency, time out after
+    product_api.timeout seconds and are retried with exponential backoff on
+    connection errors, timeouts and retryable status codes.
+
+    Responses are cached on disk under product_api.cache_dir. Cached
+    responses younger than product_api.cache_ttl are served directly, older
+    ones are revalidated with ETag/Last-Modified and reused on 304. In
+    offline mode only the cache is used.
+
+    Usage:
+        async with ProductFetcher() as fetcher:
+            async for product in fetcher.iter_products():
+                ...
+    """
+
+    def __init__(self, api: Optional[ProductAPI] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.api = api or product_api
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(self.api.concurrency)
+        self.cache = ResponseCache(self.api.cache_dir) if self.api.cache_dir else None
+        self.cache_stats = {"cache_hits": 0, "cache_misses": 0}
+
+    async def __aenter__(self) -> "ProductFetcher":
+        self._client = httpx.AsyncClient(
+            timeout=self.api.timeout,
+            limits=httpx.Limits(
+                max_connections=self.api.concurrency,
+                max_keepalive_connections=self.api.concurrency
+            ),
+            transport=self._transport
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._client.aclose()
+        self._client = None
+
+    async def get_json(self, url: str, params: Optional[dict] = None) -> Any:
+        """
+        GET url and decode its JSON body, going through the response cache
+
+        Raises:
+            httpx.HTTPError if the request still fails after all retries
+            CacheMissError in offline mode if the response is not cached
+        """
+        if self.cache is None:
+            return (await self._get(url, params)).json()
+
+        key = str(httpx.URL(url, params=params))
+        cached = self.cache.load(key)
+
+        if cached and (self.api.offline or cached.is_fresh(self.api.cache_ttl)):
+            self.cache_stats["cache_hits"] += 1
+            return json.loads(cached.body)
+
+        if self.api.offline:
+            raise CacheMissError(f"{key} is not cached and offline mode is on")
+
+        response = await self._get(url, params, cached.validators() if cached else None)
+
+        if response.status_code == 304 and cached:
+            self.cache.touch(key, cached)
+            self.cache_stats["cache_hits"] += 1
+            return json.loads(cached.body)
+
+        self.cache.store(key, CachedResponse(
+            url=key,
+            body=response.text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            stored_at=time.time()
+        ))
+        self.cache_stats["cache_misses"] += 1
         return response.json()
-    else:
-        raise response.raise_for_status()
\ No newline at end of file
+
+    async def _get(self, url: str, params: Optional[dict] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """
+        GET url, retrying transient failures
+
+        Returns:
+            Successful or 304 Not Modified response
+        """
+        for attempt in range(self.api.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(url, params=params, headers=headers)
+
+                if response.status_code not in RETRY_STATUS_CODES:
+                    if response.status_code != 304:
+                        response.raise_for_status()
+                    return response
+
+                error = httpx.HTTPStatusError(
+                    f"Retryable status {response.status_code} for {url}",
+                    request=response.request,
+                    response=response
+                )
+            except httpx.TransportError as e:
+                error = e
+
+            if attempt == self.api.max_retries:
+                raise error
+
+            delay = self.api.backoff * (2 ** attempt)
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    async def iter_pages(self, page_size: int) -> AsyncIterator[dict]:
+        """
+        Yields products of a limit/offset paginated catalog as pages arrive
+
+        Pages are requested in waves of product_api.concurrency pages until a
+        short or empty page marks the end of the catalog.
+        """
+        offset = 0
+        seen_ids = set()
+
+        while True:
+            requests = [
+                asyncio.ensure_future(self.get_json(self.api.api_url, {"limit": page_size, "offset": offset + page * page_size}))
+                for page in range(self.api.concurrency)
+            ]
+            offset += len(requests) * page_size
+
+            last_page = False
+            try:
+                for request in asyncio.as_completed(requests):
+                    products = await request
+                    if len(products) < page_size:
+                        last_page = True
+
+                    for product in products:
+                        # APIs ignoring offset return the same page again
+                        if product["id"] in seen_ids:
+                            last_page = True
+                            continue
+                        seen_ids.add(product["id"])
+                        yield product
+            finally:
+                for request in requests:
+                    request.cancel()
+
+            if last_page:
+                return
+
+    async def iter_products_by_id(self, product_ids: Iterable[int]) -> AsyncIterator[dict]:
+        """
+        Yields products fetched one by one from the per-product endpoint, as they arrive
+        """
+        requests = [
+            asyncio.ensure_future(self.get_json(self.api.api_url_for_product(product_id)))
+            for product_id in product_ids
+        ]
+
+        try:
+            for request in asyncio.as_completed(requests):
+                product = await request
+                if product:
+                    yield product
+        finally:
+            for request in requests:
+                request.cancel()
+
+    async def iter_products(self) -> AsyncIterator[dict]:
+        """
+        Yields the whole catalog, paginated when product_api.page_size is set
+        """
+        if self.api.page_size:
+            async for product in self.iter_pages(self.api.page_size):
+                yield product
+            return
+
+        for product in await self.get_json(self.api.api_url):
+            yield product
+
+async def fetch_all_products_async(api: Optional[ProductAPI] = None, cache_stats: Optional[dict] = None) -> List[dict]:
+    """
+    Fetches the whole catalog
+
+    Args:
+        api: Product API settings, the configured one by default
+        cache_stats: Updated with the cache_hits and cache_misses of the fetch
+    """
+    async with ProductFetcher(api) as fetcher:
+        products = [product async for product in fetcher.iter_products()]
+
+    if cache_stats is not None:
+        cache_stats.update(fetcher.cache_stats)
+    return products
+
+def fetch_all_products(api: Optional[ProductAPI] = None, cache_stats: Optional[dict] = None) -> List[dict]:
+    """
+    Fetches the whole catalog, blocking until every product arrived
+
+    Args:
+        api: Product API settings, the configured one by default
+        cache_stats: Updated with the cache_hits and cache_misses of the fetch
+    """
+    return asyncio.run(fetch_all_products_async(api, cache_stats))
@@ -0,0 +1,158 @@
+"""Journal of ingestion runs and their completed chunks"""
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime
+from typing import Optional, FrozenSet, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend.models import IngestionRun, IngestionChunk
+from shared.constants import RunStatus, UpsertPolicy
+
+# Shard of chunks covering the whole catalog
+WHOLE_CATALOG = -1
+
+@dataclass(frozen=True)
+class RunJournal:
+    """
+    Completed chunks of a run, read once when the run starts or resumes
+
+    Chunks are recorded as they finish, so an interrupted run can skip them
+    on resume without looking at price_histories.
+    """
+    run_id: int
+    shard: int = WHOLE_CATALOG
+    completed: FrozenSet[Tuple[date, date, int]] = field(default_factory=frozenset)
+
+    def for_shard(self, shard: int) -> "RunJournal":
+        return replace(self, shard=shard)
+
+    def is_completed(self, start_date: date, end_date: date) -> bool:
+        return (start_date, end_date, self.shard) in self.completed
+
+    def record_chunk(self, db: Session,
+                     start_date: date,
+                     end_date: date,
+                     rows: int,
+                     inserted_snapshots: int,
+                     elapsed_seconds: float) -> None:
+        """
+        Adds a finished chunk to the journal, committed by the caller
+        """
+        db.add(IngestionChunk(
+            run_id=self.run_id,
+            start_date=start_date,
+            end_date=end_date,
+            shard=self.shard,
+            rows=rows,
+            inserted_snapshots=inserted_snapshots,
+            elapsed_seconds=round(elapsed_seconds, 3),
+            finished_at=datetime.now()
+        ))
+
+def start_run(db: Session,
+              kind: str,
+              start_date: date,
+              end_date: date,
+              chunk_days: Optional[int] = None,
+              seed: Optional[int] = None,
+              policy: Optional[UpsertPolicy] = None) -> IngestionRun:
+    """
+    Records a new running run and commits it
+    """
+    run = IngestionRun(
+        kind=kind,
+        status=RunStatus.Running.value,
+        start_date=start_date,
+        end_date=end_date,
+        chunk_days=chunk_days,
+        seed=seed,
+        policy=policy.value if policy else None,
+        inserted_snapshots=0,
+        started_at=datetime.now()
+    )
+    db.add(run)
+    db.commit()
+    return run
+
+def find_resumable_run(db: Session,
+                       kind: str,
+                       start_date: date,
+                       end_date: date,
+                       seed: Optional[int] = None,
+                       policy: Optional[UpsertPolicy] = None) -> Optional[IngestionRun]:
+    """
+    Returns the latest unfinished run with the same parameters, None if there is none
+    """
+    return db.scalars(
+        select(IngestionRun)
+        .where(
+            IngestionRun.kind == kind,
+            IngestionRun.start_date == start_date,
+            IngestionRun.end_date == end_date,
+            IngestionRun.seed == seed,
+            IngestionRun.policy == (policy.value if policy else None),
+            IngestionRun.status != RunStatus.Completed.value
+        )
+        .order_by(IngestionRun.run_id.desc())
+        .limit(1)
+    ).first()
+
+def open_journal(db: Session, run: IngestionRun) -> RunJournal:
+    """
+    Loads the completed chunks of a run
+    """
+    chunks = db.execute(
+        select(IngestionChunk.start_date, IngestionChunk.end_date, IngestionChunk.shard)
+        .where(IngestionChunk.run_id == run.run_id)
+    ).all()
+
+    return RunJournal(run.run_id, completed=frozenset(tuple(chunk) for chunk in chunks))
+
+def resume_or_start_run(db: Session,
+                        kind: str,
+                        start_date: date,
+                        end_date: date,
+                        chunk_days: Optional[int] = None,
+                        seed: Optional[int] = None,
+                        policy: Optional[UpsertPolicy] = None,
+                        resume: bool = False) -> Tuple[IngestionRun, RunJournal]:
+    """
+    Reopens the latest unfinished run with the same parameters if resume is set, starts a new one otherwise
+
+    A resumed run keeps its own chunk_days, so its chunk boundaries still match the journal.
+    """
+    run = find_resumable_run(db, kind, start_date, end_date, seed, policy) if resume else None
+
+    if run is None:
+        run = start_run(db, kind, start_date, end_date, chunk_days, seed, policy)
+        return run, RunJournal(run.run_id)
+
+    run.status = RunStatus.Running.value
+    run.error = None
+    run.finished_at = None
+    db.commit()
+    return run, open_journal(db, run)
+
+def finish_run(db: Session,
+               run: IngestionRun,
+               error: Optional[BaseException] = None,
+               inserted_snapshots: Optional[int] = None) -> IngestionRun:
+    """
+    Marks a run completed, or failed when error is given, and commits it
+
+    Args:
+        inserted_snapshots: Snapshot count of runs without chunks, summed over the chunks otherwise
+    """
+    if inserted_snapshots is None:
+        inserted_snapshots = db.scalar(
+            select(func.coalesce(func.sum(IngestionChunk.inserted_snapshots), 0))
+            .where(IngestionChunk.run_id == run.run_id)
+        )
+
+    run.status = RunStatus.Failed.value if error else RunStatus.Completed.value
+    run.error = repr(error) if error else None
+    run.inserted_snapshots = inserted_snapshots
+    run.finished_at = datetime.now()
+    run.elapsed_seconds = round((run.finished_at - run.started_at).total_seconds(), 3)
+    db.commit()
+    return run
@@ -0,0 +1,279 @@
+"""Process-pool parallel backfill partitioned by date range or product shard"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional, List, Tuple
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+
+from backend import database
+from backend.archive import ensure_not_archived
+from backend.coordination import INGESTION_LOCK, leader
+from backend.database import SessionLocal, create_db_engine
+from backend.api.events.calendar import EventCalendar, get_event_calendar
+from backend.ingestion.backfill import (
+    BACKFILL_BATCH_SIZE,
+    BACKFILL_CHUNK_DAYS,
+    backfill_range,
+    iter_date_chunks,
+    prepare_catalog
+)
+from backend.ingestion.journal import WHOLE_CATALOG, RunJournal, resume_or_start_run, finish_run
+from backend.ingestion.rollups import refresh_rollups
+from backend.cache import bump_price_versions
+from shared.config import get_settings
+from shared.constants import UpsertPolicy, PriceStorage
+
+PARTITION_BY_DATE = "date"
+PARTITION_BY_PRODUCT = "product"
+
+@dataclass
+class BackfillTask:
+    """Work unit of a worker: a date range over a product shard"""
+    start_date: date
+    end_date: date
+    product_ids: List[int]
+    base_prices: np.ndarray
+    shard: int = WHOLE_CATALOG
+
+# Session factory of the worker process, bound to its own engine
+_worker_session = None
+
+def _init_worker(database_url: str) -> None:
+    """
+    Gives every worker its own engine and session factory
+    """
+    global _worker_session
+
+    # Never reuse pooled connections inherited from the parent process
+    database.engine.dispose(close=False)
+    _worker_session = sessionmaker(autocommit=False, autoflush=False, bind=create_db_engine(database_url))
+
+def _run_task(task: BackfillTask,
+              calendar: EventCalendar,
+              seed: int,
+              batch_size: int,
+              chunk_days: int,
+              policy: UpsertPolicy,
+              journal: RunJournal) -> Tuple[BackfillTask, int]:
+    db = _worker_session()
+    try:
+        inserted_snapshots = backfill_range(
+            db,
+            task.product_ids,
+            task.base_prices,
+            calendar,
+            task.start_date,
+            task.end_date,
+            seed,
+            batch_size=batch_size,
+            chunk_days=chunk_days,
+            policy=policy,
+            journal=journal.for_shard(task.shard),
+            # Tasks share months, the parent refreshes the rollups once they are all done
+            rollups=False
+        )
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return task, inserted_snapshots
+
+def split_by_date(product_ids: List[int], base_prices: np.ndarray,
+                  start_date: date, end_date: date, chunk_days: int) -> List[BackfillTask]:
+    """
+    One task per date chunk over the whole catalog
+    """
+    return [
+        BackfillTask(chunk_start, chunk_end, product_ids, base_prices)
+        for chunk_start, chunk_end in iter_date_chunks(start_date, end_date, chunk_days)
+    ]
+
+def split_by_product(product_ids: List[int], base_prices: np.ndarray,
+                     start_date: date, end_date: date, shards: int) -> List[BackfillTask]:
+    """
+    One task per product_id hash shard over the whole date range
+    """
+    shard_of = np.array(product_ids, dtype=np.int64) % shards
+    tasks = []
+    for shard in range(shards):
+        positions = np.flatnonzero(shard_of == shard)
+        if len(positions) == 0:
+            continue
+        tasks.append(BackfillTask(
+            start_date,
+            end_date,
+            [product_ids[position] for position in positions],
+            base_prices[positions],
+            shard
+        ))
+    return tasks
+
+def run_parallel_backfill(start_date: date,
+                          end_date: date,
+                          workers: Optional[int] = None,
+                          partition: str = PARTITION_BY_DATE,
+                          batch_size: int = BACKFILL_BATCH_SIZE,
+                          chunk_days: int = BACKFILL_CHUNK_DAYS,
+                          seed: Optional[int] = None,
+                          policy: UpsertPolicy = UpsertPolicy.Skip,
+                          resume: bool = False,
+                          progress: bool = True) -> dict:
+    """
+    Backfills daily price snapshots across a process pool
+
+    The parent fetches the catalog, resolves products and loads the event
+    calendar once. Work is split into disjoint date chunks or product_id
+    shards, so workers never write the same (product, day). Every price is
+    drawn from its own (seed, product_id, date) stream, so the result
+    matches run_backfill with the same seed.
+
+    The run and every completed chunk are recorded in the run journal.
+    With resume, the latest unfinished run with the same arguments is
+    picked up: finished date tasks are not submitted again and product
+    shards skip their completed chunks. Resuming a product partitioned
+    run needs the same number of workers, as shards are derived from it.
+    The monthly rollups of the range are refreshed once all tasks are done.
+
+    Args:
+        start_date: First day to backfill
+        end_date: Last day to backfill, inclusive
+        workers: Worker processes, CPU count by default
+        partition: "date" to split by date chunk, "product" to split by product_id hash
+        batch_size: Rows per multi-row upsert and commit
+        chunk_days: Days priced at once (and per task when splitting by date)
+        seed: Seed of the price streams, PRICE_SEED setting by default
+        policy: What to do with snapshots that already exist
+        resume: Continue the latest unfinished matching run instead of starting over
+        progress: Print progress after every finished task
+
+    Returns:
+        Run summary with inserted row counts
+
+    Raises:
+        ValueError if the range is empty or overlaps an archived month
+    """
+    if end_date < start_date:
+        raise ValueError(f"end_date {end_date} is before start_date {start_date}")
+    ensure_not_archived(start_date, end_date)
+    if partition not in (PARTITION_BY_DATE, PARTITION_BY_PRODUCT):
+        raise ValueError(f"Unknown partition {partition}, use '{PARTITION_BY_DATE}' or '{PARTITION_BY_PRODUCT}'")
+    if partition == PARTITION_BY_DATE and PriceStorage(get_settings().price_storage) == PriceStorage.ChangePoints:
+        # Date tasks would extend and join the same runs at their edges concurrently
+        raise ValueError(f"Change point storage needs the '{PARTITION_BY_PRODUCT}' partition")
+
+    workers = workers or os.cpu_count() or 1
+    started_at = datetime.now()
+    if seed is None:
+        seed = get_settings().price_seed
+
+    cache_stats = {}
+    db = SessionLocal()
+    run, journal = resume_or_start_run(
+        db, f"parallel_backfill_{partition}", start_date, end_date, chunk_days, seed, policy, resume
+    )
+    run_id = run.run_id
+    chunk_days = run.chunk_days
+    try:
+        product_ids, base_prices, fetched_products, inserted_products = prepare_catalog(db, batch_size, cache_stats)
+        calendar = get_event_calendar(db)
+
+        if partition == PARTITION_BY_DATE:
+            tasks = split_by_date(product_ids, base_prices, start_date, end_date, chunk_days)
+            tasks = [task for task in tasks if not journal.is_completed(task.start_date, task.end_date)]
+        else:
+            tasks = split_by_product(product_ids, base_prices, start_date, end_date, workers)
+
+        if journal.completed:
+            print(f"[PARALLEL BACKFILL] Resuming run {run_id}, skipping {len(journal.completed)} completed chunks.")
+
+        inserted_snapshots = 0
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(database.settings.database_url,)
+        ) as pool:
+            futures = [
+                pool.submit(_run_task, task, calendar, seed, batch_size, chunk_days, policy, journal)
+                for task in tasks
+            ]
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                task, task_snapshots = future.result()
+                inserted_snapshots += task_snapshots
+                if progress:
+                    elapsed = (datetime.now() - started_at).total_seconds()
+                    print(
+                        f"[PARALLEL BACKFILL] task {done}/{len(tasks)} "
+                        f"({task.start_date} - {task.end_date}, {len(task.product_ids)} products): "
+                        f"{task_snapshots} snapshots, {inserted_snapshots / max(elapsed, 1e-9):.0f} rows/s"
+                    )
+
+        refresh_rollups(db, start_date, end_date, product_ids)
+        bump_price_versions(db, product_ids)
+        finish_run(db, run)
+
+    except Exception as e:
+        db.rollback()
+        finish_run(db, run, error=e)
+        raise e
+    finally:
+        db.close()
+
+    summary = {
+        "run_id": run_id,
+        "skipped_chunks": len(journal.completed),
+        "start_date": start_date,
+        "end_date": end_date,
+        "seed": seed,
+        "partition": partition,
+        "policy": policy.value,
+        "workers": workers,
+        "tasks": len(tasks),
+        "fetched_products": fetched_products,
+        "inserted_products": inserted_products,
+        "inserted_snapshots": inserted_snapshots,
+        **cache_stats,
+        "elapsed_seconds": round((datetime.now() - started_at).total_seconds(), 3),
+    }
+    print(
+        f"[PARALLEL BACKFILL] {inserted_snapshots} price snapshots inserted by {workers} workers "
+        f"in {summary['elapsed_seconds']}s."
+    )
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill daily price snapshots with a process pool")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, required=True, help="Last day, inclusive (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, CPU count by default")
+    parser.add_argument("--partition", choices=[PARTITION_BY_DATE, PARTITION_BY_PRODUCT], default=PARTITION_BY_DATE)
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="Rows per upsert and commit")
+    parser.add_argument("--chunk-days", type=int, default=BACKFILL_CHUNK_DAYS, help="Days generated at once")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the price streams")
+    parser.add_argument("--policy", choices=[policy.value for policy in UpsertPolicy], default=UpsertPolicy.Skip.value,
+                        help="What to do with existing snapshots")
+    parser.add_argument("--resume", action="store_true", help="Continue the latest unfinished run with the same arguments")
+    parser.add_argument("--quiet", action="store_true", help="Do not print progress")
+    args = parser.parse_args()
+
+    with leader(INGESTION_LOCK) as is_leader:
+        if not is_leader:
+            parser.exit(1, "[PARALLEL BACKFILL] Another process is ingesting prices, try again once it finishes.\n")
+
+        run_parallel_backfill(
+            args.start,
+            args.end,
+            workers=args.workers,
+            partition=args.partition,
+            batch_size=args.batch_size,
+            chunk_days=args.chunk_days,
+            seed=args.seed,
+            policy=UpsertPolicy(args.policy),
+            resume=args.resume,
+            progress=not args.quiet
+        )
@@ -0,0 +1,129 @@
+"""Building blocks of streaming generator pipelines"""
+import asyncio
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from itertools import islice
+from typing import Optional, Iterable, Iterator, AsyncIterator, Callable, List, TypeVar, Any
+
+T = TypeVar("T")
+
+PIPELINE_QUEUE_SIZE = 1000
+
+@dataclass
+class StageStats:
+    """
+    Items produced by a pipeline stage and the time it spent producing them
+
+    Time spent in the upstream stage is excluded, so the throughput of every
+    stage can be compared to find the bottleneck.
+    """
+    name: str
+    upstream: Optional["StageStats"] = None
+    items: int = 0
+    total_seconds: float = 0.0
+
+    @property
+    def seconds(self) -> float:
+        upstream_seconds = self.upstream.total_seconds if self.upstream else 0.0
+        return max(self.total_seconds - upstream_seconds, 0.0)
+
+    @property
+    def throughput(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "items": self.items,
+            "seconds": round(self.seconds, 3),
+            "items_per_second": round(self.throughput, 1)
+        }
+
+def metered(items: Iterable[T],
+            stats: StageStats,
+            size: Callable[[T], int] = lambda item: 1) -> Iterator[T]:
+    """
+    Passes items through, counting them and timing how long each took to produce
+
+    Args:
+        items: Stage output
+        stats: Stats of the stage, updated in place
+        size: Number of items an output counts for, e.g. len for chunks
+    """
+    iterator = iter(items)
+    while True:
+        started_at = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stats.total_seconds += time.perf_counter() - started_at
+            return
+        stats.total_seconds += time.perf_counter() - started_at
+        stats.items += size(item)
+        yield item
+
+def chunked(items: Iterable[T], chunk_size: int) -> Iterator[List[T]]:
+    """
+    Groups items into lists of at most chunk_size items
+    """
+    iterator = iter(items)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+_DONE = object()
+
+def buffered_async(produce: Callable[[], AsyncIterator[T]], maxsize: int = PIPELINE_QUEUE_SIZE) -> Iterator[T]:
+    """
+    Runs an async producer on its own event loop thread and yields its items
+
+    The producer and the consumer are decoupled by a queue of at most maxsize
+    items. A full queue blocks the producer, so memory stays bounded however
+    fast the producer is. Errors of the producer are raised in the consumer.
+
+    Args:
+        produce: Returns the async iterator to drain
+        maxsize: Queue capacity
+    """
+    items = queue.Queue(maxsize)
+    stopped = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def pump() -> None:
+        async for item in produce():
+            # Waits for queue space on a worker thread, the loop keeps driving in-flight fetches
+            if not await asyncio.to_thread(put, item):
+                return
+
+    def run() -> None:
+        try:
+            asyncio.run(pump())
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+
+    thread = threading.Thread(target=run, name="pipeline-producer", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
+        thread.join()
@@ -1,47 +1,129 @@
 """Generate Synthetic price according to events"""
+from dataclasses import dataclass
 from datetime import date, timedelta
-from typing import Optional, Tuple
+from types import ModuleType
+from typing import Optional, Tuple, List, Union
 import random
+import numpy as np
 from sqlalchemy.orm import Session
 
-from shared.constants import PriceType, DAILY_PRICE_NOISE
-from backend.api.events import crud as event_crud
-from backend.models import Event
+from shared.config import get_settings
+from shared.constants import PriceType, DAILY_PRICE_NOISE, PRICE_CHANGE_REASONS, NO_EVENT_ID
+from backend.api.events.calendar import CalendarEvent, EventCalendar, get_event_calendar
 
 
+# --------------------------------------------------
+# Random streams
+# --------------------------------------------------
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_TO_UNIT = 1.0 / (1 << 53)
+
+def _mix64(value: int) -> int:
+    """
+    SplitMix64 finalizer on Python ints
+    """
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+def _mix64_array(values: np.ndarray) -> np.ndarray:
+    """
+    SplitMix64 finalizer on uint64 arrays, wraps exactly like _mix64
+    """
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+def keyed_random(seed: int, product_id: int, current_date: date, draw: int) -> float:
+    """
+    Returns the draw-th uniform [0, 1) value of the (seed, product_id, date) stream
+    """
+    key = _mix64(seed & _MASK64)
+    key = _mix64(key ^ product_id)
+    key = _mix64(key ^ current_date.toordinal())
+    key = _mix64(key ^ draw)
+    return (key >> 11) * _TO_UNIT
+
+def keyed_random_array(seed: int, product_ids: np.ndarray, current_date: date, draw: int) -> np.ndarray:
+    """
+    Vectorized keyed_random for many products on the same date, bit-identical to it
+    """
+    key = np.uint64(_mix64(seed & _MASK64))
+    keys = _mix64_array(np.asarray(product_ids, dtype=np.uint64) ^ key)
+    keys = _mix64_array(keys ^ np.uint64(current_date.toordinal()))
+    keys = _mix64_array(keys ^ np.uint64(draw))
+    return (keys >> np.uint64(11)).astype(np.float64) * _TO_UNIT
+
+class PriceStream:
+    """
+    Independent random stream of one product on one day
+
+    Stateless hashing of (seed, product_id, date, draw) instead of a shared
+    generator: any snapshot can be regenerated alone, in any order, by any
+    worker. Exposes uniform() like the random module, so both can be used
+    by the price adjustments.
+    """
+
+    def __init__(self, seed: int, product_id: int, current_date: date):
+        self.seed = seed
+        self.product_id = product_id
+        self.current_date = current_date
+        self.draws = 0
+
+    def random(self) -> float:
+        value = keyed_random(self.seed, self.product_id, self.current_date, self.draws)
+        self.draws += 1
+        return value
+
+    def uniform(self, low: float, high: float) -> float:
+        # Same formula as random.uniform
+        return low + (high - low) * self.random()
+
+# Anything with a random.uniform compatible uniform(low, high): the random module or a PriceStream
+RandomSource = Union[PriceStream, random.Random, ModuleType]
+
+def round_price(price: float) -> float:
+    """
+    Rounds a price to cents exactly like the batch engine does
+    """
+    return float(np.round(price, 2))
+
 # --------------------------------------------------
 # Price adjustments
 # --------------------------------------------------
 
-def apply_pre_event_uplift(price: float, uplift_range: Tuple[float, float]) -> float:
+def apply_pre_event_uplift(price: float, uplift_range: Tuple[float, float], rng: RandomSource = random) -> float:
     """
     Applies a small uplift before special events.
     """
-    uplift = random.uniform(*uplift_range)
+    uplift = rng.uniform(*uplift_range)
     return price * (1 + uplift)
 
 
-def apply_event_discount(price: float, discount_range: Tuple[float, float]) -> float:
+def apply_event_discount(price: float, discount_range: Tuple[float, float], rng: RandomSource = random) -> float:
     """
     Applies discount during the event.
     """
-    discount = random.uniform(*discount_range)
+    discount = rng.uniform(*discount_range)
     return price * (1 - discount)
 
 
-def apply_daily_noise(price: float, noise_range: Tuple[float, float] = DAILY_PRICE_NOISE) -> float:
+def apply_daily_noise(price: float, noise_range: Tuple[float, float] = DAILY_PRICE_NOISE, rng: RandomSource = random) -> float:
     """
     Applies small daily random fluctuation.
     """
-    noise = random.uniform(*noise_range)
+    noise = rng.uniform(*noise_range)
     return price * (1 + noise)
 
 # --------------------------------------------------
 # Event price update
 # --------------------------------------------------
 
-def active_event_price_update(base_price: float, active_event: Event, metadata: dict) -> Tuple[float, dict]:
-    discount = random.uniform(
+def active_event_price_update(base_price: float, active_event: CalendarEvent, metadata: dict, rng: RandomSource = random) -> Tuple[float, dict]:
+    discount = rng.uniform(
         active_event.discount_min,
         active_event.discount_max
     )
@@ -58,13 +140,13 @@ def active_event_price_update(base_price: float, active_event: Event, metadata:
 
     if active_event.noise_enabled:
         # Normal daily noise
-        final_price = apply_daily_noise(final_price)
+        final_price = apply_daily_noise(final_price, rng=rng)
         metadata["adjustment_reason"] += "+noise"
 
     return final_price, metadata
 
-def pre_event_price_update(base_price: float, pre_event: Event, metadata: dict) -> Tuple[float, dict]:
-    uplift = random.uniform(
+def pre_event_price_update(base_price: float, pre_event: CalendarEvent, metadata: dict, rng: RandomSource = random) -> Tuple[float, dict]:
+    uplift = rng.uniform(
         pre_event.pre_event_uplift_min,
         pre_event.pre_event_uplift_max,
     )
@@ -81,7 +163,7 @@ def pre_event_price_update(base_price: float, pre_event: Event, metadata: dict)
 
     if pre_event.noise_enabled:
         # Normal daily noise
-        final_price = apply_daily_noise(final_price)
+        final_price = apply_daily_noise(final_price, rng=rng)
         metadata["adjustment_reason"] += "+noise"
 
     return final_price, metadata
@@ -95,10 +177,55 @@ def generate_daily_price(
     base_price: float,
     current_date: date,
     pricing_mode: PriceType = PriceType.Synthetic,
+    calendar: Optional[EventCalendar] = None,
+    product_id: Optional[int] = None,
+    seed: Optional[int] = None,
 ) -> Tuple[float, dict]:
     """
     Generates the final daily price and metadata.
 
+    Args:
+        calendar: Event calendar to resolve events from, the cached one by default
+        product_id: Product being priced. When given, the price is drawn from the
+            product's stream for the day and matches generate_price_matrix.
+            Otherwise the global random module is used.
+        seed: Seed of the product streams, PRICE_SEED setting by default
+
+    Returns:
+        final_price: float
+        metadata: dict
+    """
+    active_event = None
+    pre_event = None
+
+    if pricing_mode == PriceType.Synthetic:
+        if calendar is None:
+            calendar = get_event_calendar(db)
+        active_event, pre_event = calendar.resolve(current_date)
+
+    rng = random
+    if product_id is not None:
+        rng = PriceStream(get_settings().price_seed if seed is None else seed, product_id, current_date)
+
+    return generate_event_price(base_price, current_date, active_event, pre_event, pricing_mode, rng)
+
+def generate_event_price(
+    base_price: float,
+    current_date: date,
+    active_event: Optional[CalendarEvent],
+    pre_event: Optional[CalendarEvent],
+    pricing_mode: PriceType = PriceType.Synthetic,
+    rng: RandomSource = random,
+) -> Tuple[float, dict]:
+    """
+    Generates the final daily price for events that are already resolved.
+
+    Callers pricing many products for the same date look the events up once
+    and reuse them for every product.
+
+    Args:
+        rng: Random source, a PriceStream for reproducible prices
+
     Returns:
         final_price: float
         metadata: dict
@@ -115,24 +242,136 @@ def generate_daily_price(
 
     # Real pricing mode
     if pricing_mode == PriceType.Real:
-        return round(price, 2), metadata
+        return round_price(price), metadata
     
     # Synthetic pricing mode
 
     # Active event
-    active_event = event_crud.get_active_event(db, current_date)
     if active_event:
-        final_price, metadata = active_event_price_update(base_price, active_event, metadata)
-        return round(final_price, 2), metadata
+        final_price, metadata = active_event_price_update(base_price, active_event, metadata, rng)
+        return round_price(final_price), metadata
     
     # Pre-event
-    pre_event = event_crud.get_pre_event(db, current_date)
     if pre_event:
-        final_price, metadata = pre_event_price_update(base_price, pre_event, metadata)
-        return round(final_price, 2), metadata
+        final_price, metadata = pre_event_price_update(base_price, pre_event, metadata, rng)
+        return round_price(final_price), metadata
     
     # Normal day noise
-    final_price = apply_daily_noise(base_price)
+    final_price = apply_daily_noise(base_price, rng=rng)
     metadata["adjustment_reason"] += "+noise"
 
-    return round(final_price, 2), metadata
\ No newline at end of file
+    return round_price(final_price), metadata
+
+# --------------------------------------------------
+# Batch entry point
+# --------------------------------------------------
+
+@dataclass
+class PriceMatrix:
+    """Prices of a catalog over a date range, one row per product and one column per day"""
+    dates: List[date]
+    prices: np.ndarray # float64, rounded to cents
+    reason_codes: np.ndarray # int8, index into PRICE_CHANGE_REASONS
+    event_ids: np.ndarray # int32, NO_EVENT_ID when no event is active
+
+    def reason(self, product_index: int, day_index: int) -> str:
+        return PRICE_CHANGE_REASONS[self.reason_codes[product_index, day_index]]
+
+    def event_id(self, product_index: int, day_index: int) -> Optional[int]:
+        event_id = int(self.event_ids[product_index, day_index])
+        return None if event_id == NO_EVENT_ID else event_id
+
+def date_range(start_date: date, end_date: date) -> List[date]:
+    """
+    Returns every date between start_date and end_date, both inclusive
+    """
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+def generate_price_matrix(
+    product_ids: np.ndarray,
+    base_prices: np.ndarray,
+    start_date: date,
+    end_date: date,
+    calendar: EventCalendar,
+    pricing_mode: PriceType = PriceType.Synthetic,
+    seed: Optional[int] = None,
+) -> PriceMatrix:
+    """
+    Generates daily prices for a whole catalog over a date range in one pass.
+
+    Applies the same rules as generate_daily_price: event days get a discount,
+    pre-event days an uplift, normal days the daily noise, and event or
+    pre-event days noise on top when the event enables it. Every cell is
+    drawn from its (seed, product_id, date) stream, so it equals
+    generate_daily_price for the same product, day and seed.
+
+    Args:
+        product_ids: ID of every product
+        base_prices: Base price of every product
+        start_date: First day of the range
+        end_date: Last day of the range, inclusive
+        calendar: Event calendar to resolve events from
+        pricing_mode: Synthetic or real pricing
+        seed: Seed of the product streams, PRICE_SEED setting by default
+
+    Returns:
+        PriceMatrix of shape (products, days)
+    """
+    base_prices = np.asarray(base_prices, dtype=np.float64)
+    dates = date_range(start_date, end_date)
+    shape = (len(base_prices), len(dates))
+
+    if pricing_mode == PriceType.Real:
+        return PriceMatrix(
+            dates=dates,
+            prices=np.round(np.repeat(base_prices[:, None], len(dates), axis=1), 2),
+            reason_codes=np.full(shape, PRICE_CHANGE_REASONS.index("base_price"), dtype=np.int8),
+            event_ids=np.full(shape, NO_EVENT_ID, dtype=np.int32)
+        )
+
+    if seed is None:
+        seed = get_settings().price_seed
+    product_ids = np.asarray(product_ids, dtype=np.uint64)
+
+    noise_low, noise_high = DAILY_PRICE_NOISE
+    # Filled day by day, transposed to (products, days) at the end
+    prices_by_day = np.empty((len(dates), len(base_prices)))
+    day_reason_codes = np.empty(len(dates), dtype=np.int8)
+    day_event_ids = np.full(len(dates), NO_EVENT_ID, dtype=np.int32)
+
+    for day_index, current_date in enumerate(dates):
+        active_event, pre_event = calendar.resolve(current_date)
+
+        # Draw 0 is scaled into [low, high] and applied with sign, draw 1 is
+        # the noise of noisy event or pre-event days, as in PriceStream.
+        if active_event:
+            low, high, sign = active_event.discount_min, active_event.discount_max, -1.0
+            noisy = active_event.noise_enabled
+            reason = "event_discount"
+            day_event_ids[day_index] = active_event.event_id
+        elif pre_event:
+            low, high, sign = pre_event.pre_event_uplift_min, pre_event.pre_event_uplift_max, 1.0
+            noisy = pre_event.noise_enabled
+            reason = "pre_event_uplift"
+        else:
+            low, high, sign = noise_low, noise_high, 1.0
+            noisy = False
+            reason = "base_price+noise"
+
+        day_prices = prices_by_day[day_index]
+        adjustment = low + (high - low) * keyed_random_array(seed, product_ids, current_date, 0)
+        np.multiply(base_prices, 1 + sign * adjustment, out=day_prices)
+
+        if noisy:
+            noise = noise_low + (noise_high - noise_low) * keyed_random_array(seed, product_ids, current_date, 1)
+            day_prices *= 1 + noise
+            reason += "+noise"
+
+        day_reason_codes[day_index] = PRICE_CHANGE_REASONS.index(reason)
+
+    return PriceMatrix(
+        dates=dates,
+        prices=np.round(prices_by_day, 2).T,
+        reason_codes=np.broadcast_to(day_reason_codes, shape).copy(),
+        event_ids=np.broadcast_to(day_event_ids, shape).copy()
+    )
@@ -0,0 +1,75 @@
+"""On-disk HTTP response cache with conditional request validators"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict
+
+
+class CacheMissError(LookupError):
+    """Raised in offline mode when a response is not cached"""
+
+
+@dataclass
+class CachedResponse:
+    """Stored response body with its validators"""
+    url: str
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.stored_at < ttl
+
+    def validators(self) -> Dict[str, str]:
+        """
+        Headers turning the next request into a conditional one
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Response bodies stored as one JSON file per request under directory
+
+    Files are replaced atomically, so concurrent readers never see a partial entry.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha256(key.encode()).hexdigest()}.json")
+
+    def load(self, key: str) -> Optional[CachedResponse]:
+        """
+        Returns the stored response for key, or None if not cached or unreadable
+        """
+        try:
+            with open(self._path(key), encoding="utf-8") as file:
+                return CachedResponse(**json.load(file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def store(self, key: str, response: CachedResponse) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(asdict(response), file)
+        os.replace(temporary_path, path)
+
+    def touch(self, key: str, response: CachedResponse) -> None:
+        """
+        Restarts the TTL of a response the server confirmed as unchanged
+        """
+        response.stored_at = time.time()
+        self.store(key, response)
@@ -0,0 +1,227 @@
+"""
+Monthly rollups of price snapshots
+
+price_rollups_monthly keeps the snapshot count, sum, min, max and sum of
+squares of every product and month, so price summaries read a row per
+month instead of a row per day.
+
+Writers update the rollups of the product-months they touched before
+committing. When a Skip upsert inserted every snapshot, the new prices
+are added to the rollups; otherwise the rollup is recomputed from the
+snapshots of that month, which reads at most a month of the covering
+index per product and stays correct whatever the upsert policy did to
+existing snapshots. Months moved to the Parquet archive (backend.archive)
+keep their rollups as they were.
+
+Usage:
+    python -m backend.ingestion.rollups --start 2026-01-01 --end 2026-12-31
+"""
+import argparse
+from collections import defaultdict
+from datetime import date
+from typing import Optional, Dict, List, Sequence, Tuple
+from sqlalchemy import Integer, bindparam, case, delete, func, insert, literal, select, tuple_, type_coerce, update
+from sqlalchemy.orm import Session
+
+from backend.archive import archived_months
+from backend.database import SessionLocal
+from backend.ingestion.pipeline import chunked
+from backend.models import PriceHistory, PriceRollup
+from backend.partitions import add_months, month_start, months_between
+from shared.config import get_settings
+from shared.constants import PriceStorage, UpsertPolicy
+
+# Products per refresh statement, bounds the IN list
+ROLLUP_PRODUCT_CHUNK = 1000
+
+def raw_price():
+    """
+    Stored price in integer cents, for exact sums
+    """
+    return type_coerce(PriceHistory.price, Integer)
+
+def refresh_rollups(db: Session,
+                    start_date: date,
+                    end_date: date,
+                    product_ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Recomputes the rollups of the months between two dates from the snapshots
+
+    Runs in the transaction of db, the caller commits it along with the
+    snapshots. Only the given products are refreshed, ROLLUP_PRODUCT_CHUNK
+    of them per statement.
+
+    Args:
+        db: Database session
+        start_date: Any day of the first month
+        end_date: Any day of the last month
+        product_ids: Products to refresh, all of them if None
+
+    Returns:
+        Number of refreshed months, archived months are skipped
+    """
+    if product_ids is not None and not product_ids:
+        return 0
+
+    archived = set(archived_months())
+    months = [month for month in months_between(start_date, end_date) if month not in archived]
+    id_chunks = [None] if product_ids is None else list(chunked(sorted(set(product_ids)), ROLLUP_PRODUCT_CHUNK))
+
+    for month in months:
+        for id_chunk in id_chunks:
+            _refresh_month(db, month, id_chunk)
+
+    return len(months)
+
+def _refresh_month(db: Session, month: date, product_ids: Optional[List[int]]) -> None:
+    in_month = [PriceHistory.recorded_date >= month, PriceHistory.recorded_date < add_months(month, 1)]
+    rollup_filter = [PriceRollup.month == month]
+    if product_ids is not None:
+        in_month.append(PriceHistory.product_id.in_(product_ids))
+        rollup_filter.append(PriceRollup.product_id.in_(product_ids))
+
+    price = raw_price()
+    aggregates = (
+        select(
+            PriceHistory.product_id,
+            literal(month, PriceRollup.month.type),
+            func.count(),
+            func.sum(price),
+            func.min(price),
+            func.max(price),
+            func.sum(price * price)
+        )
+        .where(*in_month)
+        .group_by(PriceHistory.product_id)
+    )
+
+    db.execute(delete(PriceRollup).where(*rollup_filter))
+    db.execute(insert(PriceRollup).from_select(
+        ["product_id", "month", "snapshots", "price_sum", "price_min", "price_max", "price_sum_squares"],
+        aggregates
+    ))
+
+def add_to_rollups(db: Session, rows: List[dict]) -> int:
+    """
+    Adds new snapshots to the rollups of their months without reading the months
+
+    Only correct for snapshots that did not exist before the write, whose
+    prices are not yet part of any rollup.
+
+    Args:
+        db: Database session
+        rows: Inserted price history values
+
+    Returns:
+        Number of updated or created product-month rollups, archived months are skipped
+    """
+    archived = set(archived_months())
+    deltas: Dict[Tuple[int, date], List[int]] = defaultdict(lambda: [0, 0, None, None, 0])
+    for row in rows:
+        month = month_start(row["recorded_date"])
+        if month in archived:
+            continue
+        cents = int(round(row["price"] * 100))
+        delta = deltas[(row["product_id"], month)]
+        delta[0] += 1
+        delta[1] += cents
+        delta[2] = cents if delta[2] is None else min(delta[2], cents)
+        delta[3] = cents if delta[3] is None else max(delta[3], cents)
+        delta[4] += cents * cents
+
+    updates = []
+    inserts = []
+    for key_chunk in chunked(list(deltas), ROLLUP_PRODUCT_CHUNK):
+        existing = set(db.execute(
+            select(PriceRollup.product_id, PriceRollup.month)
+            .where(tuple_(PriceRollup.product_id, PriceRollup.month).in_(key_chunk))
+        ).all())
+        for key in key_chunk:
+            snapshots, price_sum, price_min, price_max, price_sum_squares = deltas[key]
+            values = {
+                "product_id": key[0], "month": key[1], "snapshots": snapshots, "price_sum": price_sum,
+                "price_min": price_min, "price_max": price_max, "price_sum_squares": price_sum_squares
+            }
+            (updates if key in existing else inserts).append(values)
+
+    if inserts:
+        db.execute(insert(PriceRollup), inserts)
+    if updates:
+        # Core executemany of one UPDATE, parameter names must not clash with the column names
+        price_min = bindparam("new_min")
+        price_max = bindparam("new_max")
+        db.connection().execute(
+            update(PriceRollup)
+            .where(PriceRollup.product_id == bindparam("key_product_id"), PriceRollup.month == bindparam("key_month"))
+            .values(
+                snapshots=PriceRollup.snapshots + bindparam("new_snapshots"),
+                price_sum=PriceRollup.price_sum + bindparam("new_sum"),
+                price_min=case((PriceRollup.price_min > price_min, price_min), else_=PriceRollup.price_min),
+                price_max=case((PriceRollup.price_max < price_max, price_max), else_=PriceRollup.price_max),
+                price_sum_squares=PriceRollup.price_sum_squares + bindparam("new_sum_squares")
+            ),
+            [
+                {
+                    "key_product_id": values["product_id"], "key_month": values["month"],
+                    "new_snapshots": values["snapshots"], "new_sum": values["price_sum"],
+                    "new_min": values["price_min"], "new_max": values["price_max"],
+                    "new_sum_squares": values["price_sum_squares"]
+                }
+                for values in updates
+            ]
+        )
+
+    return len(deltas)
+
+def update_rollups(db: Session, rows: List[dict], policy: UpsertPolicy, written: int) -> None:
+    """
+    Brings the rollups up to date with a write of snapshots, in its transaction
+
+    A Skip upsert that inserted every row adds the rows to the rollups,
+    any other write refreshes the product-months of the rows.
+
+    Args:
+        db: Database session
+        rows: Price history values given to write_price_snapshots
+        policy: Conflict policy of the write
+        written: Rows inserted or changed, as returned by write_price_snapshots
+    """
+    if not rows or PriceStorage(get_settings().price_storage) == PriceStorage.ChangePoints:
+        # Change points are aggregated from price_ranges, they have no rollups
+        return
+
+    if policy == UpsertPolicy.Skip and written == len(rows):
+        add_to_rollups(db, rows)
+        return
+
+    days = [row["recorded_date"] for row in rows]
+    refresh_rollups(db, min(days), max(days), [row["product_id"] for row in rows])
+
+def rebuild_rollups(start_date: date, end_date: date) -> int:
+    """
+    Recomputes the rollups of every product, one month per commit
+
+    Returns:
+        Number of rebuilt months
+    """
+    db = SessionLocal()
+    try:
+        for month in months_between(start_date, end_date):
+            refresh_rollups(db, month, month)
+            db.commit()
+            print(f"[ROLLUPS] {month:%Y-%m} rebuilt.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return len(list(months_between(start_date, end_date)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the monthly price rollups from the snapshots")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="Any day of the first month (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, required=True, help="Any day of the last month (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    rebuild_rollups(args.start, args.end)
@@ -0,0 +1,225 @@
+"""In-process daily ingestion scheduler with catch-up of missed days"""
+import threading
+from dataclasses import dataclass, asdict
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple, Callable
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend.coordination import INGESTION_LOCK, leader
+from backend.database import SessionLocal
+from backend.models import PriceHistory, PriceRange
+from backend.partitions import maintain_partitions
+from backend.ingestion.backfill import run_backfill
+from backend.ingestion.daily_ingestion import run_daily_ingestion
+from shared.config import get_settings
+from shared.constants import RunStatus
+
+# Last status of a catch-up left to another process
+SKIPPED_NOT_LEADER = "skipped_not_leader"
+
+def get_latest_recorded_date(db: Session) -> Optional[date]:
+    """
+    Latest day stored as a snapshot or as the end of a change point run
+    """
+    latest_days = [
+        day.date() if isinstance(day, datetime) else day
+        for day in (db.scalar(select(func.max(PriceHistory.recorded_date))),
+                    db.scalar(select(func.max(PriceRange.valid_to))))
+        if day is not None
+    ]
+    return max(latest_days, default=None)
+
+def find_missing_dates(db: Session, today: date, max_catchup_days: int) -> Optional[Tuple[date, date]]:
+    """
+    Returns the days after the latest recorded snapshot up to today, None if there are none
+
+    An empty database starts from today, and gaps longer than max_catchup_days
+    are limited to their last max_catchup_days days.
+    """
+    latest = get_latest_recorded_date(db)
+    start_date = latest + timedelta(days=1) if latest else today
+    start_date = max(start_date, today - timedelta(days=max_catchup_days - 1))
+
+    if start_date > today:
+        return None
+    return start_date, today
+
+def next_run_at(now: datetime, run_at: time) -> datetime:
+    """
+    Next occurrence of run_at strictly after now
+    """
+    run = datetime.combine(now.date(), run_at)
+    if run <= now:
+        run += timedelta(days=1)
+    return run
+
+@dataclass
+class SchedulerState:
+    """What the scheduler is doing and how its last run went"""
+    enabled: bool
+    run_at: time
+    max_catchup_days: int
+    alive: bool = False
+    busy: bool = False
+    next_run_at: Optional[datetime] = None
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_elapsed_seconds: Optional[float] = None
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
+    last_start_date: Optional[date] = None
+    last_end_date: Optional[date] = None
+    last_inserted_snapshots: Optional[int] = None
+
+class IngestionScheduler:
+    """
+    Runs daily ingestion on a background thread of the API process
+
+    On start and at run_at every day, the days missing since the latest
+    recorded snapshot are ingested: today alone with the daily ingestion,
+    longer gaps with a backfill. Request handling is never blocked, the
+    ingestion runs on its own thread with its own database sessions.
+
+    Usage:
+        scheduler = IngestionScheduler(time(0, 5))
+        scheduler.start()
+        ...
+        scheduler.stop()
+    """
+
+    def __init__(self,
+                 run_at: time,
+                 max_catchup_days: int = 31,
+                 enabled: bool = True,
+                 session_factory: Callable[[], Session] = SessionLocal):
+        self.state = SchedulerState(enabled=enabled, run_at=run_at, max_catchup_days=max_catchup_days)
+        self._session_factory = session_factory
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if not self.state.enabled or (self._thread and self._thread.is_alive()):
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run_forever, name="ingestion-scheduler", daemon=True)
+        self._thread.start()
+        print(f"[SCHEDULER] Started, daily run at {self.state.run_at:%H:%M}.")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the scheduler, waiting at most timeout seconds for a run in progress
+        """
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.state.next_run_at = None
+
+    def status(self) -> dict:
+        with self._lock:
+            self.state.alive = bool(self._thread and self._thread.is_alive())
+            return asdict(self.state)
+
+    def catch_up(self, today: Optional[date] = None) -> Optional[dict]:
+        """
+        Ingests the days missing up to today, if this process is the ingestion leader
+
+        Processes losing the election skip the run right away. The leader
+        also maintains the partitions of price_histories when enabled.
+
+        Returns:
+            Summary of the ingestion, None if nothing was missing or another process runs it
+        """
+        today = today or date.today()
+
+        with leader(INGESTION_LOCK) as is_leader:
+            if not is_leader:
+                with self._lock:
+                    self.state.last_status = SKIPPED_NOT_LEADER
+                print("[SCHEDULER] Ingestion runs in another process, skipping.")
+                return None
+
+            # Partitions of the coming months exist before their rows arrive
+            maintain_partitions(today)
+            return self._ingest_missing_dates(today)
+
+    def _ingest_missing_dates(self, today: date) -> Optional[dict]:
+        db = self._session_factory()
+        try:
+            missing = find_missing_dates(db, today, self.state.max_catchup_days)
+        finally:
+            db.close()
+
+        if missing is None:
+            return None
+
+        start_date, end_date = missing
+        with self._lock:
+            self.state.busy = True
+            self.state.last_started_at = datetime.now()
+            self.state.last_start_date = start_date
+            self.state.last_end_date = end_date
+            self.state.last_error = None
+
+        print(f"[SCHEDULER] Ingesting {start_date} - {end_date}.")
+        summary = None
+        try:
+            if start_date == end_date:
+                summary = run_daily_ingestion(end_date)
+            else:
+                summary = run_backfill(start_date, end_date, progress=False)
+            status, error = RunStatus.Completed, None
+        except Exception as e:
+            status, error = RunStatus.Failed, e
+            print(f"[SCHEDULER] Ingestion failed: {e!r}")
+
+        with self._lock:
+            self.state.busy = False
+            self.state.last_finished_at = datetime.now()
+            self.state.last_elapsed_seconds = round(
+                (self.state.last_finished_at - self.state.last_started_at).total_seconds(), 3
+            )
+            self.state.last_status = status.value
+            self.state.last_error = repr(error) if error else None
+            self.state.last_inserted_snapshots = summary["inserted_snapshots"] if summary else None
+
+        return summary
+
+    def _run_once(self) -> None:
+        """
+        Catches up, recording any failure so the next day runs again
+        """
+        try:
+            self.catch_up()
+        except Exception as e:
+            # Partition maintenance or the missing dates lookup failed, before or around the ingestion
+            with self._lock:
+                self.state.busy = False
+                self.state.last_finished_at = datetime.now()
+                self.state.last_status = RunStatus.Failed.value
+                self.state.last_error = repr(e)
+            print(f"[SCHEDULER] Catch-up failed: {e!r}")
+
+    def _run_forever(self) -> None:
+        self._run_once()
+
+        while not self._stopped.is_set():
+            run = next_run_at(datetime.now(), self.state.run_at)
+            self.state.next_run_at = run
+
+            if self._stopped.wait(max((run - datetime.now()).total_seconds(), 0)):
+                break
+            self._run_once()
+
+@lru_cache
+def get_scheduler() -> IngestionScheduler:
+    """Get the scheduler of this process, configured from settings"""
+    settings = get_settings()
+    return IngestionScheduler(
+        run_at=time.fromisoformat(settings.scheduler_run_at),
+        max_catchup_days=settings.scheduler_max_catchup_days,
+        enabled=settings.scheduler_enabled
+    )
@@ -1,10 +1,23 @@
-from datetime import date, timedelta
+from datetime import date
+from sqlalchemy import select
 
-from backend.ingestion.daily_ingestion import run_daily_ingestion
+from backend.database import SessionLocal
+from backend.models import PriceHistory, PriceRange
+from backend.ingestion.backfill import run_backfill
 
 
+def has_price_data() -> bool:
+    """
+    Whether any price snapshot is stored, without counting them
+    """
+    db = SessionLocal()
+    try:
+        return any(
+            db.scalar(select(model.id).limit(1)) is not None
+            for model in (PriceHistory, PriceRange)
+        )
+    finally:
+        db.close()
+
 def seed():
-    current_date = date(2026, 1, 1)
-    for _ in range(365):
-        run_daily_ingestion(current_date)
-        current_date += timedelta(days=1)
\ No newline at end of file
+    run_backfill(date(2026, 1, 1), date(2026, 12, 31))
@@ -0,0 +1,122 @@
+"""Idempotent bulk upsert of price snapshots"""
+from typing import List
+from sqlalchemy import case, func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from backend.models import PriceHistory
+from backend.ingestion.change_points import upsert_price_ranges
+from shared.config import get_settings
+from shared.constants import UpsertPolicy, PriceStorage
+
+UPSERT_BATCH_SIZE = 1000
+
+# Columns written again when an existing snapshot is replaced
+UPDATABLE_COLUMNS = ("event_id", "price", "price_change_reason", "price_source")
+
+def _mysql_upsert(policy: UpsertPolicy):
+    statement = mysql.insert(PriceHistory)
+    inserted = statement.inserted
+
+    if policy == UpsertPolicy.Skip:
+        # Duplicates are left out of the affected rows (ROW_COUNT), a no-op
+        # ON DUPLICATE KEY UPDATE counts them under the FOUND_ROWS client flag
+        return statement.prefix_with("IGNORE")
+
+    if policy == UpsertPolicy.Overwrite:
+        return statement.on_duplicate_key_update(
+            {column: inserted[column] for column in UPDATABLE_COLUMNS}
+        )
+
+    # MySQL applies assignments left to right, so price has to come last
+    is_lower = inserted.price < PriceHistory.price
+    assignments = [
+        (column, case((is_lower, inserted[column]), else_=PriceHistory.__table__.c[column]))
+        for column in UPDATABLE_COLUMNS if column != "price"
+    ]
+    assignments.append(("price", func.least(PriceHistory.price, inserted.price)))
+    return statement.on_duplicate_key_update(assignments)
+
+def _on_conflict_upsert(dialect_module, policy: UpsertPolicy):
+    """
+    INSERT ... ON CONFLICT for SQLite and PostgreSQL
+    """
+    statement = dialect_module.insert(PriceHistory)
+    excluded = statement.excluded
+    index_elements = [PriceHistory.product_id, PriceHistory.recorded_date]
+
+    if policy == UpsertPolicy.Skip:
+        return statement.on_conflict_do_nothing(index_elements=index_elements)
+
+    update = {column: excluded[column] for column in UPDATABLE_COLUMNS}
+    if policy == UpsertPolicy.Overwrite:
+        return statement.on_conflict_do_update(index_elements=index_elements, set_=update)
+
+    return statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_=update,
+        where=excluded.price < PriceHistory.price
+    )
+
+def build_upsert(dialect_name: str, policy: UpsertPolicy):
+    """
+    Returns the native upsert statement of the dialect for the policy
+
+    Raises:
+        ValueError if the dialect has no native upsert
+    """
+    if dialect_name == "mysql":
+        return _mysql_upsert(policy)
+    if dialect_name == "sqlite":
+        return _on_conflict_upsert(sqlite, policy)
+    if dialect_name == "postgresql":
+        return _on_conflict_upsert(postgresql, policy)
+
+    raise ValueError(f"Upsert is not supported on {dialect_name}")
+
+def upsert_price_histories(db: Session,
+                           rows: List[dict],
+                           policy: UpsertPolicy = UpsertPolicy.Skip,
+                           batch_size: int = UPSERT_BATCH_SIZE) -> int:
+    """
+    Writes snapshots with one multi-row upsert statement per batch
+
+    Conflicts on (product_id, recorded_date) are resolved by the database:
+        - Skip keeps the stored snapshot
+        - Overwrite replaces it with the new one
+        - KeepLowest keeps whichever has the lower price
+
+    Args:
+        db: Database session
+        rows: Price history insert values
+        policy: Conflict policy
+        batch_size: Rows per statement
+
+    Returns:
+        Number of rows inserted or changed, as reported by the database
+        (MySQL counts an updated row twice)
+    """
+    statement = build_upsert(db.get_bind().dialect.name, policy)
+    # Core executemany: the statement is compiled once and rowcount covers the whole batch
+    connection = db.connection()
+
+    written = 0
+    for start in range(0, len(rows), batch_size):
+        result = connection.execute(statement, rows[start:start + batch_size])
+        written += max(result.rowcount, 0)
+
+    return written
+
+def write_price_snapshots(db: Session,
+                          rows: List[dict],
+                          policy: UpsertPolicy = UpsertPolicy.Skip,
+                          batch_size: int = UPSERT_BATCH_SIZE) -> int:
+    """
+    Writes snapshots in the storage configured by the PRICE_STORAGE setting
+
+    Returns:
+        Number of snapshots inserted or changed
+    """
+    if PriceStorage(get_settings().price_storage) == PriceStorage.ChangePoints:
+        return upsert_price_ranges(db, rows, policy)
+    return upsert_price_histories(db, rows, policy, batch_size)
@@ -1,27 +1,34 @@
 """FastAPI application main entry point"""
 from datetime import datetime, timezone
-from fastapi import FastAPI, status
+from fastapi import FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from backend.database import engine
 
-from scripts.setup_database import setup_database
-from backend.ingestion.daily_ingestion import run_daily_ingestion
+from backend.startup import run_startup, get_readiness
+from backend.ingestion.scheduler import get_scheduler
 from backend.schemas import HealthResponse
+from shared.config import get_settings
+from shared.constants import StartupMode
 from backend.api.products.routes import router as product_router
 from backend.api.analytics.routes import router as analytic_router
 from backend.api.events.routes import router as event_router
+from backend.api.ingestion.routes import router as ingestion_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup"""
+    """Check the database on startup, seeding runs in the background"""
     # Startup
-    print("[STARTUP] Initializing database...")
-    setup_database()
+    mode = StartupMode(get_settings().startup_mode)
+    print(f"[STARTUP] Initializing database ({mode.value} mode)...")
+    scheduler = get_scheduler()
+    readiness = run_startup(mode, on_ready=scheduler.start)
+    print(f"[STARTUP] Ready to serve requests in {readiness.startup_seconds}s.")
     yield
     # Shutdown
     print("[SHUTDOWN] Application shutting down...")
+    scheduler.stop(timeout=5)
 
 # Create FastAPI app
 app = FastAPI(
@@ -45,6 +52,7 @@ app.add_middleware(
 app.include_router(product_router)
 app.include_router(analytic_router)
 app.include_router(event_router)
+app.include_router(ingestion_router)
 
 @app.get("/", status_code=status.HTTP_200_OK)
 def root():
@@ -71,13 +79,20 @@ def health_check():
     return HealthResponse(
         status="healthy" if db_status == "connected" else "unhealthy",
         timestamp=datetime.now(timezone.utc),
-        database=db_status
+        database=db_status,
+        **get_readiness().as_dict()
     )
 
+@app.get("/health/ready", response_model=HealthResponse)
+def readiness_check(response: Response):
+    """Readiness endpoint, 503 until startup and background seeding are done"""
+    health = health_check()
+    if not health.ready or health.status != "healthy":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return health
+
 if __name__ == "__main__":
     import uvicorn
-    from shared.config import get_settings
-
     settings = get_settings()
     uvicorn.run(
         "backend.main::app",
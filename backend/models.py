@@ -2,17 +2,27 @@
 from datetime import datetime, timezone
 from typing import Optional
 from sqlalchemy import (
-    Column, Integer, String, Float, DateTime,
-    Text, ForeignKey, Boolean, JSON, Date
+    Column, Integer, SmallInteger, BigInteger, String, Float, DateTime,
+    Text, ForeignKey, Boolean, JSON, Date, UniqueConstraint, Index,
+    event, insert
 )
 from sqlalchemy.orm import declarative_base, relationship
 
+from backend.column_types import Cents, Code
+from shared.constants import PRICE_CHANGE_REASONS, PRICE_SOURCES, DataScope
+
 Base = declarative_base()
 
 class Product(Base):
     """Products represents products in ecommerce"""
 
     __tablename__ = "products"
+    __table_args__ = (
+        # Ingestion resolves fetched products by external_id
+        Index("uq_products_external_id", "external_id", unique=True),
+        # Product listing orders by rating
+        Index("ix_products_rating", "rating"),
+    )
 
     product_id = Column(Integer, primary_key=True, autoincrement=True)
     external_id = Column(Integer, nullable=False)
@@ -20,6 +30,9 @@ class Product(Base):
     description = Column(String(1000), nullable=True)
     base_price = Column(Float, nullable=False)
     rating = Column(Float, nullable=False)
+
+    # Bumped when prices of this product alone are written, part of the analytics cache keys
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.now(timezone.utc))
@@ -35,16 +48,27 @@ class PriceHistory(Base):
     """Change of the price of the products"""
 
     __tablename__ = "price_histories"
+    __table_args__ = (
+        # One snapshot per product and day, ingestion upserts against it
+        UniqueConstraint("product_id", "recorded_date", name="uq_price_histories_product_date"),
+        # Covers the per-product date range queries of analytics without reading the rows
+        Index("ix_price_histories_product_date_price", "product_id", "recorded_date", "price"),
+        # Latest recorded day and whole-catalog date ranges
+        Index("ix_price_histories_recorded_date", "recorded_date"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     product_id = Column(Integer, ForeignKey("products.product_id", ondelete="CASCADE"), nullable=False)
     event_id = Column(Integer, ForeignKey("events.event_id", ondelete="CASCADE"), nullable=True)
     
-    price = Column(Float, nullable=False)
-    price_change_reason = Column(String(50), nullable=True)
-    price_source = Column(String(50), nullable=True)
+    # Compact encoding: integer cents, and codes of the price_change_reasons and price_sources lookup tables
+    price = Column(Cents, nullable=False)
+    price_change_reason = Column(
+        Code(PRICE_CHANGE_REASONS), ForeignKey("price_change_reasons.code", name="fk_price_histories_reason"), nullable=True
+    )
+    price_source = Column(Code(PRICE_SOURCES), ForeignKey("price_sources.code", name="fk_price_histories_source"), nullable=True)
 
-    recorded_date = Column(DateTime, nullable=False)
+    recorded_date = Column(Date, nullable=False)
     created_at = Column(DateTime, default=datetime.now(timezone.utc))
 
     # Relationship
@@ -54,10 +78,104 @@ class PriceHistory(Base):
     def __repr__(self):
         return f"<PriceHistory({self.id}, product_id={self.product_id}, price={self.price}, event_name='{self.event_name}')>"
     
+class PriceRange(Base):
+    """Run of consecutive days over which a product kept the same price, event, reason and source"""
+
+    __tablename__ = "price_ranges"
+    __table_args__ = (
+        # Runs of a product never overlap, lookups read them by product and date
+        UniqueConstraint("product_id", "valid_from", name="uq_price_ranges_product_from"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    product_id = Column(Integer, ForeignKey("products.product_id", ondelete="CASCADE"), nullable=False)
+    event_id = Column(Integer, ForeignKey("events.event_id", ondelete="CASCADE"), nullable=True)
+
+    price = Column(Cents, nullable=False)
+    price_change_reason = Column(
+        Code(PRICE_CHANGE_REASONS), ForeignKey("price_change_reasons.code", name="fk_price_ranges_reason"), nullable=True
+    )
+    price_source = Column(Code(PRICE_SOURCES), ForeignKey("price_sources.code", name="fk_price_ranges_source"), nullable=True)
+
+    valid_from = Column(Date, nullable=False)
+    valid_to = Column(Date, nullable=False) # Last day, inclusive
+
+    def __repr__(self):
+        return f"<PriceRange({self.id}, product_id={self.product_id}, price={self.price}, dates={self.valid_from} to {self.valid_to})>"
+
+class PriceRollup(Base):
+    """Aggregates of the snapshots of a product over a month, in cents"""
+
+    __tablename__ = "price_rollups_monthly"
+
+    product_id = Column(Integer, ForeignKey("products.product_id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True) # First day of the month
+
+    snapshots = Column(Integer, nullable=False)
+    price_sum = Column(BigInteger, nullable=False)
+    price_min = Column(Integer, nullable=False)
+    price_max = Column(Integer, nullable=False)
+    price_sum_squares = Column(BigInteger, nullable=False)
+
+    def __repr__(self):
+        return f"<PriceRollup(product_id={self.product_id}, month={self.month}, snapshots={self.snapshots})>"
+
+class PriceChangeReason(Base):
+    """Lookup table of the price_change_reason codes of price histories"""
+
+    __tablename__ = "price_change_reasons"
+
+    code = Column(SmallInteger, primary_key=True, autoincrement=False)
+    name = Column(String(50), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"<PriceChangeReason({self.code}, name='{self.name}')>"
+
+class PriceSource(Base):
+    """Lookup table of the price_source codes of price histories"""
+
+    __tablename__ = "price_sources"
+
+    code = Column(SmallInteger, primary_key=True, autoincrement=False)
+    name = Column(String(50), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"<PriceSource({self.code}, name='{self.name}')>"
+
+def _fill_lookup_table(labels):
+    def fill(table, connection, **kw):
+        connection.execute(insert(table), [{"code": code, "name": name} for code, name in enumerate(labels)])
+    return fill
+
+# Lookup tables are filled as soon as they are created
+event.listen(PriceChangeReason.__table__, "after_create", _fill_lookup_table(PRICE_CHANGE_REASONS))
+event.listen(PriceSource.__table__, "after_create", _fill_lookup_table(PRICE_SOURCES))
+
+class DataVersion(Base):
+    """Counter of the writes to a kind of analytics data, part of the analytics cache keys"""
+
+    __tablename__ = "data_versions"
+
+    scope = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DataVersion({self.scope}, version={self.version})>"
+
+def _fill_data_versions(table, connection, **kw):
+    connection.execute(insert(table), [{"scope": scope.value, "version": 0} for scope in DataScope])
+
+# Every scope has its row, writers only increment
+event.listen(DataVersion.__table__, "after_create", _fill_data_versions)
+
 class Event(Base):
     """Discount event"""
 
     __tablename__ = "events"
+    __table_args__ = (
+        # Active event lookups by date
+        Index("ix_events_start_end", "start_date", "end_date"),
+    )
 
     event_id = Column(Integer, primary_key=True, autoincrement=True)
     event_name = Column(String(255), nullable=False, unique=True)
@@ -83,3 +201,59 @@ class Event(Base):
 
     def __repr__(self):
         return f"<Event({self.event_id}, event_name='{self.event_name}', dates={self.start_date} to {self.end_date})>"
+
+class IngestionRun(Base):
+    """Journal of an ingestion or backfill run"""
+
+    __tablename__ = "ingestion_runs"
+
+    run_id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False)
+
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    chunk_days = Column(Integer, nullable=True)
+    seed = Column(Integer, nullable=True)
+    policy = Column(String(20), nullable=True)
+
+    inserted_snapshots = Column(Integer, default=0)
+    elapsed_seconds = Column(Float, nullable=True)
+    error = Column(Text, nullable=True)
+
+    # Timestamps
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Relationships
+    chunks = relationship("IngestionChunk", back_populates="run", cascade="all, delete-orphan", order_by="IngestionChunk.start_date")
+
+    def __repr__(self):
+        return f"<IngestionRun({self.run_id}, kind='{self.kind}', status='{self.status}', dates={self.start_date} to {self.end_date})>"
+
+class IngestionChunk(Base):
+    """Completed chunk of an ingestion run"""
+
+    __tablename__ = "ingestion_chunks"
+    __table_args__ = (
+        # A chunk is a date range over the whole catalog (shard -1) or one product shard
+        UniqueConstraint("run_id", "start_date", "end_date", "shard", name="uq_ingestion_chunks_run_chunk"),
+    )
+
+    chunk_id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, ForeignKey("ingestion_runs.run_id", ondelete="CASCADE"), nullable=False)
+
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    shard = Column(Integer, nullable=False, default=-1)
+
+    rows = Column(Integer, nullable=False)
+    inserted_snapshots = Column(Integer, nullable=False)
+    elapsed_seconds = Column(Float, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+
+    # Relationship
+    run = relationship("IngestionRun", back_populates="chunks")
+
+    def __repr__(self):
+        return f"<IngestionChunk(run_id={self.run_id}, dates={self.start_date} to {self.end_date}, shard={self.shard})>"
@@ -0,0 +1,353 @@
+"""
+Monthly range partitioning of price_histories
+
+On MySQL the table can be partitioned by month of recorded_date, so
+analytics queries filtered by date range only read the partitions of the
+range (partition pruning), and expired months are dropped or archived with
+a metadata change instead of a DELETE scanning the table. A catch-all
+partition takes rows past the last month, so inserts never fail when
+maintenance is late.
+
+Other databases keep an unpartitioned table: the same commands report
+months as virtual partitions and expire them with DELETE, which keeps
+tests and local SQLite stand-ins working.
+
+Usage:
+    python -m backend.partitions list
+    python -m backend.partitions partition --months-ahead 3
+    python -m backend.partitions ensure --months-ahead 3
+    python -m backend.partitions expire --retention-months 24 [--drop]
+"""
+import argparse
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional, List, Iterator
+from sqlalchemy import Engine, Connection, Date, bindparam, delete, extract, func, select, text
+from sqlalchemy.orm import Session
+
+from backend import database
+from backend.cache import bump_price_versions
+from backend.models import PriceHistory, PriceRollup
+from shared.config import get_settings
+
+PARTITIONED_TABLE = PriceHistory.__tablename__
+
+# Catch-all partition of the rows past the last month
+FUTURE_PARTITION = "pfuture"
+
+@dataclass(frozen=True)
+class Partition:
+    """Month of price_histories, end excluded. Virtual on unpartitioned tables"""
+    name: str
+    start: Optional[date]
+    end: Optional[date]
+    rows: int
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def months_between(start: date, end: date) -> Iterator[date]:
+    """
+    First days of the months from the month of start to the month of end, both included
+    """
+    month = month_start(start)
+    while month <= end:
+        yield month
+        month = add_months(month, 1)
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+def archive_table_name(partition: str) -> str:
+    return f"{PARTITIONED_TABLE}_archive_{partition}"
+
+def partition_definition(month: date) -> str:
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{add_months(month, 1)}')"
+
+def future_partition_definition() -> str:
+    return f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)"
+
+def is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "mysql":
+        return False
+
+    return bool(connection.scalar(text(
+        "SELECT COUNT(*) FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL"
+    ), {"table": PARTITIONED_TABLE}))
+
+def _mysql_partitions(connection: Connection) -> List[Partition]:
+    rows = connection.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {"table": PARTITIONED_TABLE}).all()
+
+    partitions = []
+    start = None
+    for name, description, table_rows in rows:
+        # RANGE COLUMNS bounds read like '2026-02-01 00:00:00', or MAXVALUE
+        end = None if description == "MAXVALUE" else date.fromisoformat(description.strip("'")[:10])
+        partitions.append(Partition(name=name, start=start, end=end, rows=table_rows or 0))
+        start = end
+    return partitions
+
+def _virtual_partitions(connection: Connection) -> List[Partition]:
+    year = extract("year", PriceHistory.recorded_date)
+    month = extract("month", PriceHistory.recorded_date)
+    rows = connection.execute(
+        select(year, month, func.count()).group_by(year, month).order_by(year, month)
+    ).all()
+
+    partitions = []
+    for year, month, count in rows:
+        start = date(int(year), int(month), 1)
+        partitions.append(Partition(name=partition_name(start), start=start, end=add_months(start, 1), rows=count))
+    return partitions
+
+def list_partitions(engine: Optional[Engine] = None) -> List[Partition]:
+    """
+    Partitions of price_histories, or its months when the table is not partitioned
+
+    Row counts of MySQL partitions are the estimates of the table statistics.
+    """
+    with (engine or database.engine).connect() as connection:
+        if is_partitioned(connection):
+            return _mysql_partitions(connection)
+        return _virtual_partitions(connection)
+
+def partition_table(months_ahead: int = 3, today: Optional[date] = None, engine: Optional[Engine] = None) -> List[str]:
+    """
+    Converts price_histories to monthly partitions, on MySQL only
+
+    MySQL partitioned tables take no foreign keys and need the partitioning
+    column in every unique key, so the foreign keys are dropped and the
+    primary key becomes (id, recorded_date). The table is rebuilt once, run
+    it in a maintenance window on large tables.
+
+    Args:
+        months_ahead: Months created after the current one
+        today: Current day, defaults to today
+        engine: Database engine, defaults to the configured one
+
+    Returns:
+        Names of the created partitions, empty if there was nothing to do
+    """
+    engine = engine or database.engine
+    today = today or date.today()
+
+    if engine.dialect.name != "mysql":
+        print(f"[PARTITIONS] {engine.dialect.name} tables are not partitioned, keeping {PARTITIONED_TABLE} as is.")
+        return []
+
+    with engine.begin() as connection:
+        if is_partitioned(connection):
+            print(f"[PARTITIONS] {PARTITIONED_TABLE} is already partitioned.")
+            return []
+
+        first_recorded = connection.scalar(select(func.min(PriceHistory.recorded_date)))
+        first_month = month_start(first_recorded or today)
+        months = list(months_between(first_month, add_months(month_start(today), months_ahead)))
+
+        foreign_keys = connection.scalars(text(
+            "SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND CONSTRAINT_TYPE = 'FOREIGN KEY'"
+        ), {"table": PARTITIONED_TABLE}).all()
+        for foreign_key in foreign_keys:
+            connection.exec_driver_sql(f"ALTER TABLE {PARTITIONED_TABLE} DROP FOREIGN KEY {foreign_key}")
+
+        connection.exec_driver_sql(
+            f"ALTER TABLE {PARTITIONED_TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, recorded_date)"
+        )
+
+        print(f"[PARTITIONS] Partitioning {PARTITIONED_TABLE} into {len(months)} months...")
+        definitions = [partition_definition(month) for month in months] + [future_partition_definition()]
+        connection.exec_driver_sql(
+            f"ALTER TABLE {PARTITIONED_TABLE} PARTITION BY RANGE COLUMNS(recorded_date) ({', '.join(definitions)})"
+        )
+
+    return [partition_name(month) for month in months]
+
+def ensure_future_partitions(months_ahead: int = 3, today: Optional[date] = None, engine: Optional[Engine] = None) -> List[str]:
+    """
+    Creates the partitions of the coming months ahead of time
+
+    The months are split off the catch-all partition, which only changes
+    metadata while it is empty, i.e. as long as maintenance runs ahead.
+
+    Args:
+        months_ahead: Months that should exist after the current one
+        today: Current day, defaults to today
+        engine: Database engine, defaults to the configured one
+
+    Returns:
+        Names of the created partitions, empty on unpartitioned tables
+    """
+    engine = engine or database.engine
+    today = today or date.today()
+
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            return []
+
+        last_end = max((partition.end for partition in _mysql_partitions(connection) if partition.end), default=None)
+        months = list(months_between(last_end or month_start(today), add_months(month_start(today), months_ahead)))
+        if not months:
+            return []
+
+        definitions = [partition_definition(month) for month in months] + [future_partition_definition()]
+        connection.exec_driver_sql(
+            f"ALTER TABLE {PARTITIONED_TABLE} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(definitions)})"
+        )
+
+    created = [partition_name(month) for month in months]
+    print(f"[PARTITIONS] Created partitions: {', '.join(created)}")
+    return created
+
+def _archive_mysql_partition(connection: Connection, partition: str) -> None:
+    """
+    Swaps the partition with an empty archive table of the same layout, an O(1) metadata change
+    """
+    archive = archive_table_name(partition)
+    archive_exists = connection.scalar(text(
+        "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+    ), {"table": archive})
+
+    if archive_exists:
+        # An interrupted run already swapped the rows out
+        remaining = connection.scalar(text(f"SELECT COUNT(*) FROM {PARTITIONED_TABLE} PARTITION ({partition})"))
+        if remaining:
+            raise RuntimeError(f"{archive} already exists and partition {partition} still holds {remaining} rows")
+        return
+
+    connection.exec_driver_sql(f"CREATE TABLE {archive} LIKE {PARTITIONED_TABLE}")
+    connection.exec_driver_sql(f"ALTER TABLE {archive} REMOVE PARTITIONING")
+    connection.exec_driver_sql(f"ALTER TABLE {PARTITIONED_TABLE} EXCHANGE PARTITION {partition} WITH TABLE {archive}")
+
+def _expire_virtual_partition(connection: Connection, partition: Partition, archive: bool) -> None:
+    start, end = partition.start, partition.end
+
+    if archive:
+        connection.execute(
+            text(
+                f"CREATE TABLE {archive_table_name(partition.name)} AS SELECT * FROM {PARTITIONED_TABLE} "
+                "WHERE recorded_date >= :start AND recorded_date < :end"
+            ).bindparams(bindparam("start", type_=Date()), bindparam("end", type_=Date())),
+            {"start": start, "end": end}
+        )
+
+    connection.execute(
+        delete(PriceHistory).where(PriceHistory.recorded_date >= start, PriceHistory.recorded_date < end)
+    )
+
+def expire_partitions(retention_months: int,
+                      archive: bool = True,
+                      today: Optional[date] = None,
+                      engine: Optional[Engine] = None) -> List[str]:
+    """
+    Drops or archives the months older than the retention
+
+    Args:
+        retention_months: Months kept before the current one
+        archive: Keep the expired rows in archive tables instead of dropping them
+        today: Current day, defaults to today
+        engine: Database engine, defaults to the configured one
+
+    Returns:
+        Names of the expired partitions
+    """
+    cutoff = add_months(month_start(today or date.today()), -retention_months)
+    return expire_before(cutoff, archive, engine=engine)
+
+def expire_before(cutoff: date,
+                  archive: bool = True,
+                  keep_rollups: bool = False,
+                  engine: Optional[Engine] = None) -> List[str]:
+    """
+    Drops or archives the months before the month of cutoff
+
+    Partitioned MySQL tables drop whole partitions, and archiving exchanges
+    them with a price_histories_archive_<partition> table first: both are
+    metadata changes whatever the partition size. Unpartitioned tables
+    copy the rows to the archive table and delete them. The rollups of the
+    expired months go with them, unless the months stay readable elsewhere,
+    and the cached price analytics are invalidated.
+
+    Args:
+        cutoff: Any day of the first month kept
+        archive: Keep the expired rows in archive tables instead of dropping them
+        keep_rollups: Keep the rollups of the expired months, for the Parquet archive
+        engine: Database engine, defaults to the configured one
+
+    Returns:
+        Names of the expired partitions
+    """
+    engine = engine or database.engine
+    cutoff = month_start(cutoff)
+
+    with engine.begin() as connection:
+        partitioned = is_partitioned(connection)
+        partitions = _mysql_partitions(connection) if partitioned else _virtual_partitions(connection)
+        expired = [partition for partition in partitions if partition.end and partition.end <= cutoff]
+
+        for partition in expired:
+            if not partitioned:
+                _expire_virtual_partition(connection, partition, archive)
+                continue
+
+            if archive:
+                _archive_mysql_partition(connection, partition.name)
+            connection.exec_driver_sql(f"ALTER TABLE {PARTITIONED_TABLE} DROP PARTITION {partition.name}")
+
+        if expired:
+            if not keep_rollups:
+                connection.execute(delete(PriceRollup).where(PriceRollup.month < cutoff))
+            bump_price_versions(Session(bind=connection))
+
+    names = [partition.name for partition in expired]
+    if names:
+        print(f"[PARTITIONS] {'Archived' if archive else 'Dropped'} partitions before {cutoff}: {', '.join(names)}")
+    return names
+
+def maintain_partitions(today: Optional[date] = None) -> None:
+    """
+    Creates the coming months and expires the old ones as configured in settings
+    """
+    settings = get_settings()
+    if not settings.price_partitioning:
+        return
+
+    ensure_future_partitions(settings.partition_months_ahead, today)
+    if settings.partition_retention_months > 0:
+        expire_partitions(settings.partition_retention_months, settings.partition_archive, today)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monthly partition maintenance of price_histories")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="Print the partitions and their estimated rows")
+
+    partition_parser = commands.add_parser("partition", help="Convert the table to monthly partitions (MySQL)")
+    partition_parser.add_argument("--months-ahead", type=int, default=3, help="Months created after the current one")
+
+    ensure_parser = commands.add_parser("ensure", help="Create the partitions of the coming months")
+    ensure_parser.add_argument("--months-ahead", type=int, default=3, help="Months that should exist after the current one")
+
+    expire_parser = commands.add_parser("expire", help="Archive or drop the months older than the retention")
+    expire_parser.add_argument("--retention-months", type=int, required=True, help="Months kept before the current one")
+    expire_parser.add_argument("--drop", action="store_true", help="Drop expired rows instead of archiving them")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for partition in list_partitions():
+            print(f"{partition.name}\t{partition.start or '-'}\t{partition.end or 'MAXVALUE'}\t{partition.rows}")
+    elif args.command == "partition":
+        partition_table(args.months_ahead)
+    elif args.command == "ensure":
+        ensure_future_partitions(args.months_ahead)
+    else:
+        expire_partitions(args.retention_months, archive=not args.drop)
@@ -1,7 +1,9 @@
 """Pydantic schemas for request/response validation"""
-from datetime import date, datetime
+from datetime import date, datetime, time
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from shared.constants import PRICE_CHANGE_REASONS, UpsertPolicy
 
 # Product Schemas
 class ProductCreate(BaseModel):
@@ -30,6 +32,14 @@ class PriceHistoryCreate(BaseModel):
 
     recorded_date: datetime
 
+    @field_validator("price_change_reason")
+    @classmethod
+    def known_reason(cls, value: Optional[str]) -> Optional[str]:
+        # Reasons are stored as codes of PRICE_CHANGE_REASONS
+        if value is not None and value not in PRICE_CHANGE_REASONS:
+            raise ValueError(f"price_change_reason must be one of {', '.join(PRICE_CHANGE_REASONS)}")
+        return value
+
 class PriceHistoryResponse(PriceHistoryCreate):
     """Schema for price history response"""
     id: int
@@ -88,6 +98,7 @@ class PriceSummaryResponse(BaseModel):
     min_price: float
     max_price: float
     avg_price: float
+    stddev_price: Optional[float] = None
 
     model_config=ConfigDict(from_attributes=True)
 
@@ -119,16 +130,111 @@ class EventImpactResponse(BaseModel):
 
     pre_event_avg_price: float
     event_avg_price: float
-    post_event_avg_price: float
+    post_event_avg_price: Optional[float] = None
 
     pre_to_event_percentage_change: float
-    event_to_post_percentage_change: float
+    event_to_post_percentage_change: Optional[float] = None
+
+    model_config=ConfigDict(from_attributes=True)
+
+class PriceWindowStats(BaseModel):
+    """Schema for the price statistics of a window around an event"""
+    window: str
+    start_date: date
+    end_date: date
+
+    snapshots: int
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    avg_price: Optional[float] = None
+    stddev_price: Optional[float] = None
+
+class EventWindowStatsResponse(BaseModel):
+    """Schema for the price statistics of the windows around an event"""
+    event_id: int
+    event_name: str = Field(..., min_length=1, max_length=255)
+
+    product_id: int
+    windows: List[PriceWindowStats]
+
+class CacheStatsResponse(BaseModel):
+    """Schema for the analytics response cache metrics of the serving process"""
+    backend: str
+    hits: int
+    misses: int
+    stores: int
+    evictions: int
+    entries: Optional[int] = None
+    bytes: Optional[int] = None
+
+# Ingestion
+class SchedulerStatusResponse(BaseModel):
+    """Schema for the ingestion scheduler state"""
+    enabled: bool
+    run_at: time
+    max_catchup_days: int
+    alive: bool
+    busy: bool
+    next_run_at: Optional[datetime]
+
+    last_started_at: Optional[datetime]
+    last_finished_at: Optional[datetime]
+    last_elapsed_seconds: Optional[float]
+    last_status: Optional[str]
+    last_error: Optional[str]
+    last_start_date: Optional[date]
+    last_end_date: Optional[date]
+    last_inserted_snapshots: Optional[int]
+
+class BackfillRequest(BaseModel):
+    """Schema for starting a backfill through the API"""
+    start_date: date
+    end_date: date
+    seed: Optional[int] = None
+    policy: UpsertPolicy = UpsertPolicy.Skip
+    resume: bool = False
+
+class IngestionRunResponse(BaseModel):
+    """Schema for an ingestion run of the run journal"""
+    run_id: int
+    kind: str
+    status: str
+
+    start_date: date
+    end_date: date
+    policy: Optional[str]
+
+    inserted_snapshots: Optional[int]
+    elapsed_seconds: Optional[float]
+    error: Optional[str]
+
+    started_at: datetime
+    finished_at: Optional[datetime]
 
     model_config=ConfigDict(from_attributes=True)
 
+class LockMetricsResponse(BaseModel):
+    """Schema for the leader lock metrics of the serving process"""
+    acquired: int
+    skipped: int
+    held: bool
+    total_wait_seconds: float
+    max_wait_seconds: float
+    last_wait_seconds: Optional[float]
+    last_held_seconds: Optional[float]
+
 # Health Check Schema
 class HealthResponse(BaseModel):
     """Schema for health check response."""
     status: str
     timestamp: datetime
-    database: str
\ No newline at end of file
+    database: str
+
+    # Startup readiness of the serving process
+    ready: bool
+    mode: Optional[str]
+    schema_ready: bool
+    seeding: Optional[str]
+    seeding_error: Optional[str]
+    startup_seconds: Optional[float]
+    ready_at: Optional[datetime]
\ No newline at end of file
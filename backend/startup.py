@@ -0,0 +1,128 @@
+"""API startup: schema check, optional seeding and readiness"""
+import threading
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, List, Callable
+
+from backend.coordination import SETUP_LOCK, INGESTION_LOCK, leader
+from backend.database import init_db
+from backend.ingestion import seed_events
+from backend.ingestion import seed_data
+from shared.constants import StartupMode
+
+SEEDING_SKIPPED = "skipped"
+SEEDING_RUNNING = "running"
+SEEDING_COMPLETED = "completed"
+SEEDING_FAILED = "failed"
+SEEDING_ELSEWHERE = "elsewhere" # Another process won the seeding election
+
+# Seconds to wait for another process creating the schema
+SETUP_LOCK_TIMEOUT = 30
+
+@dataclass
+class Readiness:
+    """Startup progress of this API process, reported by /health"""
+    mode: Optional[str] = None
+    schema_ready: bool = False
+    seeding: Optional[str] = None
+    seeding_error: Optional[str] = None
+    startup_seconds: Optional[float] = None
+    ready_at: Optional[datetime] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "ready": self.ready}
+
+def ensure_schema() -> List[str]:
+    """
+    Brings the database schema to the latest migration, see init_db
+
+    Returns:
+        Names of the created tables
+    """
+    return init_db()
+
+def seed_prices(readiness: Readiness, on_ready: Optional[Callable[[], None]] = None) -> None:
+    """
+    Seeds the price history if this process is the seeding leader, and marks it ready once done
+
+    Seeding holds the ingestion lock, so the scheduler of a process losing
+    the election skips its catch-ups until the prices are seeded. Processes
+    losing the election skip seeding right away.
+    """
+    readiness.seeding = SEEDING_RUNNING
+    try:
+        with leader(INGESTION_LOCK) as is_leader:
+            if is_leader:
+                print("[STARTUP] Seeding prices...")
+                seed_data.seed()
+                readiness.seeding = SEEDING_COMPLETED
+                print("[STARTUP] Price seeding completed.")
+            else:
+                readiness.seeding = SEEDING_ELSEWHERE
+                print("[STARTUP] Prices are seeded by another process, skipping.")
+    except Exception as e:
+        readiness.seeding = SEEDING_FAILED
+        readiness.seeding_error = repr(e)
+        print(f"[STARTUP] Price seeding failed: {e!r}")
+
+    readiness.ready_at = datetime.now()
+    if on_ready:
+        on_ready()
+
+def run_startup(mode: StartupMode, on_ready: Optional[Callable[[], None]] = None) -> Readiness:
+    """
+    Prepares the database for serving according to mode
+
+    The schema is migrated and events seeded by one process at a time,
+    which takes milliseconds. Check mode stops there. Background mode also
+    seeds a year of prices on a daemon thread when price_histories is
+    empty, and the process reports ready once that finishes. Blocking mode
+    seeds before returning. Only the leader of the processes sharing the
+    database seeds, the others skip it.
+
+    Args:
+        mode: Startup mode
+        on_ready: Called once the process is ready, possibly from the seeding thread
+
+    Returns:
+        Readiness of the process, updated in place by background seeding
+    """
+    readiness = get_readiness()
+    readiness.mode = mode.value
+    started_at = datetime.now()
+
+    # Wait for a concurrent setup instead of racing it on CREATE TABLE
+    with leader(SETUP_LOCK, timeout=SETUP_LOCK_TIMEOUT) as is_leader:
+        if is_leader:
+            created_tables = ensure_schema()
+            if created_tables:
+                print(f"[STARTUP] Created tables: {', '.join(created_tables)}")
+            seed_events.seed()
+        else:
+            print(f"[STARTUP] Database setup still held by another process after {SETUP_LOCK_TIMEOUT}s.")
+    readiness.schema_ready = is_leader
+
+    if mode == StartupMode.Check or seed_data.has_price_data():
+        readiness.seeding = SEEDING_SKIPPED
+    elif mode == StartupMode.Blocking:
+        seed_prices(readiness)
+    else:
+        readiness.startup_seconds = round((datetime.now() - started_at).total_seconds(), 3)
+        threading.Thread(target=seed_prices, args=(readiness, on_ready), name="price-seeding", daemon=True).start()
+        return readiness
+
+    readiness.startup_seconds = round((datetime.now() - started_at).total_seconds(), 3)
+    readiness.ready_at = datetime.now()
+    if on_ready:
+        on_ready()
+    return readiness
+
+@lru_cache
+def get_readiness() -> Readiness:
+    """Get the readiness of this process"""
+    return Readiness()
@@ -0,0 +1,61 @@
+"""Alembic environment, migrates the database configured in shared.config"""
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import Connection
+
+from backend.database import create_db_engine
+from backend.models import Base
+from backend.partitions import PARTITIONED_TABLE, is_partitioned
+
+config = context.config
+# Connection handed over by backend.database.init_db, whose process already configured logging
+connection = config.attributes.get("connection")
+if config.config_file_name is not None and connection is None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def ignore_partitioned_foreign_keys(partitioned: bool):
+    """
+    Partitioned MySQL tables take no foreign keys, autogenerate must not add them back
+    """
+    def include_object(object, name, type_, reflected, compare_to) -> bool:
+        return not (
+            partitioned
+            and type_ == "foreign_key_constraint"
+            and object.table.name == PARTITIONED_TABLE
+        )
+    return include_object
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL without connecting"""
+    context.configure(
+        url=str(create_db_engine().url.render_as_string(hide_password=False)),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online(connection: Connection) -> None:
+    """Run the migrations over connection"""
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite cannot alter tables in place, batch operations copy them
+        render_as_batch=connection.dialect.name == "sqlite",
+        include_object=ignore_partitioned_foreign_keys(is_partitioned(connection)),
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif connection is not None:
+    run_migrations_online(connection)
+else:
+    with create_db_engine().connect() as connection:
+        run_migrations_online(connection)
@@ -0,0 +1,65 @@
+"""Initial schema of the first release, as created by its init_db
+
+Databases created by that init_db are stamped at this revision instead
+of running it: alembic stamp 0001_initial_schema
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_initial_schema"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "products",
+        sa.Column("product_id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("external_id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("description", sa.String(1000), nullable=True),
+        sa.Column("base_price", sa.Float(), nullable=False),
+        sa.Column("rating", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        "events",
+        sa.Column("event_id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("event_name", sa.String(255), nullable=False, unique=True),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("end_date", sa.Date(), nullable=False),
+        sa.Column("pre_event_days", sa.Integer(), nullable=True),
+        sa.Column("pre_event_uplift_min", sa.Float(), nullable=True),
+        sa.Column("pre_event_uplift_max", sa.Float(), nullable=True),
+        sa.Column("discount_min", sa.Float(), nullable=True),
+        sa.Column("discount_max", sa.Float(), nullable=True),
+        sa.Column("noise_enabled", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        "price_histories",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.product_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("event_id", sa.Integer(), sa.ForeignKey("events.event_id", ondelete="CASCADE"), nullable=True),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("price_change_reason", sa.String(50), nullable=True),
+        sa.Column("price_source", sa.String(50), nullable=True),
+        sa.Column("recorded_date", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("price_histories")
+    op.drop_table("events")
+    op.drop_table("products")
@@ -0,0 +1,41 @@
+"""Unique snapshot key of price_histories
+
+One snapshot per product and day, which ingestion upserts against.
+Duplicated snapshots are removed first, the oldest row of a product and
+day is kept. Databases created by init_db after the key was added
+already have it and skip this revision's work.
+
+Revision ID: 0001a_price_snapshot_key
+Revises: 0001_initial_schema
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001a_price_snapshot_key"
+down_revision = "0001_initial_schema"
+branch_labels = None
+depends_on = None
+
+CONSTRAINT = "uq_price_histories_product_date"
+
+
+def upgrade() -> None:
+    constraints = sa.inspect(op.get_bind()).get_unique_constraints("price_histories")
+    if any(constraint["name"] == CONSTRAINT for constraint in constraints):
+        return
+
+    # MySQL cannot read the table a DELETE writes to, the derived table is materialized first
+    op.execute(
+        "DELETE FROM price_histories WHERE id NOT IN ("
+        "SELECT id FROM (SELECT MIN(id) AS id FROM price_histories GROUP BY product_id, recorded_date) AS kept"
+        ")"
+    )
+    with op.batch_alter_table("price_histories") as batch:
+        batch.create_unique_constraint(CONSTRAINT, ["product_id", "recorded_date"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("price_histories") as batch:
+        batch.drop_constraint(CONSTRAINT, type_="unique")
@@ -0,0 +1,59 @@
+"""Journal of ingestion runs and their completed chunks
+
+Backfills resume from the chunks of their latest unfinished run.
+Databases created by init_db after the journal was added already have
+the tables and skip this revision's work.
+
+Revision ID: 0001b_ingestion_journal
+Revises: 0001a_price_snapshot_key
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001b_ingestion_journal"
+down_revision = "0001a_price_snapshot_key"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("ingestion_runs"):
+        return
+
+    op.create_table(
+        "ingestion_runs",
+        sa.Column("run_id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("kind", sa.String(50), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("end_date", sa.Date(), nullable=False),
+        sa.Column("chunk_days", sa.Integer(), nullable=True),
+        sa.Column("seed", sa.Integer(), nullable=True),
+        sa.Column("policy", sa.String(20), nullable=True),
+        sa.Column("inserted_snapshots", sa.Integer(), nullable=True),
+        sa.Column("elapsed_seconds", sa.Float(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        "ingestion_chunks",
+        sa.Column("chunk_id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("run_id", sa.Integer(), sa.ForeignKey("ingestion_runs.run_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("end_date", sa.Date(), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("rows", sa.Integer(), nullable=False),
+        sa.Column("inserted_snapshots", sa.Integer(), nullable=False),
+        sa.Column("elapsed_seconds", sa.Float(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("run_id", "start_date", "end_date", "shard", name="uq_ingestion_chunks_run_chunk"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ingestion_chunks")
+    op.drop_table("ingestion_runs")
@@ -0,0 +1,38 @@
+"""Indexes for the hot query paths
+
+- products.external_id: unique, ingestion resolves fetched products by it
+- products.rating: product listing orders by it
+- price_histories (product_id, recorded_date, price): covers the per-product
+  date range queries of analytics, which then never read the table rows
+- price_histories.recorded_date: latest recorded day and whole-catalog ranges
+- events (start_date, end_date): active event lookups by date
+
+Duplicated external_ids have to be merged before upgrading.
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001b_ingestion_journal
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0002_hot_path_indexes"
+down_revision = "0001b_ingestion_journal"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("uq_products_external_id", "products", ["external_id"], unique=True)
+    op.create_index("ix_products_rating", "products", ["rating"])
+    op.create_index("ix_price_histories_product_date_price", "price_histories", ["product_id", "recorded_date", "price"])
+    op.create_index("ix_price_histories_recorded_date", "price_histories", ["recorded_date"])
+    op.create_index("ix_events_start_end", "events", ["start_date", "end_date"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_start_end", table_name="events")
+    op.drop_index("ix_price_histories_recorded_date", table_name="price_histories")
+    op.drop_index("ix_price_histories_product_date_price", table_name="price_histories")
+    op.drop_index("ix_products_rating", table_name="products")
+    op.drop_index("uq_products_external_id", table_name="products")
@@ -0,0 +1,96 @@
+"""Compact encoding of price_histories
+
+- price: integer cents instead of a float
+- price_change_reason, price_source: small integer codes of the new
+  price_change_reasons and price_sources lookup tables instead of strings
+- recorded_date: DATE instead of DATETIME
+
+The table is copied into the new layout, which rebuilds its indexes.
+Partitioned MySQL tables come back unpartitioned, run
+`python -m backend.partitions partition` again after upgrading.
+
+Revision ID: 0003_compact_price_histories
+Revises: 0002_hot_path_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_compact_price_histories"
+down_revision = "0002_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+# Frozen copies of shared.constants.PRICE_CHANGE_REASONS and PRICE_SOURCES, codes are the positions
+PRICE_CHANGE_REASONS = (
+    "base_price",
+    "base_price+noise",
+    "event_discount",
+    "event_discount+noise",
+    "pre_event_uplift",
+    "pre_event_uplift+noise",
+)
+PRICE_SOURCES = ("real", "synthetic")
+
+COPIED_TABLE = "price_histories_copy"
+
+def create_price_histories(name: str, compact: bool) -> None:
+    op.create_table(
+        name,
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.product_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("event_id", sa.Integer(), sa.ForeignKey("events.event_id", ondelete="CASCADE"), nullable=True),
+        sa.Column("price", sa.Integer() if compact else sa.Float(), nullable=False),
+        sa.Column("price_change_reason", sa.SmallInteger() if compact else sa.String(50), nullable=True),
+        sa.Column("price_source", sa.SmallInteger() if compact else sa.String(50), nullable=True),
+        sa.Column("recorded_date", sa.Date() if compact else sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("product_id", "recorded_date", name="uq_price_histories_product_date"),
+    )
+
+def replace_price_histories() -> None:
+    op.drop_table("price_histories")
+    op.rename_table(COPIED_TABLE, "price_histories")
+    op.create_index("ix_price_histories_product_date_price", "price_histories", ["product_id", "recorded_date", "price"])
+    op.create_index("ix_price_histories_recorded_date", "price_histories", ["recorded_date"])
+
+def upgrade() -> None:
+    for table, labels in (("price_change_reasons", PRICE_CHANGE_REASONS), ("price_sources", PRICE_SOURCES)):
+        lookup = op.create_table(
+            table,
+            sa.Column("code", sa.SmallInteger(), primary_key=True, autoincrement=False),
+            sa.Column("name", sa.String(50), nullable=False, unique=True),
+        )
+        op.bulk_insert(lookup, [{"code": code, "name": name} for code, name in enumerate(labels)])
+
+    create_price_histories(COPIED_TABLE, compact=True)
+    op.execute(
+        f"INSERT INTO {COPIED_TABLE} "
+        "(id, product_id, event_id, price, price_change_reason, price_source, recorded_date, created_at) "
+        "SELECT h.id, h.product_id, h.event_id, ROUND(h.price * 100), "
+        "(SELECT r.code FROM price_change_reasons r WHERE r.name = h.price_change_reason), "
+        "(SELECT s.code FROM price_sources s WHERE s.name = h.price_source), "
+        "DATE(h.recorded_date), h.created_at "
+        "FROM price_histories h"
+    )
+    replace_price_histories()
+
+
+def downgrade() -> None:
+    recorded_date = "DATETIME(h.recorded_date)" if op.get_bind().dialect.name == "sqlite" else "CAST(h.recorded_date AS DATETIME)"
+
+    create_price_histories(COPIED_TABLE, compact=False)
+    op.execute(
+        f"INSERT INTO {COPIED_TABLE} "
+        "(id, product_id, event_id, price, price_change_reason, price_source, recorded_date, created_at) "
+        "SELECT h.id, h.product_id, h.event_id, h.price / 100.0, "
+        "(SELECT r.name FROM price_change_reasons r WHERE r.code = h.price_change_reason), "
+        "(SELECT s.name FROM price_sources s WHERE s.code = h.price_source), "
+        f"{recorded_date}, h.created_at "
+        "FROM price_histories h"
+    )
+    replace_price_histories()
+
+    op.drop_table("price_sources")
+    op.drop_table("price_change_reasons")
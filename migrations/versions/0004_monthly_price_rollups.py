@@ -0,0 +1,47 @@
+"""Monthly price rollups
+
+price_rollups_monthly holds the snapshot count, sum, min, max and sum of
+squares of every product and month, in cents. It is filled from the
+existing snapshots, ingestion keeps it up to date afterwards.
+
+Revision ID: 0004_monthly_price_rollups
+Revises: 0003_compact_price_histories
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_monthly_price_rollups"
+down_revision = "0003_compact_price_histories"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "price_rollups_monthly",
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.product_id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("month", sa.Date(), primary_key=True),
+        sa.Column("snapshots", sa.Integer(), nullable=False),
+        sa.Column("price_sum", sa.BigInteger(), nullable=False),
+        sa.Column("price_min", sa.Integer(), nullable=False),
+        sa.Column("price_max", sa.Integer(), nullable=False),
+        sa.Column("price_sum_squares", sa.BigInteger(), nullable=False),
+    )
+
+    if op.get_bind().dialect.name == "sqlite":
+        month = "DATE(recorded_date, 'start of month')"
+    else:
+        month = "DATE_FORMAT(recorded_date, '%Y-%m-01')"
+
+    op.execute(
+        "INSERT INTO price_rollups_monthly "
+        "(product_id, month, snapshots, price_sum, price_min, price_max, price_sum_squares) "
+        f"SELECT product_id, {month}, COUNT(*), SUM(price), MIN(price), MAX(price), SUM(price * price) "
+        f"FROM price_histories GROUP BY product_id, {month}"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("price_rollups_monthly")
@@ -0,0 +1,36 @@
+"""Change-point storage of price snapshots
+
+price_ranges stores runs of consecutive days over which a product kept the
+same price, event, reason and source (PRICE_STORAGE=change_points).
+
+Revision ID: 0005_price_ranges
+Revises: 0004_monthly_price_rollups
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_price_ranges"
+down_revision = "0004_monthly_price_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "price_ranges",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.product_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("event_id", sa.Integer(), sa.ForeignKey("events.event_id", ondelete="CASCADE"), nullable=True),
+        sa.Column("price", sa.Integer(), nullable=False),
+        sa.Column("price_change_reason", sa.SmallInteger(), nullable=True),
+        sa.Column("price_source", sa.SmallInteger(), nullable=True),
+        sa.Column("valid_from", sa.Date(), nullable=False),
+        sa.Column("valid_to", sa.Date(), nullable=False),
+        sa.UniqueConstraint("product_id", "valid_from", name="uq_price_ranges_product_from"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("price_ranges")
@@ -0,0 +1,37 @@
+"""Data versions of the analytics response cache
+
+data_versions counts the writes to the snapshots of many products and to
+the events, products.data_version the writes to a single product. They
+are part of the cache keys of the analytics responses.
+
+Revision ID: 0006_data_versions
+Revises: 0005_price_ranges
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_data_versions"
+down_revision = "0005_price_ranges"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of shared.constants.DataScope
+DATA_SCOPES = ("prices", "events")
+
+
+def upgrade() -> None:
+    data_versions = op.create_table(
+        "data_versions",
+        sa.Column("scope", sa.String(50), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+    )
+    op.bulk_insert(data_versions, [{"scope": scope, "version": 0} for scope in DATA_SCOPES])
+
+    op.add_column("products", sa.Column("data_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    op.drop_column("products", "data_version")
+    op.drop_table("data_versions")
@@ -0,0 +1,34 @@
+"""Foreign keys from the reason and source codes to their lookup tables
+
+price_histories and price_ranges store price_change_reason and
+price_source as codes of price_change_reasons and price_sources, the
+lookup tables now reject unknown codes. Partitioning price_histories on
+MySQL drops these foreign keys along with the others.
+
+Revision ID: 0007_code_foreign_keys
+Revises: 0006_data_versions
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0007_code_foreign_keys"
+down_revision = "0006_data_versions"
+branch_labels = None
+depends_on = None
+
+TABLE_PREFIXES = {"price_histories": "fk_price_histories", "price_ranges": "fk_price_ranges"}
+
+
+def upgrade() -> None:
+    for table, prefix in TABLE_PREFIXES.items():
+        with op.batch_alter_table(table) as batch:
+            batch.create_foreign_key(f"{prefix}_reason", "price_change_reasons", ["price_change_reason"], ["code"])
+            batch.create_foreign_key(f"{prefix}_source", "price_sources", ["price_source"], ["code"])
+
+
+def downgrade() -> None:
+    for table, prefix in TABLE_PREFIXES.items():
+        with op.batch_alter_table(table) as batch:
+            batch.drop_constraint(f"{prefix}_source", type_="foreignkey")
+            batch.drop_constraint(f"{prefix}_reason", type_="foreignkey")
@@ -14,6 +14,6 @@ cd "$PROJECT_ROOT" || exit 1
 
 echo "[$(date)] Cron started" >> "$LOG_FILE"
 
-$PYTHON backend/ingestion/daily_ingestion.py >> "$LOG_FILE" 2>&1
+$PYTHON backend/ingestion/daily_ingestion.py --bulk >> "$LOG_FILE" 2>&1
 
 echo "[$(date)] Cron finished successfully" >> "$LOG_FILE"
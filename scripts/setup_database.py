@@ -3,9 +3,11 @@ Database setup script.
 
 - Creates all database tables
 - Seeds predefined events
+- Seeds a year of prices, unless prices are already stored
 
 Safe to run multiple times (idempotent).
 """
+from backend.coordination import INGESTION_LOCK, leader
 from backend.database import init_db
 from backend.ingestion import seed_events
 from backend.ingestion import seed_data
@@ -19,9 +21,18 @@ def setup_database() -> None:
     seed_events.seed()
     print("[SETUP] Event seeding completed.")
 
-    print("[SETUP] Seeding prices...")
-    seed_data.seed()
-    print("[SETUP] Price seeding completed.")
+    if seed_data.has_price_data():
+        print("[SETUP] Prices already seeded, skipping.")
+        return
+
+    with leader(INGESTION_LOCK) as is_leader:
+        if not is_leader:
+            print("[SETUP] Prices are ingested by another process, skipping.")
+            return
+
+        print("[SETUP] Seeding prices...")
+        seed_data.seed()
+        print("[SETUP] Price seeding completed.")
 
 
 if __name__ == "__main__":
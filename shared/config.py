@@ -1,5 +1,6 @@
 """Shared configuration settings"""
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 from shared.constants import PriceType
@@ -7,11 +8,44 @@ from shared.constants import PriceType
 class Settings(BaseSettings):
     """Application settings for MySQL from environment variables"""
     # Database Configuration
-    db_host: str = os.getenv("DB_HOST")
-    db_port: int = os.getenv("DB_PORT")
-    db_name: str = os.getenv("DB_NAME")
-    db_user: str = os.getenv("DB_USER")
-    db_password: str = os.getenv("DB_PASSWORD")
+    db_host: Optional[str] = os.getenv("DB_HOST")
+    db_port: Optional[int] = os.getenv("DB_PORT")
+    db_name: Optional[str] = os.getenv("DB_NAME")
+    db_user: Optional[str] = os.getenv("DB_USER")
+    db_password: Optional[str] = os.getenv("DB_PASSWORD")
+
+    # Full SQLAlchemy URL, overrides the MySQL settings above (e.g. sqlite:///price-tracker.db)
+    db_url: Optional[str] = os.getenv("DATABASE_URL")
+
+    # Global seed of the synthetic price streams
+    price_seed: int = os.getenv("PRICE_SEED", 42)
+
+    # Snapshot storage: daily or change_points (see PriceStorage)
+    price_storage: str = os.getenv("PRICE_STORAGE", "daily")
+
+    # API startup: check, background or blocking (see StartupMode)
+    startup_mode: str = os.getenv("STARTUP_MODE", "background")
+
+    # In-process ingestion scheduler
+    scheduler_enabled: bool = os.getenv("SCHEDULER_ENABLED", "false")
+    scheduler_run_at: str = os.getenv("SCHEDULER_RUN_AT", "00:05") # Daily run time, HH:MM local time
+    scheduler_max_catchup_days: int = os.getenv("SCHEDULER_MAX_CATCHUP_DAYS", 31) # Missing days backfilled at most
+
+    # Monthly partitions of price_histories (MySQL), maintained by the scheduler
+    price_partitioning: bool = os.getenv("PRICE_PARTITIONING", "false")
+    partition_months_ahead: int = os.getenv("PARTITION_MONTHS_AHEAD", 3) # Months created ahead of time
+    partition_retention_months: int = os.getenv("PARTITION_RETENTION_MONTHS", 0) # Months kept, 0 keeps everything
+    partition_archive: bool = os.getenv("PARTITION_ARCHIVE", "true") # Archive expired months instead of dropping them
+
+    # Parquet archive of the cold months of price_histories (see backend/archive.py)
+    archive_dir: str = os.getenv("ARCHIVE_DIR", "archive")
+
+    # Analytics response cache: none, lru or redis (see CacheBackend)
+    cache_backend: str = os.getenv("CACHE_BACKEND", "lru")
+    cache_max_entries: int = os.getenv("CACHE_MAX_ENTRIES", 10000) # LRU entries kept at most
+    cache_max_bytes: int = os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024) # LRU response bytes kept at most
+    cache_redis_url: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    cache_ttl_seconds: int = os.getenv("CACHE_TTL_SECONDS", 86400) # Redis expiry, stale versions age out
 
     model_config=SettingsConfigDict(
         env_file=".env",
@@ -21,20 +55,35 @@ class Settings(BaseSettings):
     @property
     def database_url(self) -> str:
         """Construct MySQL database URL"""
+        if self.db_url:
+            return self.db_url
         return f"mysql+pymysql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
 
 class ProductAPI:
     """API informations to fetch product's prices"""    
-    url: str = "https://fakestoreapi.com"
+    url: str = os.getenv("PRODUCT_API_URL", "https://fakestoreapi.com")
     endpoint: str = "products"
     price_mode: str = PriceType.Synthetic
 
+    # HTTP client
+    timeout: float = 10.0 # Seconds per request
+    max_retries: int = 3 # Retries after the first attempt
+    backoff: float = 0.5 # Seconds before the first retry, doubled on every retry
+    concurrency: int = 8 # Requests in flight and pooled connections
+
+    # Products per page, None fetches the whole catalog in one request
+    page_size: Optional[int] = None
+
+    # Response cache, disabled when cache_dir is empty
+    cache_dir: str = os.getenv("PRODUCT_API_CACHE_DIR", ".cache/product-api")
+    cache_ttl: float = float(os.getenv("PRODUCT_API_CACHE_TTL", 3600)) # Seconds before revalidating
+    offline: bool = os.getenv("PRODUCT_API_OFFLINE", "false").lower() in ("1", "true", "yes") # Serve from cache only
+
     @property
     def api_url(self) -> str:
         """Construct API URL"""
         return f"{self.url}/{self.endpoint}"
     
-    @property
     def api_url_for_product(self, product_id: int) -> str:
         """Construct API URL for single product by ID"""
         return f"{self.api_url}/{product_id}"
@@ -7,3 +7,65 @@ DAILY_PRICE_NOISE : Tuple[float, float] = (-0.03, 0.03)
 class PriceType(Enum):
     Real = "real"
     Synthetic = "synthetic"
+
+# Reason codes are the positions in this tuple
+PRICE_CHANGE_REASONS : Tuple[str, ...] = (
+    "base_price",
+    "base_price+noise",
+    "event_discount",
+    "event_discount+noise",
+    "pre_event_uplift",
+    "pre_event_uplift+noise",
+)
+
+# Price source codes are the positions in this tuple
+PRICE_SOURCES : Tuple[str, ...] = tuple(price_type.value for price_type in PriceType)
+
+# Event id stored in event id matrices when no event is active
+NO_EVENT_ID : int = 0
+
+class UpsertPolicy(Enum):
+    """What to do with a snapshot when one already exists for the product and day"""
+    Skip = "skip"
+    Overwrite = "overwrite"
+    KeepLowest = "keep_lowest"
+
+class PriceStorage(Enum):
+    """How price snapshots are stored"""
+    Daily = "daily" # One price_histories row per product and day
+    ChangePoints = "change_points" # One price_ranges row per run of unchanged days
+
+class ImpactSort(Enum):
+    """Percentage change the event impact matrix is sorted by"""
+    PreToEvent = "pre_to_event_percentage_change"
+    EventToPost = "event_to_post_percentage_change"
+
+class ExportFormat(Enum):
+    """Formats of the price history export"""
+    NDJSON = "ndjson" # One JSON object per line
+    CSV = "csv"
+    Arrow = "arrow" # Arrow IPC stream
+    Parquet = "parquet"
+
+class DataScope(Enum):
+    """Kinds of analytics data with a version counter in data_versions"""
+    Prices = "prices" # Snapshots of many products, bumped by ingestion and backfills
+    Events = "events" # Event definitions, bumped by event CRUD
+
+class CacheBackend(Enum):
+    """Where analytics responses are cached"""
+    Disabled = "none"
+    LRU = "lru" # In-process, bounded by entries and bytes
+    Redis = "redis" # Shared by the workers, any Redis-compatible server
+
+class RunStatus(Enum):
+    """State of an ingestion run in the run journal"""
+    Running = "running"
+    Completed = "completed"
+    Failed = "failed"
+
+class StartupMode(Enum):
+    """What the API does with the database before serving requests"""
+    Check = "check" # Migrate the schema only, seeding is left to scripts/setup_database.py
+    Background = "background" # Like check, and seed prices on a background thread when there are none
+    Blocking = "blocking" # Run the whole setup_database before serving requests
@@ -1,6 +1,16 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
 import pytest
 
 from backend.database import init_db, SessionLocal
+from backend.ingestion import fetch_products
+from backend.ingestion.daily_ingestion import resolve_products
+from backend.models import PriceHistory, PriceRange, PriceRollup
+from shared.config import ProductAPI
 
 
 @pytest.fixture
@@ -16,4 +26,105 @@ def setup_test_db():
     """
     Create all tables before any tests run.
     """
-    init_db()
\ No newline at end of file
+    init_db()
+
+@pytest.fixture
+def make_product(db_session):
+    """
+    Creates or reuses the product of a fake external id and deletes its stored prices
+
+    Usage:
+        product_id = make_product(990001, "Upsert product")
+    """
+    def make(external_id: int, title: str) -> int:
+        products, _ = resolve_products(db_session, [
+            {"id": external_id, "title": title, "description": "", "price": 20.0, "rating": {"rate": 4.0}}
+        ])
+        product_id = products[external_id].product_id
+        for model in (PriceHistory, PriceRange, PriceRollup):
+            db_session.query(model).filter(model.product_id == product_id).delete()
+        db_session.commit()
+        return product_id
+
+    return make
+
+CATALOG = [
+    {"id": i, "title": f"Product {i}", "description": "Stub product", "price": 10.0 + i, "rating": {"rate": 4.0}}
+    for i in range(1, 26)
+]
+
+class StubCatalogHandler(BaseHTTPRequestHandler):
+    """Stands in for fakestoreapi.com"""
+    failures = {}
+    requests = 0
+
+    def do_GET(self):
+        StubCatalogHandler.requests += 1
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        # Fails the first requests of /flaky/... paths
+        if url.path.startswith("/flaky"):
+            remaining = self.failures.get(url.path, 2)
+            self.failures[url.path] = remaining - 1
+            if remaining > 0:
+                return self._send(503, {"error": "unavailable"})
+            url = url._replace(path=url.path[len("/flaky"):])
+
+        if url.path == "/products":
+            products = CATALOG
+            if "limit" in params:
+                offset = int(params.get("offset", ["0"])[0])
+                products = CATALOG[offset:offset + int(params["limit"][0])]
+            return self._send(200, products)
+
+        if url.path.startswith("/products/"):
+            product_id = int(url.path.rsplit("/", 1)[1])
+            if 1 <= product_id <= len(CATALOG):
+                return self._send(200, CATALOG[product_id - 1])
+
+        self._send(404, {"error": "not found"})
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        etag = f'"{hashlib.md5(payload).hexdigest()}"'
+
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status, payload = 304, b""
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if status in (200, 304):
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_api(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCatalogHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    api = ProductAPI()
+    api.url = f"http://127.0.0.1:{server.server_port}"
+    api.backoff = 0.01
+    api.cache_dir = str(tmp_path / "cache")
+    StubCatalogHandler.failures = {}
+    StubCatalogHandler.requests = 0
+    try:
+        yield api
+    finally:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def stub_catalog(stub_api, monkeypatch):
+    """
+    Points the default product API of ingestion at the stub catalog, so tests never reach fakestoreapi.com
+    """
+    monkeypatch.setattr(fetch_products, "product_api", stub_api)
+    return stub_api
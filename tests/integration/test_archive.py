@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from backend.api.analytics.crud import (
+    aggregate_catalog_windows, get_price_history, get_price_history_by_recorded_date, get_price_summary
+)
+from backend.archive import archive_history, archived_months, archive_path, product_bucket
+from backend.database import create_db_engine
+from backend.ingestion.backfill import run_backfill
+from backend.ingestion.daily_ingestion import run_daily_ingestion
+from backend.ingestion.rollups import refresh_rollups
+from backend.models import Base, Product, PriceHistory, PriceRollup
+from shared.config import get_settings
+
+START_DATE = date(2026, 1, 1)
+DAYS = 90
+
+def test_archived_months_stay_readable(tmp_path, monkeypatch):
+    archive_dir = tmp_path / "archive"
+    monkeypatch.setattr(get_settings(), "archive_dir", str(archive_dir))
+
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    Base.metadata.create_all(engine)
+
+    prices = {START_DATE + timedelta(days=day): 10.0 + day % 7 for day in range(DAYS)}
+    with Session(engine) as db:
+        db.execute(insert(Product), [{"product_id": 7, "external_id": 7, "title": "Product", "base_price": 10.0, "rating": 4.0}])
+        db.execute(insert(PriceHistory), [
+            {"product_id": 7, "price": price, "recorded_date": day, "price_source": "synthetic"}
+            for day, price in prices.items()
+        ])
+        refresh_rollups(db, min(prices), max(prices))
+        db.commit()
+
+    # January and February move to Parquet, March stays hot
+    assert archive_history(date(2026, 3, 15), engine=engine) == [date(2026, 1, 1), date(2026, 2, 1)]
+    assert archived_months() == [date(2026, 1, 1), date(2026, 2, 1)]
+    assert archive_path(archive_dir, date(2026, 1, 1), product_bucket(7)).exists()
+
+    with Session(engine) as db:
+        assert db.scalar(select(func.min(PriceHistory.recorded_date))) == date(2026, 3, 1)
+        # Archived months keep their rollups
+        assert db.scalar(select(func.min(PriceRollup.month))) == date(2026, 1, 1)
+
+        start_date, end_date = date(2026, 1, 10), date(2026, 3, 5)
+        expected = [price for day, price in prices.items() if start_date <= day <= end_date]
+
+        history = get_price_history(db, 7, start_date, end_date)
+        assert [snapshot.price for snapshot in history] == expected
+        assert history[0].recorded_date == start_date and history[0].price_source == "synthetic"
+        assert get_price_history_by_recorded_date(db, 7, date(2026, 2, 3)).price == prices[date(2026, 2, 3)]
+
+        # Archived January edge from Parquet, February from its rollup, March from the table
+        summary = get_price_summary(db, 7, start_date, end_date)
+        assert summary["min_price"] == min(expected)
+        assert summary["max_price"] == max(expected)
+        assert summary["avg_price"] == pytest.approx(sum(expected) / len(expected))
+
+        windows = {"archived": (start_date, date(2026, 2, 28)), "hot": (date(2026, 3, 1), end_date)}
+        aggregates = aggregate_catalog_windows(db, windows)[7]
+        assert aggregates["archived"].snapshots == 50 and aggregates["hot"].snapshots == 5
+
+    # Nothing left to archive before March
+    assert archive_history(date(2026, 3, 1), engine=engine) == []
+
+    # Archived months are read-only
+    with pytest.raises(ValueError, match="2026-02"):
+        run_backfill(date(2026, 2, 20), date(2026, 3, 10), progress=False)
+    with pytest.raises(ValueError):
+        run_daily_ingestion(date(2026, 1, 31))
@@ -0,0 +1,76 @@
+from datetime import date
+import time
+import numpy as np
+import pytest
+
+from backend.ingestion import backfill
+from backend.coordination import INGESTION_LOCK, leader
+from backend.ingestion.backfill import run_backfill, iter_date_chunks, start_backfill
+from backend.ingestion.parallel_backfill import split_by_product
+from backend.models import PriceHistory, IngestionRun
+from shared.constants import RunStatus
+
+def test_iter_date_chunks_covers_range():
+    chunks = list(iter_date_chunks(date(2026, 1, 1), date(2026, 3, 1), chunk_days=31))
+
+    assert chunks[0] == (date(2026, 1, 1), date(2026, 1, 31))
+    assert chunks[-1] == (date(2026, 2, 1), date(2026, 3, 1))
+    assert sum((end - start).days + 1 for start, end in chunks) == 60
+
+def test_backfill_idempotent(db_session, stub_catalog):
+    run_backfill(date(2026, 1, 20), date(2026, 1, 24), batch_size=50, chunk_days=2, progress=False)
+    first_count = db_session.query(PriceHistory).count()
+
+    summary = run_backfill(date(2026, 1, 20), date(2026, 1, 24), progress=False)
+    second_count = db_session.query(PriceHistory).count()
+
+    assert first_count == second_count
+    assert summary["inserted_snapshots"] == 0
+
+def test_backfill_resumes_from_journal(db_session, stub_catalog, monkeypatch):
+    generate_price_matrix = backfill.generate_price_matrix
+    generated_chunks = []
+
+    def interrupted_after_two_chunks(*args, **kwargs):
+        if len(generated_chunks) == 2:
+            raise RuntimeError("interrupted")
+        generated_chunks.append(args[2])
+        return generate_price_matrix(*args, **kwargs)
+
+    monkeypatch.setattr(backfill, "generate_price_matrix", interrupted_after_two_chunks)
+    with pytest.raises(RuntimeError):
+        run_backfill(date(2026, 2, 1), date(2026, 2, 6), chunk_days=2, seed=11, progress=False)
+    monkeypatch.setattr(backfill, "generate_price_matrix", generate_price_matrix)
+
+    summary = run_backfill(date(2026, 2, 1), date(2026, 2, 6), chunk_days=2, seed=11, resume=True, progress=False)
+    run = db_session.get(IngestionRun, summary["run_id"])
+
+    assert summary["skipped_chunks"] == 2
+    assert run.status == RunStatus.Completed.value
+    assert [chunk.start_date for chunk in run.chunks] == [date(2026, 2, 1), date(2026, 2, 3), date(2026, 2, 5)]
+
+def test_product_shards_are_disjoint():
+    product_ids = list(range(1, 101))
+    base_prices = np.arange(1, 101, dtype=np.float64)
+
+    tasks = split_by_product(product_ids, base_prices, date(2026, 1, 1), date(2026, 1, 31), shards=4)
+    sharded_ids = [product_id for task in tasks for product_id in task.product_ids]
+
+    assert sorted(sharded_ids) == product_ids
+    for task in tasks:
+        assert task.base_prices.tolist() == task.product_ids
+
+def test_started_backfill_runs_under_ingestion_lock(db_session, stub_catalog):
+    with leader(INGESTION_LOCK):
+        assert start_backfill(date(2026, 3, 1), date(2026, 3, 2), seed=12) is None
+
+    run_id = start_backfill(date(2026, 3, 1), date(2026, 3, 2), seed=12)
+    for _ in range(100):
+        db_session.expire_all()
+        run = db_session.get(IngestionRun, run_id)
+        if run.status != RunStatus.Running.value:
+            break
+        time.sleep(0.05)
+
+    assert run.status == RunStatus.Completed.value
+    assert run.start_date == date(2026, 3, 1) and run.seed == 12
@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from backend.api.events.crud import delete_event
+from backend.cache import LRUCache, bump_event_version, bump_price_versions, cache_key, read_data_versions
+from backend.database import create_db_engine
+from backend.ingestion.rollups import refresh_rollups
+from backend.models import Base, DataVersion, Event, Product, PriceHistory, PriceRollup
+
+PARAMS = {"product_id": 1, "start_date": date(2026, 1, 1), "end_date": None}
+
+def test_lru_cache_bounds_and_metrics():
+    cache = LRUCache(max_entries=2, max_bytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    assert cache.get("a") == b"1234"
+
+    # "b" is the least recently used entry
+    cache.set("c", b"1234")
+    assert cache.get("b") is None
+
+    # Too many bytes evict "a" as well, entries larger than the cache are not stored
+    cache.set("d", b"123456")
+    cache.set("e", b"12345678901")
+    assert cache.get("e") is None and cache.get("a") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"], stats["evictions"]) == (1, 3, 4, 2)
+    assert (stats["entries"], stats["bytes"]) == (2, 10)
+
+def test_writes_change_keys_of_their_products(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as db:
+        db.execute(insert(Product), [
+            {"product_id": product_id, "external_id": product_id, "title": "Product", "base_price": 10.0, "rating": 4.0}
+            for product_id in (1, 2)
+        ])
+
+        def keys():
+            return {product_id: cache_key("/analytics/price-summary", PARAMS, read_data_versions(db, product_id))
+                    for product_id in (1, 2)}
+
+        initial = keys()
+        bump_price_versions(db, [1])
+        after_product = keys()
+        assert after_product[1] != initial[1] and after_product[2] == initial[2]
+
+        # Catalog-wide writes and event changes invalidate every product
+        bump_price_versions(db)
+        after_prices = keys()
+        bump_event_version(db)
+        after_events = keys()
+        for product_id in (1, 2):
+            assert len({after_product[product_id], after_prices[product_id], after_events[product_id]}) == 3
+
+def test_deleting_an_event_refreshes_rollups(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    Base.metadata.create_all(engine)
+
+    days = [date(2026, 3, 1) + timedelta(days=day) for day in range(10)]
+    with Session(engine) as db:
+        db.execute(insert(Product), [{"product_id": 1, "external_id": 1, "title": "Product", "base_price": 10.0, "rating": 4.0}])
+        db.execute(insert(Event), [{"event_id": 1, "event_name": "Sale", "start_date": days[5], "end_date": days[-1]}])
+        db.execute(insert(PriceHistory), [
+            {"product_id": 1, "price": 10.0, "recorded_date": day, "event_id": 1 if day >= days[5] else None}
+            for day in days
+        ])
+        refresh_rollups(db, days[0], days[-1])
+        db.commit()
+        events_version = read_data_versions(db)["events"]
+
+        assert delete_event(db, 1)
+        assert db.scalar(select(PriceRollup.snapshots).where(PriceRollup.product_id == 1)) == 5
+        assert db.scalar(select(DataVersion.version).where(DataVersion.scope == "events")) == events_version + 1
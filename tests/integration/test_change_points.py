@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+import pytest
+
+from backend.api.analytics.crud import get_price_history, get_price_summary
+from backend.ingestion.change_points import upsert_price_ranges
+from backend.models import PriceRange
+from shared.constants import PriceType, UpsertPolicy
+
+START_DATE = date(2024, 3, 1)
+
+@pytest.fixture
+def product_id(make_product):
+    return make_product(990003, "Change point product")
+
+def test_stable_prices_are_stored_as_runs(db_session, product_id):
+    prices = [20.0] * 20 + [18.5] * 5 + [20.0] * 5
+    for day, price in enumerate(prices):
+        upsert_price_ranges(db_session, [{
+            "product_id": product_id, "event_id": None, "price": price,
+            "price_change_reason": "base_price", "price_source": PriceType.Real.value,
+            "recorded_date": START_DATE + timedelta(days=day)
+        }], UpsertPolicy.Skip)
+        db_session.commit()
+
+    assert db_session.query(PriceRange).filter(PriceRange.product_id == product_id).count() == 3
+
+    end_date = START_DATE + timedelta(days=len(prices) - 1)
+    history = get_price_history(db_session, product_id, START_DATE, end_date)
+    assert [snapshot.price for snapshot in history] == prices
+    assert [snapshot.recorded_date for snapshot in history] == [START_DATE + timedelta(days=day) for day in range(len(prices))]
+
+    summary = get_price_summary(db_session, product_id, START_DATE + timedelta(days=10), end_date)
+    expected = prices[10:]
+    assert summary["min_price"] == 18.5
+    assert summary["avg_price"] == pytest.approx(sum(expected) / len(expected))
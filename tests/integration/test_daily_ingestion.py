@@ -3,7 +3,7 @@ from datetime import date
 from backend.ingestion.daily_ingestion import run_daily_ingestion
 from backend.models import PriceHistory
 
-def test_daily_ingestion_idempotent(db_session):
+def test_daily_ingestion_idempotent(db_session, stub_catalog):
     
     run_daily_ingestion(snapshot_date=date(2026, 1, 10))
     first_count = db_session.query(PriceHistory).count()
@@ -12,3 +12,28 @@ def test_daily_ingestion_idempotent(db_session):
     second_count = db_session.query(PriceHistory).count()
     
     assert first_count == second_count
+
+def test_bulk_daily_ingestion_idempotent(db_session, stub_catalog):
+
+    run_daily_ingestion(snapshot_date=date(2026, 1, 11), bulk=True)
+    first_count = db_session.query(PriceHistory).count()
+
+    summary = run_daily_ingestion(snapshot_date=date(2026, 1, 11), bulk=True)
+    second_count = db_session.query(PriceHistory).count()
+
+    assert first_count == second_count
+    assert summary["inserted_snapshots"] == 0
+
+def test_bulk_daily_ingestion_round_trips_are_fixed(db_session, stub_catalog):
+    summary = run_daily_ingestion(snapshot_date=date(2026, 1, 12), bulk=True)
+
+    # product lookup, snapshot lookup, event lookups, inserts and commit
+    assert summary["round_trips"] <= 8
+
+def test_streaming_daily_ingestion_reports_stages(db_session, stub_catalog):
+    summary = run_daily_ingestion(snapshot_date=date(2026, 1, 13), chunk_size=7)
+    stages = summary["stages"]
+
+    assert list(stages) == ["fetch", "normalize", "price", "write"]
+    assert stages["fetch"]["items"] == summary["fetched_products"]
+    assert stages["write"]["items"] == summary["fetched_products"]
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+import csv
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from backend.api.analytics.crud import get_price_history
+from backend.api.analytics.columnar import iter_record_batches, write_batches
+from backend.api.analytics.export import EXPORT_COLUMNS, csv_lines, iter_price_history, ndjson_lines
+from backend.ingestion.change_points import upsert_price_ranges
+from backend.ingestion.upsert import upsert_price_histories
+from shared.constants import ExportFormat
+
+START_DATE = date(2024, 6, 1)
+
+@pytest.fixture
+def product_id(make_product):
+    return make_product(990004, "Export product")
+
+def test_keyset_export_matches_history(db_session, product_id):
+    # Daily snapshots around a run of change points
+    days = [START_DATE + timedelta(days=day) for day in range(20)]
+    upsert_price_histories(db_session, [
+        {"product_id": product_id, "price": 10.0 + day.day, "recorded_date": day}
+        for day in days[:8] + days[14:]
+    ])
+    upsert_price_ranges(db_session, [
+        {"product_id": product_id, "price": 9.5, "recorded_date": day, "price_source": "real"}
+        for day in days[8:14]
+    ])
+    db_session.commit()
+
+    # Pages smaller than the range still return every day once, in order
+    rows = list(iter_price_history([product_id], START_DATE, days[-1], page_size=3))
+    history = get_price_history(db_session, product_id, START_DATE, days[-1])
+    assert [(row[6], row[3]) for row in rows] == [(snapshot.recorded_date, snapshot.price) for snapshot in history]
+
+    lines = "".join(ndjson_lines(iter(rows))).splitlines()
+    assert json.loads(lines[8]) == dict(zip(EXPORT_COLUMNS, rows[8][:-1] + (days[8].isoformat(),)))
+
+    table = list(csv.reader("".join(csv_lines(iter(rows))).splitlines()))
+    assert tuple(table[0]) == EXPORT_COLUMNS
+    assert len(table) == len(days) + 1
+
+def test_columnar_export_matches_rows(db_session, product_id):
+    days = [START_DATE + timedelta(days=day) for day in range(10)]
+    upsert_price_histories(db_session, [{"product_id": product_id, "price": 12.5, "recorded_date": day} for day in days[:5]])
+    upsert_price_ranges(db_session, [
+        {"product_id": product_id, "price": 9.99, "recorded_date": day, "price_change_reason": "base_price"}
+        for day in days[5:]
+    ])
+    db_session.commit()
+
+    for format in (ExportFormat.Arrow, ExportFormat.Parquet):
+        content = b"".join(write_batches(iter_record_batches([product_id], batch_size=3), format))
+        if format == ExportFormat.Arrow:
+            table = pa.ipc.open_stream(content).read_all()
+        else:
+            table = pq.read_table(pa.BufferReader(content))
+
+        table = table.sort_by("recorded_date")
+        rows = list(iter_price_history([product_id]))
+        assert table.column("price").to_pylist() == [row[3] for row in rows]
+        assert table.column("price_change_reason").to_pylist() == [row[4] for row in rows]
+        assert table.column("recorded_date").to_pylist() == days
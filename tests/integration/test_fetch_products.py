@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend.ingestion.fetch_products import ProductFetcher, fetch_all_products
+from backend.ingestion.response_cache import CacheMissError
+from tests.conftest import CATALOG, StubCatalogHandler
+
+def test_fetch_all_products(stub_api):
+    products = fetch_all_products(stub_api)
+
+    assert [product["id"] for product in products] == [product["id"] for product in CATALOG]
+
+def test_fetch_paginated_products(stub_api):
+    stub_api.page_size = 4
+    stub_api.concurrency = 3
+
+    products = fetch_all_products(stub_api)
+
+    assert sorted(product["id"] for product in products) == [product["id"] for product in CATALOG]
+
+def test_fetch_products_by_id(stub_api):
+    async def fetch():
+        async with ProductFetcher(stub_api) as fetcher:
+            return [product async for product in fetcher.iter_products_by_id(range(1, 11))]
+
+    products = asyncio.run(fetch())
+
+    assert sorted(product["id"] for product in products) == list(range(1, 11))
+
+def test_fetch_retries_transient_failures(stub_api):
+    stub_api.url += "/flaky"
+
+    products = fetch_all_products(stub_api)
+
+    assert len(products) == len(CATALOG)
+
+def test_fetch_gives_up_after_max_retries(stub_api):
+    stub_api.url += "/flaky"
+    stub_api.max_retries = 1
+
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch_all_products(stub_api)
+
+def test_fresh_cache_skips_request(stub_api):
+    fetch_all_products(stub_api)
+    cache_stats = {}
+    products = fetch_all_products(stub_api, cache_stats=cache_stats)
+
+    assert len(products) == len(CATALOG)
+    assert StubCatalogHandler.requests == 1
+    assert cache_stats == {"cache_hits": 1, "cache_misses": 0}
+
+def test_stale_cache_is_revalidated(stub_api):
+    stub_api.cache_ttl = 0
+    fetch_all_products(stub_api)
+    cache_stats = {}
+    products = fetch_all_products(stub_api, cache_stats=cache_stats)
+
+    assert len(products) == len(CATALOG)
+    assert StubCatalogHandler.requests == 2
+    assert cache_stats == {"cache_hits": 1, "cache_misses": 0}
+
+def test_offline_mode_serves_cache_only(stub_api):
+    stub_api.cache_ttl = 0
+    stub_api.offline = True
+
+    with pytest.raises(CacheMissError):
+        fetch_all_products(stub_api)
+
+    stub_api.offline = False
+    fetch_all_products(stub_api)
+    stub_api.offline = True
+    products = fetch_all_products(stub_api)
+
+    assert len(products) == len(CATALOG)
+    assert StubCatalogHandler.requests == 1
@@ -0,0 +1,54 @@
+from datetime import date
+
+from sqlalchemy import insert, inspect, select, func, text
+from sqlalchemy.orm import Session
+
+from backend.database import create_db_engine
+from backend.ingestion.rollups import refresh_rollups
+from backend.models import Base, DataVersion, Product, PriceHistory, PriceRollup
+from backend.partitions import (
+    add_months, months_between, partition_definition,
+    list_partitions, ensure_future_partitions, expire_partitions
+)
+
+def test_month_helpers():
+    assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert list(months_between(date(2025, 12, 15), date(2026, 2, 1))) == [
+        date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1)
+    ]
+    assert partition_definition(date(2026, 12, 1)) == "PARTITION p202612 VALUES LESS THAN ('2027-01-01')"
+
+def test_sqlite_fallback_expires_months(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'partitions.db'}")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as db:
+        db.execute(insert(Product), [{"product_id": 1, "external_id": 1, "title": "Product", "base_price": 10.0, "rating": 4.0}])
+        db.execute(insert(PriceHistory), [
+            {"product_id": 1, "price": 10.0, "recorded_date": date(2026, month, day)}
+            for month in (1, 2, 3) for day in (1, 15, 28)
+        ])
+        refresh_rollups(db, date(2026, 1, 1), date(2026, 3, 31))
+        prices_version = db.scalar(select(DataVersion.version).where(DataVersion.scope == "prices"))
+        db.commit()
+
+    partitions = list_partitions(engine)
+    assert [(partition.name, partition.rows) for partition in partitions] == [("p202601", 3), ("p202602", 3), ("p202603", 3)]
+
+    # Unpartitioned tables have no future partitions to create
+    assert ensure_future_partitions(months_ahead=3, today=date(2026, 3, 10), engine=engine) == []
+
+    # Keep the current month and the one before
+    expired = expire_partitions(retention_months=1, archive=True, today=date(2026, 3, 10), engine=engine)
+    assert expired == ["p202601"]
+    assert [partition.name for partition in list_partitions(engine)] == ["p202602", "p202603"]
+
+    assert "price_histories_archive_p202601" in inspect(engine).get_table_names()
+    with engine.connect() as connection:
+        assert connection.scalar(text("SELECT COUNT(*) FROM price_histories_archive_p202601")) == 3
+        assert connection.scalar(select(func.count()).select_from(PriceHistory)) == 6
+
+        # Rollups of the expired month go with it, cached analytics are invalidated
+        assert connection.scalars(select(PriceRollup.month)).all() == [date(2026, 2, 1), date(2026, 3, 1)]
+        assert connection.scalar(select(DataVersion.version).where(DataVersion.scope == "prices")) == prices_version + 1
@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+import pytest
+
+from backend.api.analytics.crud import (
+    aggregate_prices, aggregate_windows, aggregate_catalog_windows, get_discount_summary, get_price_summary
+)
+from backend.ingestion.rollups import refresh_rollups, update_rollups
+from backend.ingestion.upsert import upsert_price_histories
+from backend.models import PriceRollup
+from shared.constants import UpsertPolicy
+
+START_DATE = date(2025, 1, 20)
+DAYS = 70
+
+@pytest.fixture
+def product_id(make_product):
+    return make_product(990002, "Rollup product")
+
+def write_prices(db_session, product_id: int, prices: dict, policy: UpsertPolicy = UpsertPolicy.Skip) -> None:
+    rows = [{"product_id": product_id, "price": price, "recorded_date": day} for day, price in prices.items()]
+    update_rollups(db_session, rows, policy, upsert_price_histories(db_session, rows, policy))
+    db_session.commit()
+
+def stored_rollups(db_session, product_id: int) -> list:
+    db_session.expire_all()
+    return [
+        (rollup.month, rollup.snapshots, rollup.price_sum, rollup.price_min, rollup.price_max, rollup.price_sum_squares)
+        for rollup in db_session.query(PriceRollup).filter(PriceRollup.product_id == product_id).order_by(PriceRollup.month)
+    ]
+
+def test_inserted_snapshots_are_added_to_rollups(db_session, product_id):
+    prices = {START_DATE + timedelta(days=day): 10.0 + day % 9 for day in range(DAYS)}
+    days = list(prices)
+
+    # New months are created, then the same months are extended day by day
+    write_prices(db_session, product_id, {day: prices[day] for day in days[::2]})
+    for day in days[1::2]:
+        write_prices(db_session, product_id, {day: prices[day]})
+    # A rerun inserts nothing and falls back to recomputing the months
+    write_prices(db_session, product_id, {days[0]: 99.0})
+    added = stored_rollups(db_session, product_id)
+
+    refresh_rollups(db_session, days[0], days[-1], [product_id])
+    db_session.commit()
+    assert added == stored_rollups(db_session, product_id)
+    assert [rollup[1] for rollup in added] == [12, 28, 30]
+
+def test_summary_combines_rollups_and_edges(db_session, product_id):
+    prices = {START_DATE + timedelta(days=day): 10.0 + day % 9 for day in range(DAYS)}
+    write_prices(db_session, product_id, prices)
+
+    # January and March are partial, February comes from its rollup
+    start_date, end_date = date(2025, 1, 25), date(2025, 3, 10)
+    expected = [price for day, price in prices.items() if start_date <= day <= end_date]
+
+    summary = get_price_summary(db_session, product_id, start_date, end_date)
+    assert summary["min_price"] == min(expected)
+    assert summary["max_price"] == max(expected)
+    assert summary["avg_price"] == pytest.approx(sum(expected) / len(expected))
+
+    # Discounts are below the base price of 20.0, from the same aggregates
+    discounts = get_discount_summary(db_session, product_id, start_date, end_date)
+    assert discounts["max_discount"] == pytest.approx((20.0 - min(expected)) / 20.0 * 100)
+    assert discounts["min_discount"] == pytest.approx((20.0 - max(expected)) / 20.0 * 100)
+    assert discounts["avg_discount"] == pytest.approx((20.0 - sum(expected) / len(expected)) / 20.0 * 100)
+
+    # Overwriting the maximum lowers it in the rollup too
+    write_prices(db_session, product_id, {day: 5.0 for day in prices if day.month == 2}, UpsertPolicy.Overwrite)
+    summary = get_price_summary(db_session, product_id, date(2025, 2, 1), date(2025, 2, 28))
+    assert summary["min_price"] == summary["max_price"] == 5.0
+    assert summary["stddev_price"] == pytest.approx(0.0)
+
+def test_windows_match_separate_aggregates(db_session, product_id):
+    prices = {START_DATE + timedelta(days=day): 10.0 + day % 9 for day in range(DAYS)}
+    write_prices(db_session, product_id, prices)
+
+    windows = {
+        "pre_event": (date(2025, 1, 25), date(2025, 2, 2)),
+        "event": (date(2025, 2, 3), date(2025, 3, 10)),
+        "post_event": (date(2025, 3, 11), date(2025, 3, 17)),
+        "empty": (date(2024, 1, 1), date(2024, 1, 31))
+    }
+    aggregates = aggregate_windows(db_session, product_id, windows)
+
+    for name, (start_date, end_date) in windows.items():
+        assert aggregates[name] == aggregate_prices(db_session, product_id, start_date, end_date)
+    assert aggregates["empty"].snapshots == 0
+
+    # The grouped catalog variant agrees for the product
+    assert aggregate_catalog_windows(db_session, windows)[product_id] == aggregates
@@ -0,0 +1,60 @@
+import threading
+from datetime import time
+
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from backend import startup
+from backend.database import alembic_config, create_db_engine, init_db
+from backend.models import Base
+from backend.ingestion.scheduler import SKIPPED_NOT_LEADER, IngestionScheduler
+from backend.startup import SEEDING_COMPLETED, SEEDING_SKIPPED, Readiness, ensure_schema, run_startup, seed_prices
+from shared.constants import StartupMode
+
+def test_ensure_schema_is_noop_on_existing_schema():
+    assert ensure_schema() == []
+
+def test_new_database_is_stamped_at_head(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+
+    assert init_db(engine) == sorted(Base.metadata.tables)
+    with engine.connect() as connection:
+        head = ScriptDirectory.from_config(alembic_config(connection)).get_current_head()
+        assert MigrationContext.configure(connection).get_current_revision() == head
+
+    # Nothing pending on the next start
+    assert init_db(engine) == []
+
+def test_check_mode_is_ready_without_seeding():
+    ready_calls = []
+
+    readiness = run_startup(StartupMode.Check, on_ready=lambda: ready_calls.append(True))
+
+    assert isinstance(readiness, Readiness)
+    assert readiness.ready and readiness.schema_ready
+    assert readiness.seeding == SEEDING_SKIPPED
+    assert ready_calls == [True]
+
+def test_catch_up_is_skipped_while_prices_are_seeded(monkeypatch):
+    seeding, release = threading.Event(), threading.Event()
+
+    def slow_seed():
+        seeding.set()
+        release.wait(5)
+
+    monkeypatch.setattr(startup.seed_data, "seed", slow_seed)
+    readiness = Readiness()
+    seeder = threading.Thread(target=seed_prices, args=(readiness,))
+    seeder.start()
+    try:
+        assert seeding.wait(5)
+
+        # The scheduler of a worker that lost the seeding election waits for the leader
+        scheduler = IngestionScheduler(time(0, 5))
+        assert scheduler.catch_up() is None
+        assert scheduler.status()["last_status"] == SKIPPED_NOT_LEADER
+    finally:
+        release.set()
+        seeder.join(5)
+
+    assert readiness.seeding == SEEDING_COMPLETED and readiness.ready
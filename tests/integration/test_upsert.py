@@ -0,0 +1,66 @@
+from datetime import date
+import pytest
+from sqlalchemy.dialects import mysql
+
+from backend.ingestion.upsert import build_upsert, upsert_price_histories
+from backend.models import PriceHistory
+from shared.constants import PRICE_CHANGE_REASONS, PriceType, UpsertPolicy
+
+RECORDED_DATE = date(2025, 6, 1)
+
+@pytest.fixture
+def product_id(make_product):
+    return make_product(990001, "Upsert product")
+
+def snapshot(product_id: int, price: float) -> dict:
+    return {
+        "product_id": product_id,
+        "event_id": None,
+        "price": price,
+        "price_change_reason": PRICE_CHANGE_REASONS[0],
+        "price_source": PriceType.Synthetic.value,
+        "recorded_date": RECORDED_DATE
+    }
+
+def stored_prices(db_session, product_id: int):
+    db_session.expire_all()
+    return [
+        history.price
+        for history in db_session.query(PriceHistory).filter(PriceHistory.product_id == product_id)
+    ]
+
+@pytest.mark.parametrize("policy, second_price, expected", [
+    (UpsertPolicy.Skip, 15.0, 20.0),
+    (UpsertPolicy.Overwrite, 25.0, 25.0),
+    (UpsertPolicy.KeepLowest, 25.0, 20.0),
+    (UpsertPolicy.KeepLowest, 15.0, 15.0),
+])
+def test_upsert_policies(db_session, product_id, policy, second_price, expected):
+    upsert_price_histories(db_session, [snapshot(product_id, 20.0)], policy)
+    upsert_price_histories(db_session, [snapshot(product_id, second_price)], policy)
+    db_session.commit()
+
+    assert stored_prices(db_session, product_id) == [expected]
+
+@pytest.mark.parametrize("policy, clause", [
+    (UpsertPolicy.Skip, "INSERT IGNORE INTO price_histories"),
+    (UpsertPolicy.Overwrite, "price = VALUES(price)"),
+    (UpsertPolicy.KeepLowest, "price = least(price_histories.price, VALUES(price))"),
+])
+def test_mysql_upsert_statements(policy, clause):
+    sql = str(build_upsert("mysql", policy).compile(dialect=mysql.dialect()))
+
+    assert "INTO price_histories" in sql
+    assert clause in sql
+    # Skip updates nothing, so no duplicate is counted as an affected row
+    assert ("ON DUPLICATE KEY UPDATE" in sql) == (policy != UpsertPolicy.Skip)
+    if policy == UpsertPolicy.KeepLowest:
+        # Assignments run left to right, price has to be replaced last
+        assert sql.rstrip().endswith(clause)
+
+def test_stored_snapshots_are_not_counted_as_new(db_session, product_id):
+    rows = [snapshot(product_id, 20.0), {**snapshot(product_id, 20.0), "recorded_date": date(2025, 6, 2)}]
+    upsert_price_histories(db_session, rows[:1])
+
+    assert upsert_price_histories(db_session, rows) == 1
+    db_session.rollback()
@@ -0,0 +1,40 @@
+from datetime import date
+
+from backend.ingestion.change_points import Segment, apply_snapshot
+from shared.constants import UpsertPolicy
+
+A = (None, 1000, "base_price", "real")
+B = (None, 900, "base_price", "real")
+
+def test_repeated_days_extend_the_run():
+    segments = [Segment(date(2026, 1, 1), date(2026, 1, 5), A, range_id=1)]
+
+    segments, changed = apply_snapshot(segments, date(2026, 1, 6), A, UpsertPolicy.Skip)
+    assert changed
+    assert segments == [Segment(date(2026, 1, 1), date(2026, 1, 6), A, range_id=1)]
+
+    # A gap starts a new run even with the same price
+    segments, _ = apply_snapshot(segments, date(2026, 1, 9), A, UpsertPolicy.Skip)
+    assert [(segment.valid_from, segment.valid_to) for segment in segments] == [
+        (date(2026, 1, 1), date(2026, 1, 6)), (date(2026, 1, 9), date(2026, 1, 9))
+    ]
+
+def test_overwrite_splits_and_joins_runs():
+    segments = [Segment(date(2026, 1, 1), date(2026, 1, 10), A, range_id=1)]
+
+    unchanged, changed = apply_snapshot(segments, date(2026, 1, 5), B, UpsertPolicy.Skip)
+    assert not changed and unchanged == segments
+
+    segments, changed = apply_snapshot(segments, date(2026, 1, 5), B, UpsertPolicy.Overwrite)
+    assert changed
+    assert [(segment.valid_from, segment.valid_to, segment.values) for segment in segments] == [
+        (date(2026, 1, 1), date(2026, 1, 4), A),
+        (date(2026, 1, 5), date(2026, 1, 5), B),
+        (date(2026, 1, 6), date(2026, 1, 10), A),
+    ]
+    assert segments[0].range_id == 1
+
+    segments, _ = apply_snapshot(segments, date(2026, 1, 5), A, UpsertPolicy.Overwrite)
+    assert [(segment.valid_from, segment.valid_to, segment.range_id) for segment in segments] == [
+        (date(2026, 1, 1), date(2026, 1, 10), 1)
+    ]
@@ -0,0 +1,18 @@
+import pytest
+
+from backend.column_types import Cents, Code
+from shared.constants import PRICE_CHANGE_REASONS
+
+def test_cents_round_trip():
+    cents = Cents()
+    assert cents.process_bind_param(19.99, None) == 1999
+    assert cents.process_result_value(1999, None) == 19.99
+    assert cents.process_bind_param(None, None) is None
+
+def test_code_round_trip():
+    code = Code(PRICE_CHANGE_REASONS)
+    assert code.process_bind_param("event_discount", None) == PRICE_CHANGE_REASONS.index("event_discount")
+    assert code.process_result_value(2, None) == PRICE_CHANGE_REASONS[2]
+
+    with pytest.raises(ValueError):
+        code.process_bind_param("unknown", None)
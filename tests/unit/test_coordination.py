@@ -0,0 +1,33 @@
+import threading
+
+from sqlalchemy import create_engine
+
+from backend.coordination import leader, get_lock_metrics
+
+def test_only_one_leader(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'leader.db'}")
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold_lock():
+        with leader("test-leader", engine=engine) as is_leader:
+            assert is_leader
+            entered.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    entered.wait(5)
+
+    with leader("test-leader", timeout=0.1, engine=engine) as is_leader:
+        assert not is_leader
+    release.set()
+    holder.join()
+
+    with leader("test-leader", engine=engine) as is_leader:
+        assert is_leader
+
+    metrics = get_lock_metrics()["test-leader"]
+    assert metrics["acquired"] == 2
+    assert metrics["skipped"] == 1
+    assert metrics["max_wait_seconds"] >= 0.1
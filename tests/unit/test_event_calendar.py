@@ -0,0 +1,85 @@
+from datetime import date
+
+from backend.api.events.calendar import CalendarEvent, EventCalendar
+
+
+def make_event(event_id, start_date, end_date, pre_event_days=0):
+    return CalendarEvent(
+        event_id=event_id,
+        event_name=f"Event {event_id}",
+        start_date=start_date,
+        end_date=end_date,
+        pre_event_days=pre_event_days,
+        pre_event_uplift_min=0.02,
+        pre_event_uplift_max=0.05,
+        discount_min=0.1,
+        discount_max=0.2,
+        noise_enabled=False
+    )
+
+def test_calendar_resolves_active_and_pre_event():
+    event = make_event(1, date(2026, 2, 14), date(2026, 2, 14), pre_event_days=7)
+    calendar = EventCalendar([event])
+
+    assert calendar.resolve(date(2026, 2, 6)) == (None, None)
+    assert calendar.resolve(date(2026, 2, 7)) == (None, event)
+    assert calendar.resolve(date(2026, 2, 13)) == (None, event)
+    assert calendar.resolve(date(2026, 2, 14)) == (event, None)
+    assert calendar.resolve(date(2026, 2, 15)) == (None, None)
+
+def test_active_event_wins_over_pre_event():
+    long_sale = make_event(1, date(2026, 8, 1), date(2026, 8, 31))
+    flash_sale = make_event(2, date(2026, 8, 20), date(2026, 8, 20), pre_event_days=5)
+    calendar = EventCalendar([flash_sale, long_sale])
+
+    assert calendar.get_active_event(date(2026, 8, 17)) == long_sale
+    assert calendar.get_pre_event(date(2026, 8, 17)) is None
+    # Both active, the earlier started event wins
+    assert calendar.get_active_event(date(2026, 8, 20)) == long_sale
+
+def test_nearest_pre_event_wins():
+    near = make_event(1, date(2026, 12, 20), date(2026, 12, 26), pre_event_days=10)
+    far = make_event(2, date(2026, 12, 31), date(2026, 12, 31), pre_event_days=30)
+    calendar = EventCalendar([far, near])
+
+    assert calendar.get_pre_event(date(2026, 12, 15)) == near
+    assert calendar.get_pre_event(date(2026, 12, 28)) == far
+    assert calendar.get_pre_event(date(2026, 12, 5)) == far
+
+def test_calendar_matches_event_crud(db_session):
+    from backend.api.events import crud as event_crud
+    from backend.api.events.calendar import get_event_calendar
+
+    calendar = get_event_calendar(db_session, refresh=True)
+
+    for day in (date(2026, 2, 10), date(2026, 2, 14), date(2026, 11, 27), date(2026, 1, 10)):
+        active_event = event_crud.get_active_event(db_session, day)
+        calendar_event = calendar.get_active_event(day)
+        assert (calendar_event.event_id if calendar_event else None) == (active_event.event_id if active_event else None)
+
+def test_calendar_sees_event_writes_of_other_sessions(db_session):
+    from sqlalchemy import delete, insert
+    from backend.api.events.calendar import get_event_calendar
+    from backend.cache import bump_event_version
+    from backend.database import SessionLocal
+    from backend.models import Event
+
+    calendar = get_event_calendar(db_session)
+    db_session.rollback()
+
+    # Written the way another worker would, without touching this process' calendar
+    other = SessionLocal()
+    try:
+        event_id = other.execute(insert(Event).values(
+            event_name="Calendar other session", start_date=date(2031, 3, 1), end_date=date(2031, 3, 2)
+        )).inserted_primary_key[0]
+        bump_event_version(other)
+        other.commit()
+
+        assert calendar.get_event(event_id) is None
+        assert get_event_calendar(db_session).get_event(event_id).start_date == date(2031, 3, 1)
+    finally:
+        other.execute(delete(Event).where(Event.event_name == "Calendar other session"))
+        bump_event_version(other)
+        other.commit()
+        other.close()
@@ -0,0 +1,63 @@
+import asyncio
+import time
+import pytest
+
+from backend.ingestion.pipeline import StageStats, buffered_async, chunked, metered
+
+def test_chunked_keeps_order_and_remainder():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+
+def test_metered_counts_items_and_excludes_upstream():
+    source = StageStats("source")
+    chunks = StageStats("chunks", source)
+
+    result = list(metered(chunked(metered(range(10), source), 4), chunks, len))
+
+    assert len(result) == 3
+    assert source.items == 10 and chunks.items == 10
+    assert chunks.seconds <= chunks.total_seconds
+
+def test_buffered_async_bounds_producer():
+    produced = []
+
+    async def produce():
+        for item in range(100):
+            produced.append(item)
+            yield item
+
+    items = buffered_async(produce, maxsize=5)
+    assert next(items) == 0
+    time.sleep(0.2)
+
+    # One item consumed, maxsize queued and one waiting for room
+    assert len(produced) <= 7
+    assert list(items) == list(range(1, 100))
+
+def test_buffered_async_raises_producer_errors():
+    async def produce():
+        yield 1
+        raise RuntimeError("api down")
+
+    with pytest.raises(RuntimeError, match="api down"):
+        list(buffered_async(produce))
+
+def test_buffered_async_keeps_loop_running_while_full():
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def produce():
+        # Stands in for fetches in flight while the consumer is slow
+        task = asyncio.create_task(tick())
+        for item in range(10):
+            yield item
+        task.cancel()
+
+    items = buffered_async(produce, maxsize=1)
+    assert next(items) == 0
+    time.sleep(0.2)
+    assert len(ticks) >= 5
+    assert list(items) == list(range(1, 10))
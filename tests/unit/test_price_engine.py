@@ -1,6 +1,8 @@
 from datetime import date
+import numpy as np
 
-from backend.ingestion.price_engine import generate_daily_price
+from backend.api.events.calendar import get_event_calendar
+from backend.ingestion.price_engine import generate_daily_price, generate_price_matrix, date_range
 from shared.constants import PriceType
 
 def test_normal_day_price_has_noise(db_session):
@@ -49,3 +51,75 @@ def test_real_pricing_mode_no_change(db_session):
 
     assert price == 100.0
     assert metadata["price_source"] == PriceType.Real
+
+def test_price_matrix_applies_event_rules(db_session):
+    calendar = get_event_calendar(db_session)
+    matrix = generate_price_matrix(
+        np.arange(1, 51),
+        np.full(50, 100.0),
+        start_date=date(2026, 2, 9),
+        end_date=date(2026, 2, 15),
+        calendar=calendar,
+        seed=7
+    )
+
+    assert matrix.prices.shape == (50, 7)
+
+    pre_event_day = matrix.dates.index(date(2026, 2, 10))
+    assert (matrix.prices[:, pre_event_day] > 100).all()
+    assert matrix.reason(0, pre_event_day) == "pre_event_uplift"
+    assert matrix.event_id(0, pre_event_day) is None
+
+    event_day = matrix.dates.index(date(2026, 2, 14))
+    assert (matrix.prices[:, event_day] < 100).all()
+    assert matrix.reason(0, event_day) == "event_discount"
+    assert matrix.event_id(0, event_day) == calendar.get_active_event(date(2026, 2, 14)).event_id
+
+    normal_day = matrix.dates.index(date(2026, 2, 15))
+    assert ((97 <= matrix.prices[:, normal_day]) & (matrix.prices[:, normal_day] <= 103)).all()
+    assert matrix.reason(0, normal_day) == "base_price+noise"
+
+def test_price_matrix_real_pricing_mode_no_change(db_session):
+    matrix = generate_price_matrix(
+        np.array([1, 2]),
+        np.array([100.0, 25.5]),
+        start_date=date(2026, 11, 20),
+        end_date=date(2026, 11, 30),
+        calendar=get_event_calendar(db_session),
+        pricing_mode=PriceType.Real
+    )
+
+    assert (matrix.prices[0] == 100.0).all()
+    assert (matrix.prices[1] == 25.5).all()
+    assert matrix.reason(1, 0) == "base_price"
+
+def test_scalar_and_matrix_prices_match(db_session):
+    calendar = get_event_calendar(db_session)
+    product_ids = np.array([3, 17, 4242])
+    base_prices = np.array([100.0, 19.99, 1234.5])
+
+    # Covers normal, pre-event, event and noisy event days
+    start_date, end_date = date(2026, 2, 1), date(2026, 8, 31)
+    matrix = generate_price_matrix(product_ids, base_prices, start_date, end_date, calendar, seed=123)
+
+    for day_index, current_date in enumerate(date_range(start_date, end_date)):
+        for product_index, product_id in enumerate(product_ids):
+            price, metadata = generate_daily_price(
+                db_session,
+                base_price=base_prices[product_index],
+                current_date=current_date,
+                calendar=calendar,
+                product_id=int(product_id),
+                seed=123
+            )
+
+            assert price == matrix.prices[product_index, day_index]
+            assert metadata["adjustment_reason"] == matrix.reason(product_index, day_index)
+            assert metadata["event_id"] == matrix.event_id(product_index, day_index)
+
+def test_product_stream_is_order_independent(db_session):
+    first, _ = generate_daily_price(db_session, 100.0, date(2026, 3, 1), product_id=7, seed=1)
+    generate_daily_price(db_session, 100.0, date(2026, 3, 2), product_id=8, seed=1)
+    second, _ = generate_daily_price(db_session, 100.0, date(2026, 3, 1), product_id=7, seed=1)
+
+    assert first == second
@@ -0,0 +1,45 @@
+from datetime import date, datetime, time, timedelta
+import time as time_module
+
+from backend.ingestion import scheduler as scheduler_module
+from backend.ingestion.scheduler import IngestionScheduler, find_missing_dates, get_latest_recorded_date, next_run_at
+
+def test_next_run_at_rolls_over_to_tomorrow():
+    assert next_run_at(datetime(2026, 3, 1, 0, 1), time(0, 5)) == datetime(2026, 3, 1, 0, 5)
+    assert next_run_at(datetime(2026, 3, 1, 0, 5), time(0, 5)) == datetime(2026, 3, 2, 0, 5)
+
+def test_missing_dates_start_after_latest_snapshot(db_session):
+    latest = get_latest_recorded_date(db_session) or date(2026, 1, 1)
+    today = latest + timedelta(days=3)
+
+    assert find_missing_dates(db_session, latest, max_catchup_days=31) in (None, (latest, latest))
+    assert find_missing_dates(db_session, today, max_catchup_days=2) == (today - timedelta(days=1), today)
+
+def test_disabled_scheduler_does_not_start():
+    scheduler = IngestionScheduler(time(0, 5), enabled=False)
+    scheduler.start()
+
+    status = scheduler.status()
+    assert status["enabled"] is False
+    assert status["alive"] is False
+
+def test_failed_catch_up_keeps_the_scheduler_running(monkeypatch):
+    scheduler = IngestionScheduler(time(0, 5))
+
+    def failing_maintenance(today):
+        raise RuntimeError("partition maintenance failed")
+
+    monkeypatch.setattr(scheduler_module, "maintain_partitions", failing_maintenance)
+    scheduler.start()
+    for _ in range(100):
+        if scheduler.status()["last_status"]:
+            break
+        time_module.sleep(0.01)
+
+    status = scheduler.status()
+    assert status["last_status"] == "failed"
+    assert "partition maintenance failed" in status["last_error"]
+    assert status["alive"] is True
+
+    scheduler.stop(timeout=5)
+    assert scheduler.status()["alive"] is False